@@ -0,0 +1,223 @@
+# banco.py
+# Camada de persistência compartilhada: pool de conexões PostgreSQL e criação do esquema.
+
+import os
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+# DDL por tabela; {tabela} permite criar cópias idênticas (ex.: tabelas de carga em carga_banco.py)
+TABELAS = {
+    'produtos_substitutos': """
+        CREATE TABLE IF NOT EXISTS {tabela} (
+            id SERIAL PRIMARY KEY,
+            produto_pesquisado_cod VARCHAR,
+            produto_pesquisado_des VARCHAR,
+            produto_recomendado_cod VARCHAR,
+            produto_recomendado_des VARCHAR,
+            valor_unitario NUMERIC,
+            margem_percentual NUMERIC,
+            estoque INTEGER,
+            categoria VARCHAR,
+            posicao INTEGER,
+            data_insersao TIMESTAMP
+        );
+    """,
+    'produtos_associados': """
+        CREATE TABLE IF NOT EXISTS {tabela} (
+            id SERIAL PRIMARY KEY,
+            produto_pesquisado_cod VARCHAR,
+            produto_pesquisado_des VARCHAR,
+            produto_associado_cod VARCHAR,
+            produto_associado_des VARCHAR,
+            suporte NUMERIC,
+            confianca NUMERIC,
+            posicao INTEGER,
+            data_insersao TIMESTAMP
+        );
+    """,
+}
+
+# Colunas gravadas pela aplicação (o id é gerado pelo banco)
+COLUNAS_BANCO = {
+    'produtos_substitutos': [
+        'produto_pesquisado_cod', 'produto_pesquisado_des', 'produto_recomendado_cod', 'produto_recomendado_des',
+        'valor_unitario', 'margem_percentual', 'estoque', 'categoria', 'posicao', 'data_insersao'
+    ],
+    'produtos_associados': [
+        'produto_pesquisado_cod', 'produto_pesquisado_des', 'produto_associado_cod', 'produto_associado_des',
+        'suporte', 'confianca', 'posicao', 'data_insersao'
+    ],
+}
+
+# Uma linha por par (pesquisado, recomendado): gravar de novo atualiza em vez de duplicar
+CHAVES = {
+    'produtos_substitutos': ('produto_pesquisado_cod', 'produto_recomendado_cod'),
+    'produtos_associados': ('produto_pesquisado_cod', 'produto_associado_cod'),
+}
+
+# Índices de cada tabela, criados depois da tabela (e depois do COPY nas cargas em massa).
+# A chave única começa pelo código pesquisado e já atende a busca por ele; (pesquisado, posicao)
+# devolve o top-N na ordem sem ordenar.
+INDICES = {
+    tabela: [
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {{tabela}}_chave ON {{tabela}} ({', '.join(chave)})",
+        "CREATE INDEX IF NOT EXISTS {tabela}_pesquisado_posicao ON {tabela} (produto_pesquisado_cod, posicao)",
+    ]
+    for tabela, chave in CHAVES.items()
+}
+
+# Tabelas criadas por versões anteriores (sem chave única): coluna nova e remoção das
+# duplicatas, mantendo a gravação mais recente de cada par
+MIGRACOES = {
+    tabela: [
+        "ALTER TABLE {tabela} ADD COLUMN IF NOT EXISTS posicao INTEGER",
+        "DELETE FROM {tabela} a USING {tabela} b WHERE "
+        + " AND ".join(f"a.{coluna} IS NOT DISTINCT FROM b.{coluna}" for coluna in chave)
+        + " AND a.id < b.id",
+    ]
+    for tabela, chave in CHAVES.items()
+}
+
+
+def comandos_tabela(tabela: str, nome: str = None) -> list:
+    """DDL da tabela `tabela` (e seus índices) aplicado ao nome `nome`."""
+    nome = nome or tabela
+    return [TABELAS[tabela].format(tabela=nome)] + [indice.format(tabela=nome) for indice in INDICES[tabela]]
+
+
+def comando_upsert(tabela: str, colunas: list) -> str:
+    """INSERT ... VALUES %s (para execute_values) que atualiza a linha quando o par já existe."""
+    chave = CHAVES[tabela]
+    atualizar = ', '.join(f"{coluna} = EXCLUDED.{coluna}" for coluna in colunas if coluna not in chave)
+    return (
+        f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES %s "
+        f"ON CONFLICT ({', '.join(chave)}) DO UPDATE SET {atualizar}"
+    )
+
+
+def remover_antigos(cur, tabela: str, codigo_pesquisado: str, mantidos: list):
+    """Apaga as recomendações de `codigo_pesquisado` que não estão mais no conjunto gravado."""
+    pesquisado, recomendado = CHAVES[tabela]
+    cur.execute(
+        f"DELETE FROM {tabela} WHERE {pesquisado} = %s AND NOT ({recomendado} = ANY(%s))",
+        (codigo_pesquisado, list(mantidos))
+    )
+
+
+_pool = None
+_trava = threading.Lock()
+
+
+def configuracao_banco() -> dict:
+    """Parâmetros de conexão lidos do ambiente, com as mesmas variáveis do libpq.
+
+    PGHOST, PGPORT, PGDATABASE e PGUSER têm padrão local; a senha vem de PGPASSWORD
+    ou do ~/.pgpass e nunca fica no código.
+    """
+    config = {
+        'host': os.environ.get('PGHOST', 'localhost'),
+        'port': int(os.environ.get('PGPORT', 5432)),
+        'dbname': os.environ.get('PGDATABASE', 'bd_recomenda'),
+        'user': os.environ.get('PGUSER', 'postgres'),
+    }
+    if os.environ.get('PGPASSWORD'):
+        config['password'] = os.environ['PGPASSWORD']
+    return config
+
+
+def criar_esquema(conn):
+    """Cria as tabelas e índices que ainda não existirem, migrando tabelas antigas sem chave única."""
+    with conn.cursor() as cur:
+        for tabela in TABELAS:
+            cur.execute(TABELAS[tabela].format(tabela=tabela))
+            cur.execute("SELECT 1 FROM pg_indexes WHERE tablename = %s AND indexname = %s",
+                        (tabela, f"{tabela}_chave"))
+            if cur.fetchone() is None:
+                for comando in MIGRACOES[tabela]:
+                    cur.execute(comando.format(tabela=tabela))
+            for indice in INDICES[tabela]:
+                cur.execute(indice.format(tabela=tabela))
+    conn.commit()
+
+
+def obter_pool(config: dict = None) -> ThreadedConnectionPool:
+    """Pool único do processo. Na primeira chamada abre o pool e cria o esquema uma única vez.
+
+    O tamanho vem de RECOMENDA_POOL_MIN / RECOMENDA_POOL_MAX (padrão 1 e 10).
+    """
+    global _pool
+    with _trava:
+        if _pool is None:
+            pool = ThreadedConnectionPool(
+                int(os.environ.get('RECOMENDA_POOL_MIN', 1)),
+                int(os.environ.get('RECOMENDA_POOL_MAX', 10)),
+                **(config or configuracao_banco())
+            )
+            conn = pool.getconn()
+            try:
+                criar_esquema(conn)
+            finally:
+                pool.putconn(conn)
+            _pool = pool
+            print("[INFO] Pool de conexões aberto e esquema verificado.")
+        return _pool
+
+
+@contextmanager
+def conexao(config: dict = None):
+    """Empresta uma conexão do pool: commit ao sair sem erro, rollback se houver exceção."""
+    pool = obter_pool(config)
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+
+def ler_recomendacoes(tabela: str, codigo_pesquisado, limite: int = 6, config: dict = None) -> pd.DataFrame:
+    """Top-`limite` gravado para o código, na ordem de posição, direto da tabela (sem recalcular)."""
+    if tabela not in CHAVES:
+        raise ValueError(f"Tabela '{tabela}' desconhecida. Use uma de {tuple(CHAVES)}.")
+    with conexao(config) as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT * FROM {tabela} WHERE produto_pesquisado_cod = %s ORDER BY posicao LIMIT %s",
+                (str(codigo_pesquisado), limite)
+            )
+            colunas = [descricao.name for descricao in cur.description]
+            # NUMERIC chega como Decimal; coerce_float devolve float, pronto para JSON
+            return pd.DataFrame.from_records(cur.fetchall(), columns=colunas, coerce_float=True)
+
+
+def ler_substitutos(codigo_pesquisado, limite: int = 6, config: dict = None) -> pd.DataFrame:
+    return ler_recomendacoes('produtos_substitutos', codigo_pesquisado, limite, config)
+
+
+def ler_associados(codigo_pesquisado, limite: int = 6, config: dict = None) -> pd.DataFrame:
+    return ler_recomendacoes('produtos_associados', codigo_pesquisado, limite, config)
+
+
+def fechar_pool():
+    global _pool
+    with _trava:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+if __name__ == "__main__":
+    # Migração: cria o esquema sem precisar rodar o sistema inteiro
+    conn = psycopg2.connect(**configuracao_banco())
+    try:
+        criar_esquema(conn)
+    finally:
+        conn.close()
+    print("[INFO] Esquema criado/verificado.")
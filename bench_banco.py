@@ -0,0 +1,111 @@
+# bench_banco.py
+# Gravações por segundo no PostgreSQL: conexão nova a cada gravação (como era) x pool compartilhado.
+
+import argparse
+import contextlib
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from banco import conexao, configuracao_banco, criar_esquema, fechar_pool, ler_substitutos, obter_pool
+from main import carregar_base
+from main_test import inserir_recomendacoes
+from recomendador import RecomendadorCrossSelling
+from substitutos import RecomendadorSubstituto
+
+
+def _salvar_conectando(codigo, df_substitutos, df_associados):
+    # Comportamento anterior: connect + CREATE TABLE IF NOT EXISTS + insert + close a cada chamada
+    conn = psycopg2.connect(**configuracao_banco())
+    try:
+        criar_esquema(conn)
+        with conn.cursor() as cur:
+            inserir_recomendacoes(cur, codigo, df_substitutos, df_associados)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _salvar_pool(codigo, df_substitutos, df_associados):
+    with conexao() as conn:
+        with conn.cursor() as cur:
+            inserir_recomendacoes(cur, codigo, df_substitutos, df_associados)
+
+
+def _linhas(payload):
+    codigo, df_substitutos, df_associados = payload
+    linhas = min(6, len(df_substitutos))
+    if not df_associados.empty:
+        linhas += min(6, (df_associados['Antecedente'].astype(str) == codigo).sum())
+    return linhas
+
+
+def _medir(salvar, gravacoes, threads, payloads):
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if threads == 1:
+            for i in range(gravacoes):
+                salvar(*payloads[i % len(payloads)])
+        else:
+            with ThreadPoolExecutor(threads) as executor:
+                list(executor.map(lambda i: salvar(*payloads[i % len(payloads)]), range(gravacoes)))
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gravações por segundo: conexão por chamada x pool')
+    parser.add_argument('--estoque', default='bases/relatorio_produtos.xlsx')
+    parser.add_argument('--notas', default='bases/relatorio_notas.xlsx')
+    parser.add_argument('--codigos', type=int, default=50, help='produtos pesquisados, gravados em rodízio')
+    parser.add_argument('--gravacoes', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=8, help='gravações simultâneas no cenário concorrente')
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    # Mesmo conteúdo que main() grava: 6 substitutos e até 6 associados de cada código pesquisado
+    _, df_modelo = carregar_base(args.estoque, args.notas)
+    substituto = RecomendadorSubstituto(df_modelo, verboso=False)
+    cross = RecomendadorCrossSelling(df_modelo)
+    rng = np.random.default_rng(args.semente)
+    payloads = []
+    for codigo in rng.choice(df_modelo['Código produto'].unique(), args.codigos, replace=False):
+        codigo = int(codigo)
+        df_substitutos = substituto.recomendar(codigo)
+        df_substitutos.insert(0, 'Código pesquisado', codigo)
+        df_substitutos.insert(1, 'Descrição pesquisada', '')
+        regras = cross.gerar_regras(codigo)
+        df_associados = cross.formatar_regras(regras) if not regras.empty else pd.DataFrame()
+        payloads.append((str(codigo), df_substitutos, df_associados))
+
+    obter_pool()
+    linhas = np.mean([_linhas(payload) for payload in payloads])
+    for threads in (1, args.threads):
+        for nome, salvar in [('conexão por chamada', _salvar_conectando), ('pool', _salvar_pool)]:
+            duracao = _medir(salvar, args.gravacoes, threads, payloads)
+            print(f"{nome:>20} | {threads:>2} thread(s): {args.gravacoes / duracao:8.1f} gravações/s | "
+                  f"{args.gravacoes * linhas / duracao:9.1f} linhas/s")
+
+    # Com a chave única, regravar não acumula histórico: a leitura continua no mesmo índice
+    codigos = [codigo for codigo, _, _ in payloads]
+    with conexao() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT max(n) FROM (SELECT count(*) AS n FROM produtos_substitutos "
+                        "WHERE produto_pesquisado_cod = ANY(%s) GROUP BY produto_pesquisado_cod) t", (codigos,))
+            linhas_codigo = cur.fetchone()[0]
+    tempos = []
+    for i in range(args.gravacoes):
+        inicio = time.perf_counter()
+        ler_substitutos(codigos[i % len(codigos)])
+        tempos.append(time.perf_counter() - inicio)
+    tempos = np.array(tempos) * 1000
+    print(f"Leitura: no máximo {linhas_codigo} linhas por código após {4 * args.gravacoes} gravações | "
+          f"p50 {np.percentile(tempos, 50):.3f} ms | p95 {np.percentile(tempos, 95):.3f} ms")
+    fechar_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# bench_busca.py
+# Tempo de montagem do IndiceDescricoes e latência/acerto da busca por descrição em consultas tiradas do catálogo.
+
+import argparse
+import time
+
+import numpy as np
+
+from busca_produtos import IndiceDescricoes, normalizar
+from main import carregar_base
+
+
+def _consultas(descricao: str, rng):
+    """Variações de uma descrição como alguém digitaria no balcão."""
+    palavras = [p for p in normalizar(descricao).split() if len(p) >= 4 and not p.isdigit()]
+    if len(palavras) < 2:
+        return {}
+    a, b = palavras[:2]
+    posicao = rng.integers(1, len(a) - 1)
+    return {
+        'prefixo': f"{a[:3]} {b[:2]}",
+        'palavras': f"{a} {b}",
+        'maiúsculas/acentos': f"{a.upper()} {b.replace('a', 'á', 1)}",
+        'erro de digitação': f"{a[:posicao] + a[posicao + 1:]} {b}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Montagem e latência da busca por descrição')
+    parser.add_argument('--estoque', default='bases/relatorio_produtos.xlsx')
+    parser.add_argument('--notas', default='bases/relatorio_notas.xlsx')
+    parser.add_argument('--consultas', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    _, df_modelo = carregar_base(args.estoque, args.notas)
+    inicio = time.perf_counter()
+    indice = IndiceDescricoes(df_modelo)
+    print(f"Índice: {len(indice)} produtos, {len(indice.vocabulario)} palavras, {len(indice.trigrama)} trigramas, "
+          f"montado em {time.perf_counter() - inicio:.2f} s")
+
+    rng = np.random.default_rng(args.semente)
+    produtos = df_modelo.drop_duplicates('Código produto')
+    amostra = produtos.iloc[rng.choice(len(produtos), min(args.consultas, len(produtos)), replace=False)]
+
+    tempos, acertos = {}, {}
+    for codigo, descricao in zip(amostra['Código produto'], amostra['Descrição do produto']):
+        for tipo, texto in _consultas(descricao, rng).items():
+            inicio = time.perf_counter()
+            resultado = indice.buscar(texto, args.k)
+            tempos.setdefault(tipo, []).append(time.perf_counter() - inicio)
+            acertos.setdefault(tipo, []).append(codigo in set(resultado['Código produto']))
+
+    for tipo, valores in tempos.items():
+        valores = np.array(valores) * 1000
+        print(f"{tipo:>19}: {len(valores)} consultas | p50 {np.percentile(valores, 50):.3f} ms | "
+              f"p95 {np.percentile(valores, 95):.3f} ms | produto no top-{args.k}: {np.mean(acertos[tipo]):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# bench_carga.py
+# Linhas por segundo na gravação do catálogo inteiro: execute_values (como salvar_no_banco) x COPY.
+# Grava em tabelas <tabela>_bench, criadas e removidas aqui; as tabelas reais não são tocadas.
+
+import argparse
+import time
+from datetime import datetime
+
+import pandas as pd
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+from banco import COLUNAS_BANCO, comandos_tabela, conexao
+from carga_banco import copiar, linhas_associados, linhas_substitutos
+from main import carregar_base
+from recomendador import RecomendadorCrossSelling
+from substitutos import RecomendadorSubstituto
+
+
+def _inserir(cur, tabela, df, colunas):
+    comando = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+        sql.Identifier(tabela), sql.SQL(', ').join(map(sql.Identifier, colunas))
+    ).as_string(cur)
+    execute_values(cur, comando, df[colunas].itertuples(index=False, name=None), page_size=1000)
+    return len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga do catálogo inteiro: execute_values x COPY')
+    parser.add_argument('--estoque', default='bases/relatorio_produtos.xlsx')
+    parser.add_argument('--notas', default='bases/relatorio_notas.xlsx')
+    parser.add_argument('--min-support', type=float, default=0.005)
+    parser.add_argument('--saida', default='saida/bench_carga')
+    parser.add_argument('--processos', type=int, default=None)
+    args = parser.parse_args()
+
+    df_estoque_limpo, df_modelo = carregar_base(args.estoque, args.notas)
+    agora = datetime.now()
+    recomendador = RecomendadorSubstituto(df_modelo, verboso=False)
+    cross = RecomendadorCrossSelling(df_modelo)
+    arquivos = cross.gerar_lote(df_estoque_limpo['Código produto'].unique(), min_support=args.min_support,
+                                saida=args.saida, formato='parquet', processos=args.processos)
+    dados = {
+        'produtos_substitutos': linhas_substitutos(recomendador, recomendador.recomendar_todos(), agora),
+        'produtos_associados': pd.concat([linhas_associados(pd.read_parquet(a), agora) for a in arquivos]),
+    }
+
+    for nome, gravar in [('execute_values', _inserir), ('COPY', copiar)]:
+        for tabela, df in dados.items():
+            teste = f"{tabela}_bench"
+            with conexao() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(teste)))
+                    cur.execute(comandos_tabela(tabela, teste)[0])
+
+            inicio = time.perf_counter()
+            with conexao() as conn:
+                with conn.cursor() as cur:
+                    linhas = gravar(cur, teste, df, COLUNAS_BANCO[tabela])
+            duracao = time.perf_counter() - inicio
+            print(f"{nome:>15} | {tabela:<21}: {linhas:>8} linhas em {duracao:6.2f} s | "
+                  f"{linhas / max(duracao, 1e-9):>10,.0f} linhas/s")
+
+            with conexao() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(teste)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# bench_codificacao.py
+# Compara o pico de memória da codificação densa (TransactionEncoder) com a
+# codificação esparsa (CSR) usada por RecomendadorCrossSelling no caminho apriori.
+
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+from mlxtend.frequent_patterns import apriori
+from mlxtend.preprocessing import TransactionEncoder
+
+from main import carregar_base
+from coocorrencia import onehot_esparso
+
+
+def codificar_denso(df_filtrado):
+    transacoes = df_filtrado.groupby('Numero nota fiscal')['Código produto'].apply(list)
+    te = TransactionEncoder()
+    te_ary = te.fit_transform(transacoes)
+    return pd.DataFrame(te_ary, columns=te.columns_)
+
+
+def codificar_esparso(df_filtrado):
+    df_onehot, _ = onehot_esparso(df_filtrado)
+    return df_onehot
+
+
+def medir(funcao, *args):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, duracao, pico / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pico de memória: codificação densa x esparsa')
+    parser.add_argument('--estoque', default='bases/relatorio_produtos.xlsx')
+    parser.add_argument('--notas', default='bases/relatorio_notas.xlsx')
+    parser.add_argument('--produtos', type=int, default=5, help='quantidade de produtos mais vendidos medidos')
+    parser.add_argument('--min-support', type=float, default=0.005)
+    args = parser.parse_args()
+
+    _, df_modelo = carregar_base(args.estoque, args.notas)
+
+    mais_vendidos = df_modelo['Código produto'].value_counts().index[:args.produtos]
+
+    print(f"{'produto':>10} {'notas':>7} {'produtos':>8} | {'denso MiB':>10} {'esparso MiB':>11} | "
+          f"{'apriori denso MiB':>17} {'apriori esparso MiB':>19}")
+    for cod_produto in mais_vendidos:
+        notas = df_modelo.loc[df_modelo['Código produto'] == cod_produto, 'Numero nota fiscal'].unique()
+        df_filtrado = df_modelo[df_modelo['Numero nota fiscal'].isin(notas)]
+
+        onehot_denso, _, pico_denso = medir(codificar_denso, df_filtrado)
+        _, _, pico_esparso = medir(codificar_esparso, df_filtrado)
+
+        _, _, pico_apriori_denso = medir(
+            lambda: apriori(codificar_denso(df_filtrado), min_support=args.min_support, max_len=2)
+        )
+        _, _, pico_apriori_esparso = medir(
+            lambda: apriori(codificar_esparso(df_filtrado), min_support=args.min_support, max_len=2)
+        )
+
+        print(f"{cod_produto:>10} {len(notas):>7} {onehot_denso.shape[1]:>8} | {pico_denso:>10.1f} "
+              f"{pico_esparso:>11.1f} | {pico_apriori_denso:>17.1f} {pico_apriori_esparso:>19.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# bench_compacto.py
+# Memória por coluna e tempo de merges/groupbys típicos com df_modelo normal x compacto (tipos_compactos).
+
+import argparse
+import time
+
+import pandas as pd
+
+from main import carregar_base
+from recomendador import RecomendadorCrossSelling
+from substitutos import RecomendadorSubstituto
+from tipos_compactos import relatorio_memoria
+
+
+def _operacoes(df_estoque: pd.DataFrame, df_modelo: pd.DataFrame) -> dict:
+    # As mesmas formas de acesso de BasePreparador, dos cleaners e dos recomendadores
+    notas = df_modelo[['Numero nota fiscal', 'Código produto', 'Descrição do produto', 'Valor total produto']]
+    estoque = df_estoque[['Código produto', 'Código da categoria', 'Categoria', 'Código da Marca', 'Marca']]
+    return {
+        'merge notas x estoque': lambda: pd.merge(notas, estoque, on='Código produto', how='inner'),
+        'groupby nota (transform)': lambda: df_modelo.groupby('Numero nota fiscal')['Valor total produto'].transform('sum'),
+        'groupby produto': lambda: df_modelo.groupby('Código produto')['Quantidade do produto'].sum(),
+        'groupby descrição (nunique)': lambda: df_modelo.groupby('Descrição do produto', observed=True)['Código produto'].nunique(),
+        'groupby categoria/marca': lambda: df_modelo.groupby(['Categoria', 'Marca'], observed=True)['Valor total produto'].sum(),
+        'isin descrições': lambda: df_modelo['Descrição do produto'].isin(df_modelo['Descrição do produto'].iloc[:1000]),
+        'RecomendadorSubstituto': lambda: RecomendadorSubstituto(df_modelo, verboso=False),
+        'RecomendadorCrossSelling': lambda: RecomendadorCrossSelling(df_modelo),
+    }
+
+
+def _melhor_tempo(funcao, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memória e tempo com df_modelo normal x compacto')
+    parser.add_argument('--estoque', default='bases/relatorio_produtos.xlsx')
+    parser.add_argument('--notas', default='bases/relatorio_notas.xlsx')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    bases = {
+        'normal': carregar_base(args.estoque, args.notas),
+        'compacto': carregar_base(args.estoque, args.notas, compacto=True),
+    }
+
+    print("df_modelo:")
+    print(relatorio_memoria(bases['normal'][1], bases['compacto'][1]).to_string())
+    print("\nEstoque limpo:")
+    print(relatorio_memoria(bases['normal'][0], bases['compacto'][0]).to_string())
+
+    print(f"\n{'operação':<28} {'normal':>10} {'compacto':>10}")
+    tempos = {nome: {op: _melhor_tempo(f, args.repeticoes) for op, f in _operacoes(*base).items()}
+              for nome, base in bases.items()}
+    for operacao in tempos['normal']:
+        normal, compacto = tempos['normal'][operacao], tempos['compacto'][operacao]
+        print(f"{operacao:<28} {normal * 1000:>8.1f}ms {compacto * 1000:>8.1f}ms  ({normal / compacto:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
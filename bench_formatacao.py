@@ -0,0 +1,45 @@
+# bench_formatacao.py
+# Custo por consulta de RecomendadorCrossSelling.formatar_regras sobre produtos do catálogo.
+
+import argparse
+import time
+
+import numpy as np
+
+from main import carregar_base
+from recomendador import RecomendadorCrossSelling
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Custo por consulta de formatar_regras')
+    parser.add_argument('--estoque', default='bases/relatorio_produtos.xlsx')
+    parser.add_argument('--notas', default='bases/relatorio_notas.xlsx')
+    parser.add_argument('--consultas', type=int, default=500)
+    parser.add_argument('--min-support', type=float, default=0.005)
+    parser.add_argument('--max-len', type=int, default=2)
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    _, df_modelo = carregar_base(args.estoque, args.notas)
+    cross = RecomendadorCrossSelling(df_modelo)
+
+    # Produtos mais vendidos primeiro: são os que têm regras para formatar
+    vendidos = df_modelo['Código produto'].value_counts().index.to_numpy()
+    codigos = np.random.default_rng(args.semente).choice(vendidos[:max(args.consultas, 1000)], args.consultas)
+    lotes = [cross.gerar_regras(int(cod), min_support=args.min_support, max_len=args.max_len) for cod in codigos]
+    lotes = [regras for regras in lotes if not regras.empty]
+
+    tempos = []
+    for regras in lotes:
+        inicio = time.perf_counter()
+        cross.formatar_regras(regras)
+        tempos.append(time.perf_counter() - inicio)
+    tempos = np.array(tempos) * 1000
+    linhas = np.array([len(regras) for regras in lotes])
+    print(f"formatar_regras: {len(lotes)} consultas ({linhas.mean():.1f} regras em média) | "
+          f"p50 {np.percentile(tempos, 50):.3f} ms | p95 {np.percentile(tempos, 95):.3f} ms | "
+          f"{tempos.sum() / linhas.sum() * 1000:.1f} µs por regra")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# bench_gravacao.py
+# Latência por consulta com gravação síncrona (salvar_no_banco) x fila em segundo plano (GravadorAssincrono).
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from banco import fechar_pool, obter_pool
+from gravacao_assincrona import GravadorAssincrono
+from main import carregar_base
+from main_test import salvar_no_banco
+from recomendador import RecomendadorCrossSelling
+from substitutos import RecomendadorSubstituto
+
+
+def _consultar(substituto, cross, df_modelo, codigo):
+    # Mesmo trabalho que main() faz por código, até o ponto de gravar
+    resultado_sub = substituto.recomendar(codigo)
+    resultado_sub.insert(0, "Código pesquisado", codigo)
+    resultado_sub.insert(1, "Descrição pesquisada", "")
+    regras = cross.gerar_regras(codigo)
+    df_formatado = cross.formatar_regras(regras) if not regras.empty else pd.DataFrame()
+    return resultado_sub, df_formatado, df_modelo
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latência por consulta: gravação síncrona x em segundo plano')
+    parser.add_argument('--estoque', default='bases/relatorio_produtos.xlsx')
+    parser.add_argument('--notas', default='bases/relatorio_notas.xlsx')
+    parser.add_argument('--consultas', type=int, default=500)
+    parser.add_argument('--tamanho-lote', type=int, default=50)
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    _, df_modelo = carregar_base(args.estoque, args.notas)
+    substituto = RecomendadorSubstituto(df_modelo, verboso=False)
+    cross = RecomendadorCrossSelling(df_modelo)
+    codigos = np.random.default_rng(args.semente).choice(df_modelo['Código produto'].unique(), args.consultas)
+    obter_pool()
+
+    for nome in ('síncrona', 'em segundo plano'):
+        gravador = GravadorAssincrono(tamanho_lote=args.tamanho_lote) if nome != 'síncrona' else None
+        tempos = []
+        inicio_total = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for codigo in codigos:
+                inicio = time.perf_counter()
+                resultado = _consultar(substituto, cross, df_modelo, int(codigo))
+                if gravador is None:
+                    salvar_no_banco(*resultado)
+                else:
+                    gravador.enfileirar(*resultado)
+                tempos.append(time.perf_counter() - inicio)
+            fim_consultas = time.perf_counter()
+            estatisticas = gravador.fechar() if gravador else None
+        fim_total = time.perf_counter()
+
+        tempos = np.array(tempos) * 1000
+        print(f"{nome:>17}: p50 {np.percentile(tempos, 50):.2f} ms | p95 {np.percentile(tempos, 95):.2f} ms por consulta | "
+              f"consultas {fim_consultas - inicio_total:.2f} s + esvaziar fila {fim_total - fim_consultas:.2f} s")
+        if estatisticas:
+            print(f"{'':>17}  {estatisticas}")
+    fechar_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# bench_ingestao.py
+# Tempo da carga das bases sem cache: estoque e notas em sequência x em processos paralelos (ingestao.py),
+# comparado com cada ramo sozinho. Confere que estoque limpo e df_modelo saem idênticos nos dois modos.
+
+import argparse
+import time
+
+import pandas as pd
+
+from ingestao import cpus_disponiveis
+from main import carregar_base, limpar_estoque, limpar_notas
+
+
+def _melhor_tempo(funcao, repeticoes: int):
+    tempos, resultado = [], None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return resultado, min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga das bases: sequencial x paralela')
+    parser.add_argument('--estoque', default='bases/relatorio_produtos.xlsx')
+    parser.add_argument('--notas', default='bases/relatorio_notas.xlsx')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--compacto', action='store_true')
+    args = parser.parse_args()
+
+    if cpus_disponiveis() < 2:
+        print("[AVISO] Só uma CPU disponível: carregar_base(paralelo=True) segue sequencial nesta máquina.")
+
+    _, tempo_estoque = _melhor_tempo(lambda: limpar_estoque(args.estoque, args.compacto), args.repeticoes)
+    _, tempo_notas = _melhor_tempo(lambda: limpar_notas(args.notas, args.compacto), args.repeticoes)
+    sequencial, tempo_sequencial = _melhor_tempo(
+        lambda: carregar_base(args.estoque, args.notas, pasta_cache=None, compacto=args.compacto, paralelo=False),
+        args.repeticoes)
+    paralelo, tempo_paralelo = _melhor_tempo(
+        lambda: carregar_base(args.estoque, args.notas, pasta_cache=None, compacto=args.compacto, paralelo=True),
+        args.repeticoes)
+
+    for antes, depois in zip(sequencial, paralelo):
+        pd.testing.assert_frame_equal(antes, depois, check_exact=True)
+
+    mais_lento = max(tempo_estoque, tempo_notas)
+    print(f"\nestoque sozinho:   {tempo_estoque:>7.2f} s")
+    print(f"notas sozinhas:    {tempo_notas:>7.2f} s")
+    print(f"carga sequencial:  {tempo_sequencial:>7.2f} s")
+    print(f"carga paralela:    {tempo_paralelo:>7.2f} s  ({tempo_sequencial / tempo_paralelo:.2f}x; "
+          f"{tempo_paralelo / mais_lento:.2f}x o ramo mais lento)")
+    print("Estoque limpo e df_modelo idênticos nos dois modos.")
+
+
+if __name__ == "__main__":
+    main()
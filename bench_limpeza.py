@@ -0,0 +1,112 @@
+# bench_limpeza.py
+# Tempo e pico de memória da limpeza: regras encadeadas (um filtro e uma cópia por regra, como antes)
+# x máscaras combinadas e um filtro só (limpeza_comum). Confere que as saídas são idênticas.
+
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+
+from leitura_notas import ler_excel_em_lotes
+from limpeza_base_mesclada import BasePreparador
+from limpeza_estoque import EstoqueCleaner
+from limpeza_notas import NotasCleaner
+
+
+def _estoque_encadeado(df):
+    df = df.copy()  # a versão antiga alterava a entrada
+    df.loc[df["Quantidade estoque"] < 0, "Quantidade estoque"] = 0
+    df["Quantidade estoque"] = df["Quantidade estoque"].fillna(0)
+    df = df[EstoqueCleaner().colunas_utilizadas].copy()
+    for chave, valor in [("Produto", "Código"), ("Categoria", "Código da categoria"), ("Marca", "Código da Marca")]:
+        contagem = df.groupby(chave)[valor].nunique()
+        df = df[~df[chave].isin(contagem[contagem > 1].index)].copy()
+    df = df.astype({'Quantidade estoque': 'int64'})
+    df["Preço de custo"] = df["Preço de custo"].round(2)
+    return df.rename(columns={"Código": "Código produto"})
+
+
+def _notas_encadeado(df):
+    notas_com_problemas = set()
+    notas_com_problemas.update(df[df['Quantidade do produto'] <= 0]['Numero nota fiscal'].unique())
+    notas_com_problemas.update(df[df['Valor unitário'] == 0]['Numero nota fiscal'].unique())
+    df_limpo = df[~df['Numero nota fiscal'].isin(notas_com_problemas)].copy()
+    contagem = df_limpo.groupby('Descrição do produto')['Código produto'].nunique()
+    df_limpo = df_limpo[~df_limpo['Descrição do produto'].isin(contagem[contagem > 1].index.tolist())]
+    df_limpo["Valor total produto"] = (df_limpo["Quantidade do produto"] * df_limpo["Valor unitário"]).round(2)
+    valor_por_nota = df_limpo.groupby('Numero nota fiscal')['Valor total produto'].sum().round(2)
+    df_limpo['Valor da nota'] = df_limpo['Numero nota fiscal'].map(valor_por_nota)
+    df_limpo['Valor unitário'] = df_limpo['Valor unitário'].round(2)
+    df_limpo['Preço de custo'] = df_limpo['Preço de custo'].round(2)
+    return df_limpo[NotasCleaner.COLUNAS_FINAIS]
+
+
+def _base_encadeada(df_estoque, df_notas):
+    df = pd.merge(
+        df_notas,
+        df_estoque[["Código produto", "Código da categoria", "Categoria", "Código da Marca", "Marca", "Quantidade estoque"]],
+        on='Código produto', how='inner'
+    )
+    df = df[~df["Preço de custo"].isna()]
+    df = df[df["Preço de custo"] != 0]
+    df = df[df["Valor unitário"] != 0]
+    df["Margem bruta"] = (df["Valor unitário"] - df["Preço de custo"]).round(2)
+    df["Margem %"] = (df["Margem bruta"] / df["Valor unitário"]).round(2)
+    df["Markup"] = (df["Valor unitário"] - df["Preço de custo"]).round(2)
+    df["Data da venda"] = pd.to_datetime(df["Data da venda"], format="%d/%m/%Y")
+    for coluna in ["Quantidade do produto", "Código da categoria", "Código da Marca", "Quantidade estoque"]:
+        df[coluna] = df[coluna].astype(int)
+    df["Valor total produto"] = df["Quantidade do produto"] * df["Valor unitário"]
+    df["Valor da nota"] = df.groupby("Numero nota fiscal")["Valor total produto"].transform("sum")
+    for coluna in ["Quantidade do produto", "Valor unitário", "Preço de custo"]:
+        df = df[df[coluna] >= 0]
+    df = df[df["Preço de custo"] <= df["Valor unitário"]]
+    df = df[(df["Preço de custo"] > 0) & (df["Valor da nota"] > 0) & (df["Valor total produto"] > 0)]
+    return df.copy()
+
+
+def medir(funcao, repeticoes):
+    # Tempo: melhor de `repeticoes` sem rastreamento; memória: pico de uma execução sob tracemalloc
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, min(tempos), pico / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Limpeza: regras encadeadas x máscaras combinadas')
+    parser.add_argument('--estoque', default='bases/relatorio_produtos.xlsx')
+    parser.add_argument('--notas', default='bases/relatorio_notas.xlsx')
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    estoque = pd.read_excel(args.estoque)
+    notas = pd.concat(ler_excel_em_lotes(args.notas, colunas=NotasCleaner.COLUNAS_FINAIS))
+    estoque_limpo = EstoqueCleaner().clean(estoque)
+    notas_limpas = NotasCleaner().clean(notas)
+
+    etapas = {
+        'estoque': (lambda: _estoque_encadeado(estoque), lambda: EstoqueCleaner().clean(estoque)),
+        'notas': (lambda: _notas_encadeado(notas), lambda: NotasCleaner().clean(notas)),
+        'base mesclada': (lambda: _base_encadeada(estoque_limpo, notas_limpas),
+                          lambda: BasePreparador().preparar_base(estoque_limpo, notas_limpas)),
+    }
+
+    print(f"{'etapa':<14} {'encadeado':>10} {'pico':>9} {'combinado':>10} {'pico':>9} {'ganho':>6} {'igual':>6}")
+    for nome, (encadeado, combinado) in etapas.items():
+        antes, tempo_antes, pico_antes = medir(encadeado, args.repeticoes)
+        depois, tempo_depois, pico_depois = medir(combinado, args.repeticoes)
+        igual = antes.equals(depois) and antes.index.equals(depois.index)
+        print(f"{nome:<14} {tempo_antes * 1000:>8.1f}ms {pico_antes:>7.1f}MB "
+              f"{tempo_depois * 1000:>8.1f}ms {pico_depois:>7.1f}MB {tempo_antes / tempo_depois:>5.1f}x {str(igual):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# bench_motores.py
+# Tempo e pico de memória de cada motor de mineração (apriori, fpgrowth, contagem)
+# para vários valores de min_support, com pares e trios.
+
+import argparse
+import time
+import tracemalloc
+
+from main import carregar_base
+from mineracao import MOTORES
+from recomendador import RecomendadorCrossSelling
+
+
+def medir(funcao):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, duracao, pico / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dos motores de mineração')
+    parser.add_argument('--estoque', default='bases/relatorio_produtos.xlsx')
+    parser.add_argument('--notas', default='bases/relatorio_notas.xlsx')
+    parser.add_argument('--produtos', type=int, default=3, help='quantidade de produtos mais vendidos medidos')
+    parser.add_argument('--min-support', type=float, nargs='+', default=[0.005, 0.01, 0.05, 0.1])
+    parser.add_argument('--max-len', type=int, nargs='+', default=[2, 3])
+    args = parser.parse_args()
+
+    _, df_modelo = carregar_base(args.estoque, args.notas)
+    cross = RecomendadorCrossSelling(df_modelo)
+    mais_vendidos = df_modelo['Código produto'].value_counts().index[:args.produtos]
+
+    print(f"{'produto':>10} {'max_len':>7} {'min_support':>11} {'motor':>9} {'regras':>7} {'tempo ms':>9} {'pico MiB':>9}")
+    for cod_produto in mais_vendidos:
+        for max_len in args.max_len:
+            for min_support in args.min_support:
+                for motor in MOTORES:
+                    regras, duracao, pico = medir(
+                        lambda: cross.gerar_regras(cod_produto, min_support, 1.0, max_len, motor=motor)
+                    )
+                    print(f"{cod_produto:>10} {max_len:>7} {min_support:>11} {motor:>9} {len(regras):>7} "
+                          f"{duracao * 1000:>9.1f} {pico:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
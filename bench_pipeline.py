@@ -0,0 +1,177 @@
+# bench_pipeline.py
+# Tempo e pico de memória de cada etapa do pipeline sobre bases sintéticas (dados_sinteticos.py) de vários
+# tamanhos. Grava o resultado em JSON; com --comparar, aponta as etapas que pioraram em relação a um JSON anterior.
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from dados_sinteticos import gerar_bases
+from limpeza_base_mesclada import BasePreparador
+from limpeza_estoque import EstoqueCleaner
+from limpeza_notas import NotasCleaner
+from recomendador import RecomendadorCrossSelling
+from substitutos import RecomendadorSubstituto
+
+# Diferenças abaixo disso são ruído, qualquer que seja a variação relativa. Para o tempo, a diferença
+# também precisa passar de RUIDO_MAD vezes o desvio absoluto mediano das repetições (o maior das duas execuções)
+PISO_SEGUNDOS = 0.02
+RUIDO_MAD = 3
+PISO_MB = 1.0
+
+
+def medir(funcao, repeticoes: int):
+    # Tempo: mediana e desvio absoluto mediano de `repeticoes` sem rastreamento (uma execução mais lenta
+    # ou mais rápida por acaso não move a mediana); memória: pico de uma execução sob tracemalloc
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    mediana = float(np.median(tempos))
+    return resultado, mediana, float(np.median(np.abs(np.array(tempos) - mediana))), pico / 1024 ** 2
+
+
+def _latencias(funcao, codigos) -> dict:
+    tempos = []
+    for codigo in codigos:
+        inicio = time.perf_counter()
+        funcao(int(codigo))
+        tempos.append(time.perf_counter() - inicio)
+    tempos = np.array(tempos) * 1000
+    return {'p50_ms': round(float(np.percentile(tempos, 50)), 4), 'p95_ms': round(float(np.percentile(tempos, 95)), 4)}
+
+
+def medir_tamanho(n_linhas: int, args) -> list:
+    """Gera as bases com `n_linhas` itens de nota e mede cada etapa. Devolve um registro por etapa."""
+    df_estoque, df_notas = gerar_bases(n_linhas, args.produtos, args.semente)
+    print(f"[INFO] {n_linhas} linhas: {len(df_estoque)} produtos, {df_notas['Numero nota fiscal'].nunique()} notas")
+
+    registros = []
+
+    def etapa(nome, funcao, linhas_entrada):
+        resultado, segundos, desvio, pico = medir(funcao, args.repeticoes)
+        registro = {'linhas': n_linhas, 'etapa': nome, 'segundos': round(segundos, 6), 'desvio_segundos': round(desvio, 6),
+                    'pico_mb': round(pico, 3), 'linhas_entrada': linhas_entrada}
+        if isinstance(resultado, pd.DataFrame):
+            registro['linhas_saida'] = len(resultado)
+        registros.append(registro)
+        print(f"{n_linhas:>10} {nome:<40} {segundos * 1000:>10.1f}ms {pico:>9.1f}MB")
+        return resultado
+
+    estoque_limpo = etapa('EstoqueCleaner.clean', lambda: EstoqueCleaner().clean(df_estoque), len(df_estoque))
+    notas_limpas = etapa('NotasCleaner.clean', lambda: NotasCleaner().clean(df_notas), len(df_notas))
+    df_modelo = etapa('BasePreparador.preparar_base',
+                      lambda: BasePreparador().preparar_base(estoque_limpo, notas_limpas), len(notas_limpas))
+
+    # Consultas: produtos sorteados com a frequência de venda, como chegam de verdade
+    rng = np.random.default_rng(args.semente)
+    vendas = df_modelo['Código produto'].value_counts()
+    codigos = rng.choice(vendas.index.to_numpy(), args.consultas, p=(vendas / vendas.sum()).to_numpy())
+
+    substituto = etapa('RecomendadorSubstituto (índices)',
+                       lambda: RecomendadorSubstituto(df_modelo, verboso=False), len(df_modelo))
+    etapa('RecomendadorSubstituto.recomendar',
+          lambda: [substituto.recomendar(int(cod)) for cod in codigos], len(codigos))
+    registros[-1].update(_latencias(substituto.recomendar, codigos))
+
+    cross = etapa('RecomendadorCrossSelling (índice)', lambda: RecomendadorCrossSelling(df_modelo), len(df_modelo))
+    etapa('RecomendadorCrossSelling.gerar_regras',
+          lambda: [cross.gerar_regras(int(cod), args.min_support, max_len=args.max_len) for cod in codigos],
+          len(codigos))
+    registros[-1].update(_latencias(
+        lambda cod: cross.gerar_regras(cod, args.min_support, max_len=args.max_len), codigos))
+    return registros
+
+
+def comparar(atual: dict, anterior: dict, tolerancia: float, tolerancia_memoria: float) -> list:
+    """Etapas (mesmo tamanho e nome) que ficaram mais lentas ou usaram mais memória que no JSON anterior.
+
+    Compara as medianas de tempo: a piora tem de passar da tolerância, de PISO_SEGUNDOS e do ruído
+    medido nas duas execuções (RUIDO_MAD x desvio absoluto mediano; JSONs antigos não têm o desvio).
+    """
+    if atual['parametros'] != anterior['parametros']:
+        print(f"[AVISO] Parâmetros diferentes da execução anterior: {anterior['parametros']}")
+
+    base = {(r['linhas'], r['etapa']): r for r in anterior['resultados']}
+    regressoes = []
+    print(f"\n{'linhas':>10} {'etapa':<40} {'antes':>10} {'agora':>10} {'pico antes':>11} {'agora':>9}")
+    for registro in atual['resultados']:
+        antes = base.get((registro['linhas'], registro['etapa']))
+        if antes is None:
+            continue
+        ruido = RUIDO_MAD * max(registro.get('desvio_segundos', 0), antes.get('desvio_segundos', 0))
+        lento = (registro['segundos'] > antes['segundos'] * (1 + tolerancia)
+                 and registro['segundos'] - antes['segundos'] > max(PISO_SEGUNDOS, ruido))
+        pesado = (registro['pico_mb'] > antes['pico_mb'] * (1 + tolerancia_memoria)
+                  and registro['pico_mb'] - antes['pico_mb'] > PISO_MB)
+        marca = ' '.join(m for m, ruim in [('TEMPO', lento), ('MEMÓRIA', pesado)] if ruim)
+        print(f"{registro['linhas']:>10} {registro['etapa']:<40} {antes['segundos'] * 1000:>8.1f}ms "
+              f"{registro['segundos'] * 1000:>8.1f}ms {antes['pico_mb']:>9.1f}MB {registro['pico_mb']:>7.1f}MB  {marca}")
+        if marca:
+            regressoes.append({**registro, 'antes': antes, 'regressao': marca})
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do pipeline completo sobre bases sintéticas')
+    parser.add_argument('--linhas', type=int, nargs='+', default=[10_000, 100_000],
+                        help='tamanhos da base de notas (itens), de 10 mil a 5 milhões')
+    parser.add_argument('--produtos', type=int, default=None, help='padrão: um produto a cada 5 linhas (1 mil a 50 mil)')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--repeticoes', type=int, default=5, help='execuções de cada etapa; vale a mediana')
+    parser.add_argument('--consultas', type=int, default=200, help='consultas de recomendar/gerar_regras por tamanho')
+    parser.add_argument('--min-support', type=float, default=0.005)
+    parser.add_argument('--max-len', type=int, default=2)
+    parser.add_argument('--saida', default='saida/bench_pipeline.json')
+    parser.add_argument('--comparar', default=None, help='JSON de uma execução anterior')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='piora de tempo aceita (0.25 = 25%%)')
+    parser.add_argument('--tolerancia-memoria', type=float, default=0.10)
+    args = parser.parse_args()
+
+    parametros = {chave: getattr(args, chave) for chave in
+                  ['produtos', 'semente', 'repeticoes', 'consultas', 'min_support', 'max_len']}
+    print(f"{'linhas':>10} {'etapa':<40} {'tempo':>12} {'pico':>11}")
+    resultados = [registro for n_linhas in args.linhas for registro in medir_tamanho(n_linhas, args)]
+
+    relatorio = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': {
+            'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+            'plataforma': platform.platform(), 'cpus': os.cpu_count(),
+        },
+        'parametros': parametros,
+        'resultados': resultados,
+    }
+
+    regressoes = []
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            regressoes = comparar(relatorio, json.load(arquivo), args.tolerancia, args.tolerancia_memoria)
+        relatorio['comparado_com'] = args.comparar
+        relatorio['regressoes'] = regressoes
+
+    os.makedirs(os.path.dirname(args.saida) or '.', exist_ok=True)
+    with open(args.saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print(f"\n[INFO] Resultado gravado em {args.saida}")
+
+    if regressoes:
+        print(f"[ERRO] {len(regressoes)} etapa(s) pioraram além da tolerância")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
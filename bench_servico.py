@@ -0,0 +1,82 @@
+# bench_servico.py
+# Teste de carga do servico.py: vários terminais simultâneos, latência p50/p95/p99 e vazão.
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from main import carregar_base
+
+ROTAS = ('substitutos', 'cross-selling')
+
+
+def _terminal(url, caminhos, tempos, erros):
+    # Cada terminal mantém uma conexão persistente, como um caixa consultando o serviço
+    conexao = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    try:
+        for caminho in caminhos:
+            inicio = time.perf_counter()
+            conexao.request('GET', caminho)
+            resposta = conexao.getresponse()
+            resposta.read()
+            tempos.append(time.perf_counter() - inicio)
+            if resposta.status != 200:
+                erros.append(resposta.status)
+    finally:
+        conexao.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga do serviço de recomendação')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--estoque', default='bases/relatorio_produtos.xlsx')
+    parser.add_argument('--notas', default='bases/relatorio_notas.xlsx')
+    parser.add_argument('--requisicoes', type=int, default=2000, help='requisições por rota')
+    parser.add_argument('--terminais', type=int, default=8, help='clientes simultâneos')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--populares', action='store_true',
+                        help='sorteia códigos pelo número de vendas (repete os mais vendidos, como no balcão)')
+    args = parser.parse_args()
+    url = urlsplit(args.url)
+
+    # Códigos sorteados do mesmo catálogo que o serviço carregou
+    _, df_modelo = carregar_base(args.estoque, args.notas)
+    rng = np.random.default_rng(args.semente)
+    if args.populares:
+        codigos = rng.choice(df_modelo['Código produto'].to_numpy(), args.requisicoes)
+    else:
+        codigos = rng.choice(df_modelo['Código produto'].unique(), args.requisicoes)
+
+    for rota in ROTAS:
+        caminhos = [f'/{rota}/{int(codigo)}' for codigo in codigos]
+        tempos, erros = [], []
+        terminais = [
+            threading.Thread(target=_terminal, args=(url, caminhos[i::args.terminais], tempos, erros))
+            for i in range(args.terminais)
+        ]
+
+        inicio = time.perf_counter()
+        for terminal in terminais:
+            terminal.start()
+        for terminal in terminais:
+            terminal.join()
+        duracao = time.perf_counter() - inicio
+
+        tempos = np.array(tempos) * 1000
+        print(f"{rota:>14}: {len(tempos)} requisições, {args.terminais} terminais | "
+              f"p50 {np.percentile(tempos, 50):.2f} ms | p95 {np.percentile(tempos, 95):.2f} ms | "
+              f"p99 {np.percentile(tempos, 99):.2f} ms | {len(tempos) / duracao:.0f} req/s | erros {len(erros)}")
+
+    conexao = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    conexao.request('GET', '/estatisticas')
+    print(f"Cache do serviço: {json.loads(conexao.getresponse().read())}")
+    conexao.close()
+
+
+if __name__ == "__main__":
+    main()
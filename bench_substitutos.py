@@ -0,0 +1,63 @@
+# bench_substitutos.py
+# Latência por consulta de RecomendadorSubstituto.recomendar sobre o catálogo real.
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+
+from main import carregar_base
+from substitutos import RecomendadorSubstituto
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latência por consulta de RecomendadorSubstituto')
+    parser.add_argument('--estoque', default='bases/relatorio_produtos.xlsx')
+    parser.add_argument('--notas', default='bases/relatorio_notas.xlsx')
+    parser.add_argument('--consultas', type=int, default=2000)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--todos', action='store_true',
+                        help='compara recomendar_todos com o laço de recomendar sobre todos os produtos')
+    args = parser.parse_args()
+
+    _, df_modelo = carregar_base(args.estoque, args.notas)
+
+    inicio = time.perf_counter()
+    recomendador = RecomendadorSubstituto(df_modelo)
+    print(f"[INFO] Recomendador construído em {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    rng = np.random.default_rng(args.semente)
+    produtos = rng.choice(df_modelo['Código produto'].unique(), args.consultas)
+    categorias = rng.choice(df_modelo['Código da categoria'].unique(), args.consultas // 10)
+    invalidos = np.full(args.consultas // 10, -1)
+
+    for nome, codigos in [('produto', produtos), ('categoria', categorias), ('inválido', invalidos)]:
+        tempos = []
+        for codigo in codigos:
+            with contextlib.redirect_stdout(io.StringIO()):
+                inicio = time.perf_counter()
+                recomendador.recomendar(int(codigo))
+                tempos.append(time.perf_counter() - inicio)
+        tempos = np.array(tempos) * 1000
+        print(f"{nome:>10}: {len(tempos)} consultas | p50 {np.percentile(tempos, 50):.3f} ms | "
+              f"p95 {np.percentile(tempos, 95):.3f} ms | média {tempos.mean():.3f} ms")
+
+    if args.todos:
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for codigo in recomendador.df['Código produto']:
+                recomendador.recomendar(int(codigo))
+        tempo_laco = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        tabela = recomendador.recomendar_todos()
+        tempo_lote = time.perf_counter() - inicio
+
+        print(f"Laço recomendar ({len(recomendador.df)} produtos): {tempo_laco:.2f} s")
+        print(f"recomendar_todos ({len(tabela)} linhas): {tempo_lote:.3f} s ({tempo_laco / tempo_lote:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# busca_produtos.py
+# Busca de produtos pela descrição: índice invertido de palavras (prefixo) e de trigramas (aproximada).
+
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+COLUNAS_BUSCA = ['Código produto', 'Descrição do produto', 'Similaridade', 'Tipo']
+_SEPARADORES = re.compile(r'[^a-z0-9]+')
+
+
+def normalizar(texto) -> str:
+    """Minúsculas, sem acentos e só com letras, dígitos e espaços simples."""
+    sem_acentos = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii')
+    return _SEPARADORES.sub(' ', sem_acentos.lower()).strip()
+
+
+def trigramas(palavra: str) -> list:
+    """Trigramas da palavra com dois espaços antes e um depois, como no pg_trgm."""
+    marcada = f"  {palavra} "
+    return [marcada[i:i + 3] for i in range(len(marcada) - 2)]
+
+
+def _matriz_incidencia(linhas, colunas, n_linhas, n_colunas):
+    # Produto x termo (CSC): os produtos de um termo são uma fatia contígua de `indices`
+    matriz = sparse.csc_matrix(
+        (np.ones(len(linhas), dtype=bool), (np.asarray(linhas, dtype=np.int64), np.asarray(colunas, dtype=np.int64))),
+        shape=(n_linhas, n_colunas)
+    )
+    matriz.sum_duplicates()
+    return matriz
+
+
+def _linhas_das_colunas(matriz, colunas) -> np.ndarray:
+    """Linhas (com repetição) presentes em cada uma das colunas, lidas direto da estrutura CSC."""
+    partes = [matriz.indices[matriz.indptr[c]:matriz.indptr[c + 1]] for c in colunas]
+    return np.concatenate(partes) if partes else np.empty(0, dtype=np.int32)
+
+
+class IndiceDescricoes:
+    """Índice em memória sobre as descrições do catálogo, montado uma vez na carga.
+
+    A busca ignora acentos e maiúsculas. Primeiro vêm os produtos em que cada palavra digitada
+    é início de alguma palavra da descrição (busca por prefixo, para sugerir enquanto se digita);
+    depois, para tolerar erros de digitação, os que compartilham mais trigramas com o texto.
+    """
+
+    def __init__(self, produtos: pd.DataFrame, limiar: float = 0.5):
+        produtos = produtos.drop_duplicates('Código produto')
+        self.codigos = produtos['Código produto'].to_numpy()
+        self.descricoes = produtos['Descrição do produto'].astype(str).to_numpy()
+        self.limiar = limiar
+
+        palavras_produto = [normalizar(texto).split() for texto in produtos['Descrição do produto'].astype(object).fillna('')]
+
+        # Vocabulário ordenado: palavras com o mesmo prefixo ficam em um intervalo contíguo
+        self.vocabulario = sorted({palavra for palavras in palavras_produto for palavra in palavras})
+        posicao_palavra = {palavra: i for i, palavra in enumerate(self.vocabulario)}
+        self.trigrama = {}
+        linhas_p, colunas_p, linhas_t, colunas_t = [], [], [], []
+        for linha, palavras in enumerate(palavras_produto):
+            for palavra in palavras:
+                linhas_p.append(linha)
+                colunas_p.append(posicao_palavra[palavra])
+                for trigrama in trigramas(palavra):
+                    linhas_t.append(linha)
+                    colunas_t.append(self.trigrama.setdefault(trigrama, len(self.trigrama)))
+
+        n = len(self.codigos)
+        self.palavras = _matriz_incidencia(linhas_p, colunas_p, n, len(self.vocabulario))
+        self.trigramas = _matriz_incidencia(linhas_t, colunas_t, n, len(self.trigrama))
+        self.n_trigramas = np.diff(self.trigramas.tocsr().indptr)
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def buscar(self, texto: str, k: int = 10, limiar: float = None) -> pd.DataFrame:
+        """Os k produtos mais parecidos com `texto`, no formato de COLUNAS_BUSCA.
+
+        'Similaridade' é a fração dos trigramas do texto presentes na descrição (0 a 1). 'Tipo' é
+        'prefixo' quando todas as palavras digitadas iniciam palavras da descrição, ou 'aproximada'
+        quando a similaridade passa de `limiar`. Prefixos vêm antes, os com mais palavras exatas
+        primeiro; os empates vão para a maior similaridade e a descrição mais curta.
+        """
+        limiar = self.limiar if limiar is None else limiar
+        palavras = normalizar(texto).split()
+        if not palavras or k <= 0:
+            return pd.DataFrame(columns=COLUNAS_BUSCA)
+
+        n = len(self.codigos)
+        similaridade = self._similaridade(palavras)
+
+        # Prefixo: interseção, palavra a palavra, dos produtos com alguma palavra que comece por ela
+        candidatos = None
+        exatas = np.zeros(n, dtype=np.int64)
+        for palavra in palavras:
+            inicio = bisect.bisect_left(self.vocabulario, palavra)
+            fim = bisect.bisect_left(self.vocabulario, palavra + '\x7f', lo=inicio)
+            # Colunas do intervalo são contíguas na CSC: uma fatia só
+            produtos = np.unique(self.palavras.indices[self.palavras.indptr[inicio]:self.palavras.indptr[fim]])
+            candidatos = produtos if candidatos is None else np.intersect1d(candidatos, produtos, assume_unique=True)
+            if inicio < fim and self.vocabulario[inicio] == palavra:
+                exatas[_linhas_das_colunas(self.palavras, [inicio])] += 1
+
+        prefixo = np.zeros(n, dtype=bool)
+        prefixo[candidatos] = True
+        aproximada = np.flatnonzero(~prefixo & (similaridade >= limiar))
+
+        escolhidos = []
+        for posicoes, chaves in (
+            (candidatos, lambda p: (-exatas[p], -similaridade[p], self.n_trigramas[p])),
+            (aproximada, lambda p: (-similaridade[p], self.n_trigramas[p])),
+        ):
+            restante = k - sum(len(e) for e in escolhidos)
+            if restante <= 0 or len(posicoes) == 0:
+                continue
+            if len(posicoes) > restante:
+                # Pré-seleção pela chave principal antes de ordenar só os que podem entrar
+                principal = chaves(posicoes)[0]
+                corte = np.partition(principal, restante - 1)[restante - 1]
+                posicoes = posicoes[principal <= corte]
+            ordem = np.lexsort(tuple(reversed(chaves(posicoes))))
+            escolhidos.append(posicoes[ordem][:restante])
+
+        posicoes = np.concatenate(escolhidos) if escolhidos else np.empty(0, dtype=np.int64)
+        return pd.DataFrame({
+            'Código produto': self.codigos[posicoes],
+            'Descrição do produto': self.descricoes[posicoes],
+            'Similaridade': similaridade[posicoes].round(3),
+            'Tipo': np.where(prefixo[posicoes], 'prefixo', 'aproximada'),
+        })
+
+    def _similaridade(self, palavras) -> np.ndarray:
+        # Fração dos trigramas do texto que aparecem em cada descrição
+        consulta = {trigrama for palavra in palavras for trigrama in trigramas(palavra)}
+        colunas = [self.trigrama[t] for t in consulta if t in self.trigrama]
+        comuns = np.bincount(_linhas_das_colunas(self.trigramas, colunas), minlength=len(self.codigos))
+        return comuns / len(consulta)
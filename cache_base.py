@@ -0,0 +1,62 @@
+# cache_base.py
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+
+class CacheBase:
+    """Cache em Parquet das saídas de cada etapa (estoque limpo, notas limpas, df_modelo).
+
+    Cada entrada é identificada pelo hash dos arquivos de origem e pela versão do código
+    de limpeza; se qualquer um mudar, a etapa é refeita e a entrada antiga é descartada.
+    """
+
+    def __init__(self, pasta: str = "cache"):
+        self.pasta = Path(pasta)
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        self.arquivo_hashes = self.pasta / "arquivos.json"
+        self._hashes = json.loads(self.arquivo_hashes.read_text()) if self.arquivo_hashes.exists() else {}
+
+    def hash_arquivo(self, caminho: str) -> str:
+        """SHA-256 do arquivo; só é recalculado quando tamanho ou mtime mudam."""
+        caminho = os.path.abspath(caminho)
+        info = os.stat(caminho)
+        registro = self._hashes.get(caminho)
+        if registro and registro["tamanho"] == info.st_size and registro["mtime_ns"] == info.st_mtime_ns:
+            return registro["sha256"]
+
+        sha = hashlib.sha256()
+        with open(caminho, "rb") as arquivo:
+            for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+                sha.update(bloco)
+
+        self._hashes[caminho] = {"tamanho": info.st_size, "mtime_ns": info.st_mtime_ns, "sha256": sha.hexdigest()}
+        self.arquivo_hashes.write_text(json.dumps(self._hashes, indent=2))
+        return sha.hexdigest()
+
+    def chave(self, etapa: str, arquivos: list, versao) -> str:
+        partes = [etapa, str(versao)] + [self.hash_arquivo(caminho) for caminho in arquivos]
+        return hashlib.sha256("|".join(partes).encode()).hexdigest()[:16]
+
+    def contem(self, etapa: str, chave: str) -> bool:
+        return (self.pasta / f"{etapa}_{chave}.parquet").exists()
+
+    def obter(self, etapa: str, chave: str, gerar) -> pd.DataFrame:
+        """Lê a etapa do cache ou executa `gerar()` e grava o resultado."""
+        arquivo = self.pasta / f"{etapa}_{chave}.parquet"
+        if arquivo.exists():
+            print(f"[INFO] Cache de '{etapa}' encontrado ({arquivo.name}).")
+            return pd.read_parquet(arquivo)
+
+        df = gerar()
+        for antigo in self.pasta.glob(f"{etapa}_*.parquet"):
+            antigo.unlink()
+        temporario = arquivo.with_suffix(".tmp")
+        df.to_parquet(temporario)
+        os.replace(temporario, arquivo)
+        print(f"[INFO] Cache de '{etapa}' gravado ({arquivo.name}).")
+        return df
@@ -0,0 +1,133 @@
+# cache_consultas.py
+
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+
+
+class CacheConsultas:
+    """Cache LRU com validade (TTL) para respostas de recomendação.
+
+    Cada entrada registra as dependências de que a resposta depende (códigos de produto,
+    categorias...). `invalidar(*dependencias)` remove só as entradas ligadas a elas, em vez
+    de esvaziar o cache. Seguro para várias threads; a resposta guardada é compartilhada
+    entre as consultas e não deve ser alterada por quem a recebe.
+    """
+
+    def __init__(self, capacidade: int = 1024, ttl: float = 300.0, relogio=time.monotonic):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self._relogio = relogio
+        self._entradas = OrderedDict()          # chave -> (expira_em, valor, dependencias)
+        self._dependentes = defaultdict(set)    # dependência -> chaves que a usam
+        # Geração: sobe a cada invalidar/limpar; cada dependência guarda a geração da última invalidação.
+        # Só interessa a quem começou antes dela: com as gerações dos obter() em andamento, o registro
+        # é podado assim que a consulta mais antiga termina e não cresce num serviço de longa duração.
+        self._geracao = 0
+        self._invalidada_em = {}
+        self._em_andamento = Counter()          # geração no início do gerar() -> consultas em andamento
+        self._limpo_em = 0
+        self._trava = threading.Lock()
+        self.acertos = self.falhas = self.remocoes = self.expiradas = self.invalidadas = self.descartadas = 0
+
+    def obter(self, chave, gerar, dependencias=lambda valor: ()):
+        """Devolve o valor da chave ou executa `gerar()` e guarda com `dependencias(valor)`.
+
+        Se alguma dependência for invalidada enquanto `gerar()` roda, o valor é devolvido mas não
+        é guardado: pode ter sido montado com os dados de antes da mudança.
+        """
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                if entrada[0] > self._relogio():
+                    self._entradas.move_to_end(chave)
+                    self.acertos += 1
+                    return entrada[1]
+                self._remover(chave)
+                self.expiradas += 1
+            self.falhas += 1
+            geracao = self._geracao
+            self._em_andamento[geracao] += 1
+
+        # Calculado fora da trava: consultas de outras chaves não esperam por esta
+        try:
+            valor = gerar()
+            deps = set(dependencias(valor))
+        except BaseException:
+            with self._trava:
+                self._terminar(geracao)
+            raise
+
+        with self._trava:
+            invalidado = self._limpo_em > geracao or any(self._invalidada_em.get(dep, 0) > geracao for dep in deps)
+            self._terminar(geracao)
+            if invalidado:
+                self.descartadas += 1
+                return valor
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = (self._relogio() + self.ttl, valor, deps)
+            for dep in deps:
+                self._dependentes[dep].add(chave)
+            while len(self._entradas) > self.capacidade:
+                self._remover(next(iter(self._entradas)))
+                self.remocoes += 1
+        return valor
+
+    def invalidar(self, *dependencias) -> int:
+        """Remove as entradas que dependem de qualquer uma das dependências. Retorna quantas saíram."""
+        with self._trava:
+            self._geracao += 1
+            chaves = set()
+            for dep in dependencias:
+                if self._em_andamento:
+                    self._invalidada_em[dep] = self._geracao
+                chaves |= self._dependentes.get(dep, set())
+            for chave in chaves:
+                self._remover(chave)
+            self.invalidadas += len(chaves)
+            return len(chaves)
+
+    def limpar(self):
+        with self._trava:
+            self._geracao += 1
+            self._limpo_em = self._geracao
+            self._invalidada_em.clear()
+            self._entradas.clear()
+            self._dependentes.clear()
+
+    def _terminar(self, geracao):
+        # Chamado com a trava: tira a consulta das em andamento e poda as invalidações que
+        # nenhuma consulta ainda em andamento pode ter perdido (geração <= a da mais antiga)
+        self._em_andamento[geracao] -= 1
+        if self._em_andamento[geracao]:
+            return
+        del self._em_andamento[geracao]
+        if not self._em_andamento:
+            self._invalidada_em.clear()
+        elif geracao < min(self._em_andamento):
+            mais_antiga = min(self._em_andamento)
+            self._invalidada_em = {dep: ger for dep, ger in self._invalidada_em.items() if ger > mais_antiga}
+
+    def _remover(self, chave):
+        _, _, deps = self._entradas.pop(chave)
+        for dep in deps:
+            chaves = self._dependentes[dep]
+            chaves.discard(chave)
+            if not chaves:
+                del self._dependentes[dep]
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            consultas = self.acertos + self.falhas
+            return {
+                'entradas': len(self._entradas),
+                'capacidade': self.capacidade,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': round(self.acertos / consultas, 4) if consultas else 0.0,
+                'remocoes_lru': self.remocoes,
+                'expiradas': self.expiradas,
+                'invalidadas': self.invalidadas,
+                'descartadas': self.descartadas,
+            }
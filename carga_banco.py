@@ -0,0 +1,123 @@
+# carga_banco.py
+# Carga em massa das recomendações de todo o catálogo via COPY, com troca atômica das tabelas.
+
+import io
+import time
+from datetime import datetime
+
+import pandas as pd
+from psycopg2 import sql
+
+from banco import COLUNAS_BANCO, TABELAS, comandos_tabela, conexao
+from instrumentacao import etapa
+from tipos_compactos import valores_float64
+
+
+def linhas_substitutos(recomendador, tabela_todos: pd.DataFrame, agora=None) -> pd.DataFrame:
+    """Converte a saída de RecomendadorSubstituto.recomendar_todos para as colunas de produtos_substitutos.
+
+    Valores nas mesmas unidades de salvar_no_banco: preço com 2 casas e margem em %.
+    """
+    produtos = recomendador.df.set_index('Código produto')
+    pesquisado = produtos.loc[tabela_todos['Código pesquisado']]
+    recomendado = produtos.loc[tabela_todos['Código recomendado']]
+    return pd.DataFrame({
+        'produto_pesquisado_cod': tabela_todos['Código pesquisado'].astype(str).to_numpy(),
+        'produto_pesquisado_des': pesquisado['Descrição do produto'].to_numpy(),
+        'produto_recomendado_cod': tabela_todos['Código recomendado'].astype(str).to_numpy(),
+        'produto_recomendado_des': recomendado['Descrição do produto'].to_numpy(),
+        'valor_unitario': valores_float64(recomendado['Valor unitário']).round(2),
+        'margem_percentual': (valores_float64(recomendado['Margem %']) * 100).round(2),
+        'estoque': recomendado['Quantidade estoque'].astype(int).to_numpy(),
+        'categoria': recomendado['Categoria'].to_numpy(),
+        'posicao': tabela_todos['Posição'].to_numpy(),
+        'data_insersao': agora or datetime.now(),
+    })
+
+
+def linhas_associados(lote: pd.DataFrame, agora=None) -> pd.DataFrame:
+    """Converte uma parte de RecomendadorCrossSelling.gerar_lote para as colunas de produtos_associados.
+
+    Suporte e confiança em %, com 2 casas, como salvar_no_banco grava.
+    """
+    return pd.DataFrame({
+        'produto_pesquisado_cod': lote['Código pesquisado'].astype(str).to_numpy(),
+        'produto_pesquisado_des': lote['Descrição pesquisada'].to_numpy(),
+        'produto_associado_cod': lote['Código associado'].astype(str).to_numpy(),
+        'produto_associado_des': lote['Descrição associada'].to_numpy(),
+        'suporte': (lote['support'] * 100).round(2).to_numpy(),
+        'confianca': (lote['confidence'] * 100).round(2).to_numpy(),
+        'posicao': lote['Posição'].to_numpy(),
+        'data_insersao': agora or datetime.now(),
+    })
+
+
+def copiar(cur, tabela: str, df: pd.DataFrame, colunas: list, tamanho_lote: int = 100_000) -> int:
+    """Envia `df` para `tabela` com COPY FROM STDIN (CSV), em blocos de `tamanho_lote` linhas."""
+    comando = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+        sql.Identifier(tabela), sql.SQL(', ').join(map(sql.Identifier, colunas))
+    ).as_string(cur)
+    for inicio in range(0, len(df), tamanho_lote):
+        buffer = io.StringIO()
+        df[colunas].iloc[inicio:inicio + tamanho_lote].to_csv(buffer, header=False, index=False)
+        buffer.seek(0)
+        cur.copy_expert(comando, buffer)
+    return len(df)
+
+
+def _trocar_tabela(cur, tabela: str, carga: str):
+    # A tabela antiga sai e a de carga assume o nome, junto com seus índices e a sequência do id
+    cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(tabela)))
+    cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(carga), sql.Identifier(tabela)))
+    cur.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", (tabela,))
+    for (indice,) in cur.fetchall():
+        cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+            sql.Identifier(indice), sql.Identifier(indice.replace(carga, tabela, 1))
+        ))
+    cur.execute("SELECT pg_get_serial_sequence(%s, 'id')", (tabela,))
+    sequencia = cur.fetchone()[0]
+    if sequencia:
+        cur.execute(sql.SQL("ALTER SEQUENCE {} RENAME TO {}").format(
+            sql.SQL(sequencia), sql.Identifier(f"{tabela}_id_seq")
+        ))
+
+
+def carga_completa(partes_por_tabela: dict, config: dict = None) -> dict:
+    """Substitui o conteúdo das tabelas pelas partes recebidas ({tabela: iterável de DataFrames}).
+
+    Cada tabela é carregada em uma cópia `<tabela>_carga` (COPY, depois índices) e, só com todas
+    prontas, as cópias assumem o lugar das originais em uma única transação: quem lê vê o
+    conjunto antigo inteiro ou o novo inteiro. Retorna linhas carregadas por tabela.
+    """
+    totais = {}
+    inicio = time.perf_counter()
+    with conexao(config) as conn:
+        with conn.cursor() as cur:
+            for tabela, partes in partes_por_tabela.items():
+                if tabela not in TABELAS:
+                    raise ValueError(f"Tabela '{tabela}' desconhecida. Use uma de {tuple(TABELAS)}.")
+                carga = f"{tabela}_carga"
+                cur.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(carga)))
+                comandos = comandos_tabela(tabela, carga)
+                cur.execute(comandos[0])
+
+                inicio_tabela = time.perf_counter()
+                with etapa(f"COPY {tabela}") as medida:
+                    totais[tabela] = sum(copiar(cur, carga, parte, COLUNAS_BANCO[tabela]) for parte in partes)
+                    for comando in comandos[1:]:
+                        cur.execute(comando)
+                    medida.linhas_saida = totais[tabela]
+                duracao = time.perf_counter() - inicio_tabela
+                print(f"[INFO] {totais[tabela]} linhas copiadas para '{carga}' em {duracao:.2f} s "
+                      f"({totais[tabela] / max(duracao, 1e-9):,.0f} linhas/s).")
+        # Cópias gravadas; a troca fica em uma transação curta
+        conn.commit()
+
+        with etapa("troca das tabelas"), conn.cursor() as cur:
+            for tabela in partes_por_tabela:
+                _trocar_tabela(cur, tabela, f"{tabela}_carga")
+
+    duracao = time.perf_counter() - inicio
+    print(f"[INFO] Carga concluída: {sum(totais.values())} linhas em {duracao:.2f} s "
+          f"({sum(totais.values()) / max(duracao, 1e-9):,.0f} linhas/s).")
+    return totais
@@ -1,17 +1,21 @@
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
 import pandas as pd
+from datetime import datetime
+
+from banco import COLUNAS_BANCO, comando_upsert, obter_pool, remover_antigos
 
 class InserirDados:
-    def __init__(self, db_config):
-        """Configuração básica da conexão"""
+    def __init__(self, db_config=None):
+        """Configuração básica da conexão (None = variáveis de ambiente, ver banco.configuracao_banco)"""
         self.conn = None
         self.db_config = db_config
     
     def conectar(self):
-        """Estabelece conexão com o banco"""
+        """Empresta uma conexão do pool compartilhado"""
         try:
-            self.conn = psycopg2.connect(**self.db_config)
+            self.conn = obter_pool(self.db_config).getconn()
             print("Conexão estabelecida!")
             return True
         except Exception as e:
@@ -19,9 +23,10 @@ class InserirDados:
             return False
     
     def desconectar(self):
-        """Fecha a conexão"""
+        """Devolve a conexão ao pool"""
         if self.conn:
-            self.conn.close()
+            obter_pool(self.db_config).putconn(self.conn)
+            self.conn = None
             print("Conexão encerrada.")
 
     def inserir_substitutos(self, produto_pesquisado, substitutos):
@@ -33,14 +38,8 @@ class InserirDados:
         """
         try:
             with self.conn.cursor() as cursor:
-                query = """
-                INSERT INTO produtos_substitutos (
-                    produto_pesquisado_cod, produto_pesquisado_des,
-                    produto_recomendado_cod, produto_recomendado_des,
-                    valor_unitario, margem_percentual, estoque, categoria
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                
+                # Upsert pelo par (pesquisado, recomendado); a ordem da lista vira a posição
+                agora = datetime.now()
                 dados = [(
                     produto_pesquisado['codigo'],
                     produto_pesquisado['descricao'],
@@ -49,12 +48,15 @@ class InserirDados:
                     item['valor_unitario'],
                     item['margem_percentual'],
                     item['estoque'],
-                    item['categoria']
-                ) for item in substitutos]
+                    item['categoria'],
+                    posicao,
+                    agora
+                ) for posicao, item in enumerate(substitutos, start=1)]
                 
-                cursor.executemany(query, dados)
+                execute_values(cursor, comando_upsert('produtos_substitutos', COLUNAS_BANCO['produtos_substitutos']), dados)
+                remover_antigos(cursor, 'produtos_substitutos', produto_pesquisado['codigo'], [item['codigo'] for item in substitutos])
                 self.conn.commit()
-                print(f"{len(substitutos)} substitutos inseridos!")
+                print(f"{len(substitutos)} substitutos gravados!")
                 return True
                 
         except Exception as e:
@@ -71,26 +73,22 @@ class InserirDados:
         """
         try:
             with self.conn.cursor() as cursor:
-                query = """
-                INSERT INTO produtos_associados (
-                    produto_pesquisado_cod, produto_pesquisado_des,
-                    produto_associado_cod, produto_associado_des,
-                    suporte, confianca
-                ) VALUES (%s, %s, %s, %s, %s, %s)
-                """
-                
+                agora = datetime.now()
                 dados = [(
                     produto_pesquisado['codigo'],
                     produto_pesquisado['descricao'],
                     item['codigo'],
                     item['descricao'],
                     item['suporte'],
-                    item['confianca']
-                ) for item in associados]
+                    item['confianca'],
+                    posicao,
+                    agora
+                ) for posicao, item in enumerate(associados, start=1)]
                 
-                cursor.executemany(query, dados)
+                execute_values(cursor, comando_upsert('produtos_associados', COLUNAS_BANCO['produtos_associados']), dados)
+                remover_antigos(cursor, 'produtos_associados', produto_pesquisado['codigo'], [item['codigo'] for item in associados])
                 self.conn.commit()
-                print(f"{len(associados)} associados inseridos!")
+                print(f"{len(associados)} associados gravados!")
                 return True
                 
         except Exception as e:
@@ -101,14 +99,8 @@ class InserirDados:
 
 # Exemplo de uso
 if __name__ == "__main__":
-    # Configuração do banco (substitua com seus dados)
-    config = {
-        'dbname': 'bd_recomenda',
-        'user': 'postgres',
-        'password': 'recomenda',
-        'host': 'localhost',
-        'port': '5432'
-    }
+    # Configuração do banco vem do ambiente (PGHOST, PGPORT, PGDATABASE, PGUSER, PGPASSWORD)
+    config = None
 
     # Dados de exemplo
     produto = {'codigo': 'P001', 'descricao': 'Martelo'}
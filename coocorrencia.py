@@ -0,0 +1,409 @@
+# coocorrencia.py
+
+import math
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+COLUNAS_REGRAS = [
+    'antecedents', 'consequents', 'antecedent support', 'consequent support',
+    'support', 'confidence', 'lift'
+]
+COLUNAS_ASSOCIADOS = [
+    'Código associado', 'antecedent support', 'consequent support',
+    'support', 'confidence', 'lift'
+]
+
+
+def contagem_minima(min_support: float, n_notas: int) -> int:
+    """Converte o suporte mínimo relativo em número mínimo de notas."""
+    return max(1, math.ceil(min_support * n_notas - 1e-9))
+
+
+def regras_vazias() -> pd.DataFrame:
+    """DataFrame de regras sem linhas, já com as colunas numéricas tipadas."""
+    regras = pd.DataFrame({coluna: pd.Series(dtype=float) for coluna in COLUNAS_REGRAS})
+    return regras.astype({'antecedents': object, 'consequents': object})
+
+
+def matriz_transacoes(df: pd.DataFrame, dtype=bool):
+    """Codifica as notas como matriz esparsa CSR nota x produto, sem passar por uma matriz densa.
+
+    Retorna a matriz e o array de códigos de produto correspondente a cada coluna.
+    """
+    # Um produto conta uma única vez por nota, mesmo que apareça em várias linhas
+    pares = df[['Numero nota fiscal', 'Código produto']].drop_duplicates()
+    notas_idx, notas = pd.factorize(pares['Numero nota fiscal'])
+    produtos_idx, codigos = pd.factorize(pares['Código produto'], sort=True)
+
+    matriz = sparse.csr_matrix(
+        (np.ones(len(pares), dtype=dtype), (notas_idx, produtos_idx)),
+        shape=(len(notas), len(codigos))
+    )
+    return matriz, np.asarray(codigos, dtype=np.int64)
+
+
+def dataframe_esparso(matriz) -> pd.DataFrame:
+    """DataFrame com SparseDtype (colunas posicionais) no formato aceito pelo mlxtend."""
+    with warnings.catch_warnings():
+        # pandas avisa sobre o fill_value 0 em colunas booleanas vindas de scipy
+        warnings.simplefilter('ignore', FutureWarning)
+        return pd.DataFrame.sparse.from_spmatrix(matriz)
+
+
+def onehot_esparso(df: pd.DataFrame):
+    """One-hot esparso das notas de df e os códigos de produto de cada coluna."""
+    matriz, codigos = matriz_transacoes(df)
+    return dataframe_esparso(matriz), codigos
+
+
+def _redimensionar(matriz, n_colunas: int, n_linhas=None):
+    """Amplia a matriz (CSR ou CSC) com colunas/linhas vazias no fim, sem copiar os dados."""
+    n_linhas = matriz.shape[0] if n_linhas is None else n_linhas
+    if matriz.shape == (n_linhas, n_colunas):
+        return matriz
+    if sparse.isspmatrix_csr(matriz):
+        indptr = np.pad(matriz.indptr, (0, n_linhas - matriz.shape[0]), mode='edge')
+        return sparse.csr_matrix((matriz.data, matriz.indices, indptr), shape=(n_linhas, n_colunas))
+    indptr = np.pad(matriz.indptr, (0, n_colunas - matriz.shape[1]), mode='edge')
+    return sparse.csc_matrix((matriz.data, matriz.indices, indptr), shape=(n_linhas, n_colunas))
+
+
+class IndiceCoocorrencia:
+    """Contagens de coocorrência produto x produto, mantidas de forma incremental.
+
+    As notas e as contagens de pares ficam em blocos: cada carga de notas novas vira um
+    bloco e blocos vizinhos de tamanho parecido são fundidos (como numa LSM-tree). Assim o
+    custo de uma atualização acompanha o tamanho das notas novas, não o do histórico.
+    """
+
+    def __init__(self, df: pd.DataFrame = None):
+        self.codigos = np.empty(0, dtype=np.int64)
+        self.posicao = {}
+        self.n_notas = 0
+        self.contagem_produto = np.empty(0, dtype=np.int64)
+        self.notas_vistas = set()
+        # Blocos nota x produto (CSC) e produto x produto (CSR), do mais antigo ao mais novo
+        self.blocos_notas = []
+        self.blocos_pares = []
+
+        if df is not None:
+            self.atualizar(df)
+
+    def atualizar(self, df: pd.DataFrame) -> int:
+        """Soma às contagens as notas de df ainda não vistas. Retorna quantas notas novas entraram."""
+        numeros = df['Numero nota fiscal'].unique()
+        novos_numeros = [numero for numero in numeros if numero not in self.notas_vistas]
+        if not novos_numeros:
+            return 0
+        if len(novos_numeros) < len(numeros):
+            df = df[df['Numero nota fiscal'].isin(novos_numeros)]
+
+        matriz, codigos = matriz_transacoes(df, dtype=np.int32)
+
+        # Produtos inéditos ganham posição no fim do vocabulário
+        for cod in codigos:
+            cod = int(cod)
+            if cod not in self.posicao:
+                self.posicao[cod] = len(self.posicao)
+        novos_codigos = [int(cod) for cod in codigos if self.posicao[int(cod)] >= len(self.codigos)]
+        self.codigos = np.concatenate([self.codigos, np.asarray(novos_codigos, dtype=np.int64)])
+        n_produtos = len(self.codigos)
+
+        # Colunas locais da carga -> posições globais
+        posicoes = np.array([self.posicao[int(cod)] for cod in codigos], dtype=np.int64)
+        matriz = sparse.csr_matrix(
+            (matriz.data, posicoes[matriz.indices], matriz.indptr),
+            shape=(matriz.shape[0], n_produtos)
+        )
+        matriz.sort_indices()
+
+        self.contagem_produto = np.pad(self.contagem_produto, (0, n_produtos - len(self.contagem_produto)))
+        self.contagem_produto += np.asarray(matriz.sum(axis=0)).ravel().astype(np.int64)
+
+        # Matriz produto x produto com o número de notas em que cada par aparece junto
+        pares = (matriz.T @ matriz).tocsr()
+        pares.setdiag(0)
+        pares.eliminate_zeros()
+
+        self._empilhar(self.blocos_notas, matriz.astype(bool).tocsc(),
+                       lambda antigo, novo: sparse.vstack([_redimensionar(antigo, n_produtos), novo], format='csc'))
+        self._empilhar(self.blocos_pares, pares,
+                       lambda antigo, novo: (_redimensionar(antigo, n_produtos, n_produtos) + novo).tocsr())
+
+        self.n_notas += matriz.shape[0]
+        self.notas_vistas.update(novos_numeros)
+        return len(novos_numeros)
+
+    @classmethod
+    def somar(cls, indices) -> 'IndiceCoocorrencia':
+        """Índice com as contagens somadas de vários índices (ex.: partições mensais), sem reler as notas.
+
+        O vocabulário sai em ordem de código, como num índice montado de uma vez. As notas de cada
+        índice são consideradas distintas: o mesmo número de nota não deve estar em dois deles.
+        """
+        indices = [indice for indice in indices if indice.n_notas]
+        somado = cls()
+        if not indices:
+            return somado
+
+        codigos = np.unique(np.concatenate([indice.codigos for indice in indices]))
+        n_produtos = len(codigos)
+        somado.codigos = codigos
+        somado.posicao = {int(cod): i for i, cod in enumerate(codigos)}
+        somado.contagem_produto = np.zeros(n_produtos, dtype=np.int64)
+
+        linhas, colunas, contagens, blocos_notas = [], [], [], []
+        for indice in indices:
+            # Posições do índice -> posições no vocabulário somado
+            mapa = np.searchsorted(codigos, indice.codigos)
+            somado.contagem_produto[mapa] += indice.contagem_produto
+            for bloco in indice.blocos_pares:
+                bloco = bloco.tocoo()
+                linhas.append(mapa[bloco.row])
+                colunas.append(mapa[bloco.col])
+                contagens.append(bloco.data.astype(np.int64))
+            for bloco in indice.blocos_notas:
+                bloco = bloco.tocoo()
+                blocos_notas.append(sparse.csc_matrix((bloco.data, (bloco.row, mapa[bloco.col])),
+                                                      shape=(bloco.shape[0], n_produtos)))
+            somado.n_notas += indice.n_notas
+            somado.notas_vistas.update(indice.notas_vistas)
+
+        # Pares repetidos entre os índices são somados na conversão para CSR
+        somado.blocos_pares = [sparse.coo_matrix(
+            (np.concatenate(contagens), (np.concatenate(linhas), np.concatenate(colunas))),
+            shape=(n_produtos, n_produtos)
+        ).tocsr()]
+        somado.blocos_notas = [sparse.vstack(blocos_notas, format='csc')]
+        return somado
+
+    @staticmethod
+    def _empilhar(blocos: list, novo, fundir):
+        blocos.append(novo)
+        # Funde enquanto o bloco anterior não for bem maior que o último
+        while len(blocos) > 1 and blocos[-2].nnz <= 2 * blocos[-1].nnz:
+            ultimo = blocos.pop()
+            blocos[-1] = fundir(blocos[-1], ultimo)
+
+    def vizinhos(self, cod_produto: int):
+        """Retorna (posições, contagens conjuntas) dos produtos que já saíram na mesma nota que cod_produto."""
+        pos = self.posicao.get(int(cod_produto))
+        if pos is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        indices, contagens = [], []
+        for bloco in self.blocos_pares:
+            if pos >= bloco.shape[0]:
+                continue
+            inicio, fim = bloco.indptr[pos], bloco.indptr[pos + 1]
+            indices.append(bloco.indices[inicio:fim])
+            contagens.append(bloco.data[inicio:fim])
+
+        if len(indices) == 1:
+            return indices[0], contagens[0].astype(np.int64)
+        if not indices:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        # Soma as contagens do mesmo par vindas de blocos diferentes
+        indices, inverso = np.unique(np.concatenate(indices), return_inverse=True)
+        return indices, np.bincount(inverso, weights=np.concatenate(contagens)).astype(np.int64)
+
+    def notas_com(self, cod_produto: int) -> np.ndarray:
+        """Posições globais das notas que contêm cod_produto."""
+        pos = self.posicao.get(int(cod_produto))
+        if pos is None:
+            return np.empty(0, dtype=np.int64)
+
+        linhas, deslocamento = [], 0
+        for bloco in self.blocos_notas:
+            if pos < bloco.shape[1]:
+                linhas.append(bloco.indices[bloco.indptr[pos]:bloco.indptr[pos + 1]].astype(np.int64) + deslocamento)
+            deslocamento += bloco.shape[0]
+        return np.concatenate(linhas) if linhas else np.empty(0, dtype=np.int64)
+
+    def submatriz_notas(self, cod_produto: int):
+        """Matriz CSR (notas que contêm cod_produto) x (todos os produtos)."""
+        pos = self.posicao.get(int(cod_produto))
+        partes = []
+        for bloco in self.blocos_notas:
+            if pos is None or pos >= bloco.shape[1]:
+                continue
+            linhas = bloco.indices[bloco.indptr[pos]:bloco.indptr[pos + 1]]
+            partes.append(_redimensionar(bloco[linhas, :].tocsr(), len(self.codigos)))
+        if not partes:
+            return sparse.csr_matrix((0, len(self.codigos)), dtype=bool)
+        return sparse.vstack(partes, format='csr')
+
+    def contar(self, itemset) -> int:
+        """Número de notas que contêm todos os produtos do itemset."""
+        codigos = [int(cod) for cod in itemset]
+        posicoes = [self.posicao.get(cod) for cod in codigos]
+        if not posicoes or None in posicoes:
+            return 0
+        if len(posicoes) == 1:
+            return int(self.contagem_produto[posicoes[0]])
+        if len(posicoes) == 2:
+            indices, contagens = self.vizinhos(codigos[0])
+            encontrado = contagens[indices == posicoes[1]]
+            return int(encontrado[0]) if len(encontrado) else 0
+
+        linhas = self.notas_com(codigos[0])
+        for cod in codigos[1:]:
+            linhas = np.intersect1d(linhas, self.notas_com(cod), assume_unique=True)
+        return len(linhas)
+
+    def metricas(self, cod_produto: int, min_support=0.0, min_threshold=1.0, n=None) -> dict:
+        """Arrays da regra cod_produto -> B (uma posição por produto B), ordenados por lift e suporte.
+
+        `min_support` é a fração mínima das notas de cod_produto que também trazem B (como na mineração
+        feita só sobre as notas do produto); as métricas devolvidas são sobre todas as notas.
+        Com `n`, devolve só os n primeiros. As chaves seguem COLUNAS_ASSOCIADOS.
+        """
+        indices, conjunta = self.vizinhos(cod_produto)
+        if len(indices) == 0 or self.n_notas == 0:
+            vazio = {coluna: np.empty(0) for coluna in COLUNAS_ASSOCIADOS}
+            vazio['Código associado'] = np.empty(0, dtype=np.int64)
+            return vazio
+
+        n_notas = self.n_notas
+        cont_a = self.contagem_produto[self.posicao[int(cod_produto)]]
+        cont_b = self.contagem_produto[indices]
+
+        suporte = conjunta / n_notas
+        lift = conjunta * n_notas / (cont_a * cont_b)
+        manter = np.flatnonzero((conjunta >= contagem_minima(min_support, cont_a)) & (lift >= min_threshold))
+
+        # lexsort ordena pela última chave primeiro; o sinal negativo inverte para decrescente.
+        # Empates de lift e suporte ficam na ordem do código, não da posição no vocabulário
+        # (que depende da ordem em que os produtos entraram no índice)
+        ordem = manter[np.lexsort((self.codigos[indices[manter]], -suporte[manter], -lift[manter]))][:n]
+        return {
+            'Código associado': self.codigos[indices[ordem]],
+            'antecedent support': np.full(len(ordem), cont_a / n_notas),
+            'consequent support': cont_b[ordem] / n_notas,
+            'support': suporte[ordem],
+            'confidence': conjunta[ordem] / cont_a,
+            'lift': lift[ordem],
+        }
+
+    def associados(self, cod_produto: int, min_support=0.0, min_threshold=1.0, n=None) -> pd.DataFrame:
+        """Métricas da regra cod_produto -> B para cada produto B associado, ordenadas por lift e suporte."""
+        return pd.DataFrame(self.metricas(cod_produto, min_support, min_threshold, n), columns=COLUNAS_ASSOCIADOS)
+
+    def regras(self, cod_produto: int, min_support=0.0, min_threshold=1.0) -> pd.DataFrame:
+        """Regras de par (A -> B e B -> A) envolvendo cod_produto, com os limiares aplicados na consulta."""
+        associados = self.associados(cod_produto, min_support, min_threshold)
+        if associados.empty:
+            return regras_vazias()
+
+        produto = frozenset([int(cod_produto)])
+        outros = [frozenset([int(cod)]) for cod in associados['Código associado']]
+
+        ida = pd.DataFrame({
+            'antecedents': [produto] * len(outros),
+            'consequents': outros,
+            'antecedent support': associados['antecedent support'],
+            'consequent support': associados['consequent support'],
+            'support': associados['support'],
+            'confidence': associados['confidence'],
+            'lift': associados['lift'],
+        })
+        volta = pd.DataFrame({
+            'antecedents': outros,
+            'consequents': [produto] * len(outros),
+            'antecedent support': associados['consequent support'],
+            'consequent support': associados['antecedent support'],
+            'support': associados['support'],
+            'confidence': associados['support'] / associados['consequent support'],
+            'lift': associados['lift'],
+        })
+
+        # Cada par fica com a regra de ida seguida da regra de volta
+        regras = pd.concat([ida, volta]).sort_index(kind='stable')
+        return regras.reset_index(drop=True)
+
+
+class IndiceMensal:
+    """Contagens de coocorrência particionadas pelo mês de `Data da venda`.
+
+    Cada mês é um IndiceCoocorrencia próprio, então notas novas só mexem nas partições dos seus
+    meses. Uma consulta por período soma as contagens das partições (IndiceCoocorrencia.somar),
+    sem voltar às notas; as últimas janelas somadas ficam guardadas até uma de suas partições mudar.
+    """
+
+    def __init__(self, df: pd.DataFrame = None, janelas_guardadas: int = 8):
+        self.particoes = {}  # pd.Period mensal -> IndiceCoocorrencia
+        self.janelas_guardadas = janelas_guardadas
+        self._janelas = OrderedDict()  # tupla de meses -> IndiceCoocorrencia somado
+        self._trava = threading.Lock()
+
+        if df is not None:
+            self.atualizar(df)
+
+    @property
+    def meses(self) -> list:
+        return sorted(self.particoes)
+
+    def atualizar(self, df: pd.DataFrame) -> int:
+        """Soma as notas de df às partições dos seus meses. Retorna quantas notas novas entraram.
+
+        A nota inteira vai para o mês da sua primeira data; nota já vista naquele mês é ignorada.
+        """
+        datas = pd.to_datetime(df['Data da venda'])
+        meses = datas.groupby(df['Numero nota fiscal']).transform('min').dt.to_period('M')
+
+        adicionadas, alterados = 0, set()
+        for mes, parte in df.groupby(meses, sort=True):
+            particao = self.particoes.setdefault(mes, IndiceCoocorrencia())
+            novas = particao.atualizar(parte)
+            if novas:
+                adicionadas += novas
+                alterados.add(mes)
+
+        if alterados:
+            with self._trava:
+                for meses_janela in [chave for chave in self._janelas if alterados.intersection(chave)]:
+                    del self._janelas[meses_janela]
+        return adicionadas
+
+    def janela(self, inicio=None, fim=None) -> IndiceCoocorrencia:
+        """Contagens das notas de `inicio` a `fim` (datas ou 'AAAA-MM', inclusive, arredondadas ao mês).
+
+        Sem `inicio` ou `fim`, o período fica aberto daquele lado.
+        """
+        inicio = None if inicio is None else pd.Period(inicio, freq='M')
+        fim = None if fim is None else pd.Period(fim, freq='M')
+        meses = tuple(
+            mes for mes in self.meses
+            if (inicio is None or mes >= inicio) and (fim is None or mes <= fim)
+        )
+        return self._somar(meses)
+
+    def ultimos_meses(self, n: int, ate=None) -> IndiceCoocorrencia:
+        """Contagens dos `n` meses corridos terminando em `ate` (padrão: o último mês com notas)."""
+        if n < 1:
+            raise ValueError("ultimos_meses deve ser pelo menos 1.")
+        if ate is None and not self.particoes:
+            return IndiceCoocorrencia()
+        fim = pd.Period(ate, freq='M') if ate is not None else max(self.particoes)
+        return self.janela(fim - (n - 1), fim)
+
+    def _somar(self, meses: tuple) -> IndiceCoocorrencia:
+        if len(meses) == 1:
+            return self.particoes[meses[0]]
+        with self._trava:
+            if meses in self._janelas:
+                self._janelas.move_to_end(meses)
+                return self._janelas[meses]
+
+        somado = IndiceCoocorrencia.somar([self.particoes[mes] for mes in meses])
+        with self._trava:
+            self._janelas[meses] = somado
+            while len(self._janelas) > self.janelas_guardadas:
+                self._janelas.popitem(last=False)
+        return somado
@@ -0,0 +1,213 @@
+# dados_sinteticos.py
+# Bases de estoque e notas sintéticas, com as mesmas colunas e tipos das exportações lidas por main.py,
+# para medir o pipeline em tamanhos que a base de desenvolvimento não tem (ver bench_pipeline.py).
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Limite de linhas de uma planilha .xlsx (fora o cabeçalho)
+MAX_LINHAS_XLSX = 1_048_575
+
+_TIPOS = [
+    "CANETA", "LAPIS", "CADERNO", "BORRACHA", "COLA", "TESOURA", "PAPEL", "PASTA", "MARCADOR",
+    "APONTADOR", "REGUA", "ESTOJO", "AGENDA", "ENVELOPE", "GIZ", "TINTA", "PINCEL", "FITA",
+    "CLIPS", "GRAMPO", "BLOCO", "ETIQUETA", "CARTOLINA", "MOCHILA", "CALCULADORA", "BALAO",
+]
+_VARIANTES = ["AZUL", "PRETO", "VERMELHO", "COLORIDO", "A4", "OFICIO", "10 MAT", "PEQ", "GDE", "NEON", "KRAFT", "ESCOLAR"]
+_SILABAS = ["MA", "RI", "TO", "CA", "SE", "LU", "BE", "NO", "PA", "DI", "GE", "VO", "FA", "TI", "RA", "ZE"]
+_EMBALAGENS = [("CX/1", "CX"), ("PC/1", "PC"), ("UN/1", "UN"), ("CX/12", "CX"), ("PT/10", "PT")]
+
+# Sujeira injetada para exercitar as regras dos cleaners (frações das linhas)
+SUJEIRA = {
+    "descricao_repetida": 0.005,  # produto com a descrição de outro (EstoqueCleaner e NotasCleaner descartam)
+    "categoria_repetida": 0.01,   # categoria com o nome de outra e código diferente
+    "estoque_negativo": 0.01,
+    "estoque_nulo": 0.05,
+    "custo_nulo": 0.01,
+    "quantidade_zerada": 0.002,   # condena a nota inteira (NotasCleaner)
+    "valor_zerado": 0.001,
+}
+
+
+def _nome_marca(rng: np.random.Generator, codigo: int) -> str:
+    silabas = rng.choice(_SILABAS, rng.integers(2, 4))
+    return f"{''.join(silabas)} DISTRIB. {codigo} LTDA"
+
+
+def gerar_estoque(n_produtos: int = 20_000, n_categorias: int = None, n_marcas: int = None,
+                  semente: int = 0, sujeira: bool = True) -> pd.DataFrame:
+    """Relatório de produtos como o de `pd.read_excel('bases/relatorio_produtos.xlsx')`.
+
+    Cada categoria tem um preço típico e um conjunto próprio de marcas (hierarquia
+    categoria -> marca -> produto); o tamanho das categorias é assimétrico.
+    """
+    rng = np.random.default_rng(semente)
+    n_categorias = n_categorias or max(10, n_produtos // 40)
+    n_marcas = n_marcas or max(5, n_produtos // 60)
+
+    # Categorias: nome "TIPO VARIANTE ( SIGLA )", tamanho ~ Zipf e preço típico lognormal
+    tipos = rng.integers(0, len(_TIPOS), n_categorias)
+    variantes = rng.integers(0, len(_VARIANTES), n_categorias)
+    nomes_categoria = np.array([
+        f"{_TIPOS[t]} {_VARIANTES[v]} {c} ( {_TIPOS[t][:3]}{c} )" for c, (t, v) in enumerate(zip(tipos, variantes), 1)
+    ], dtype=object)
+    peso_categoria = 1 / np.arange(1, n_categorias + 1) ** 0.8
+    preco_categoria = rng.lognormal(np.log(8), 0.9, n_categorias)
+
+    # Marcas por categoria: de 2 a 12, sorteadas do cadastro de marcas
+    nomes_marca = np.array([_nome_marca(rng, m) for m in range(1, n_marcas + 1)], dtype=object)
+    marcas_categoria = [rng.choice(n_marcas, min(n_marcas, rng.integers(2, 13)), replace=False)
+                        for _ in range(n_categorias)]
+
+    categoria = rng.choice(n_categorias, n_produtos, p=peso_categoria / peso_categoria.sum())
+    marca = np.array([rng.choice(marcas_categoria[c]) for c in categoria])
+    embalagem = rng.integers(0, len(_EMBALAGENS), n_produtos)
+    codigos = np.arange(1, n_produtos + 1)
+
+    descricao = np.array([
+        f"{_TIPOS[tipos[c]]} {_VARIANTES[rng.integers(len(_VARIANTES))]} {nomes_marca[m].split()[0]} REF{cod}"
+        for cod, c, m in zip(codigos, categoria, marca)
+    ], dtype=object)
+    custo = np.round(preco_categoria[categoria] * rng.lognormal(0, 0.35, n_produtos), 4)
+    estoque = rng.poisson(rng.choice([0, 5, 40], n_produtos, p=[0.2, 0.5, 0.3])).astype(float)
+
+    df = pd.DataFrame({
+        "Código": codigos,
+        "Produto": descricao,
+        "Embalagem": [_EMBALAGENS[e][0] for e in embalagem],
+        "Unidade": [_EMBALAGENS[e][1] for e in embalagem],
+        "Código da Marca": marca + 1,
+        "Marca": nomes_marca[marca],
+        "Quantidade estoque": estoque,
+        "Preço de custo": custo,
+        "Código da categoria": categoria + 1,
+        "Categoria": nomes_categoria[categoria],
+    })
+
+    if sujeira:
+        def sorteio(chave):
+            return rng.random(n_produtos) < SUJEIRA[chave]
+
+        repetida = np.flatnonzero(sorteio("descricao_repetida"))
+        df.loc[repetida, "Produto"] = df["Produto"].to_numpy()[rng.integers(0, n_produtos, len(repetida))]
+        categorias_repetidas = rng.choice(n_categorias, max(1, int(n_categorias * SUJEIRA["categoria_repetida"])), replace=False)
+        outra = rng.integers(0, n_categorias, len(categorias_repetidas))
+        for c, o in zip(categorias_repetidas, outra):
+            if c != o:
+                df.loc[df["Código da categoria"] == c + 1, "Categoria"] = nomes_categoria[o]
+        negativo = sorteio("estoque_negativo")
+        df.loc[negativo, "Quantidade estoque"] = -rng.integers(1, 10, negativo.sum())
+        df.loc[sorteio("estoque_nulo"), "Quantidade estoque"] = np.nan
+        df.loc[sorteio("custo_nulo"), "Preço de custo"] = np.nan
+    return df
+
+
+def gerar_notas(df_estoque: pd.DataFrame, n_linhas: int = 100_000, semente: int = 0, inicio: str = "2024-01-01",
+                meses: int = 12, afinidade: float = 0.4, complemento: float = 0.15, sujeira: bool = True) -> pd.DataFrame:
+    """Relatório de notas com `n_linhas` itens, vendendo os produtos de `df_estoque`.
+
+    - Popularidade dos produtos ~ Zipf: poucos produtos concentram a maior parte das vendas
+    - Itens por nota ~ geométrica (média ~3)
+    - Depois do primeiro item, cada item tem chance `afinidade` de ser da mesma categoria e
+      `complemento` de ser o produto complementar fixo do primeiro (gera regras com lift alto)
+    """
+    rng = np.random.default_rng(semente + 1)
+    codigos = df_estoque["Código"].to_numpy()
+    n_produtos = len(codigos)
+    categoria = df_estoque["Código da categoria"].to_numpy()
+    custo = df_estoque["Preço de custo"].to_numpy()
+
+    peso = 1 / np.arange(1, n_produtos + 1) ** 1.1
+    peso = rng.permutation(peso / peso.sum())
+
+    # Notas: tamanhos geométricos até completar n_linhas; cada linha sabe o primeiro item da sua nota
+    tamanhos = rng.geometric(0.35, n_linhas)
+    tamanhos = tamanhos[:np.searchsorted(np.cumsum(tamanhos), n_linhas) + 1]
+    tamanhos[-1] -= tamanhos.sum() - n_linhas
+    nota = np.repeat(np.arange(len(tamanhos)), tamanhos)
+    primeira = np.r_[0, np.cumsum(tamanhos)[:-1]]
+    eh_primeiro = np.zeros(n_linhas, dtype=bool)
+    eh_primeiro[primeira] = True
+
+    produto = rng.choice(n_produtos, n_linhas, p=peso)
+    base = produto[primeira][nota]
+
+    # Mesma categoria do primeiro item: sorteio ponderado pela popularidade dentro da faixa da categoria
+    ordem = np.argsort(categoria, kind="stable")
+    acumulado = np.cumsum(peso[ordem])
+    cats, inicios = np.unique(categoria[ordem], return_index=True)
+    fins = np.append(inicios[1:], n_produtos)
+    faixa = np.searchsorted(cats, categoria[base])
+    antes = np.where(inicios[faixa] > 0, acumulado[inicios[faixa] - 1], 0.0)
+    alvo = antes + rng.random(n_linhas) * (acumulado[fins[faixa] - 1] - antes)
+    mesma_categoria = ordem[np.clip(np.searchsorted(acumulado, alvo), inicios[faixa], fins[faixa] - 1)]
+
+    sorteio = rng.random(n_linhas)
+    parceiro = rng.permutation(n_produtos)
+    produto = np.where(eh_primeiro, produto,
+                       np.where(sorteio < complemento, parceiro[base],
+                                np.where(sorteio < complemento + afinidade, mesma_categoria, produto)))
+
+    # Data única por nota, como texto dd/mm/aaaa
+    fim = pd.Timestamp(inicio) + pd.DateOffset(months=meses)
+    datas = pd.date_range(inicio, fim, freq="D", inclusive="left").strftime("%d/%m/%Y").to_numpy(dtype=object)
+    data_nota = rng.integers(0, len(datas), len(tamanhos))
+
+    custo_linha = custo[produto]
+    valor_unitario = np.round(np.where(np.isnan(custo_linha), rng.lognormal(np.log(10), 0.8, n_linhas), custo_linha)
+                              * rng.uniform(1.2, 2.0, n_linhas), 2)
+    quantidade = rng.geometric(0.55, n_linhas)
+    if sujeira:
+        quantidade[rng.random(n_linhas) < SUJEIRA["quantidade_zerada"]] = 0
+        valor_unitario[rng.random(n_linhas) < SUJEIRA["valor_zerado"]] = 0.0
+
+    df = pd.DataFrame({
+        "Numero nota fiscal": nota + 100_000,
+        "Data da venda": datas[data_nota][nota],
+        "Código produto": codigos[produto],
+        "Descrição do produto": df_estoque["Produto"].to_numpy()[produto],
+        "Quantidade do produto": quantidade,
+        "Valor unitário": valor_unitario,
+        "Preço de custo": custo_linha,
+    })
+    df["Valor total produto"] = df["Quantidade do produto"] * df["Valor unitário"]
+    df["Valor da nota"] = df.groupby("Numero nota fiscal")["Valor total produto"].transform("sum")
+    return df
+
+
+def gerar_bases(n_linhas: int, n_produtos: int = None, semente: int = 0, sujeira: bool = True):
+    """(estoque, notas) com `n_linhas` itens de nota; por padrão um produto a cada 5 linhas (1 mil a 50 mil)."""
+    n_produtos = n_produtos or min(50_000, max(1_000, n_linhas // 5))
+    df_estoque = gerar_estoque(n_produtos, semente=semente, sujeira=sujeira)
+    return df_estoque, gerar_notas(df_estoque, n_linhas, semente=semente, sujeira=sujeira)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera bases sintéticas de estoque e notas')
+    parser.add_argument('--linhas', type=int, default=100_000, help='itens de nota (10 mil a 5 milhões)')
+    parser.add_argument('--produtos', type=int, default=None)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--sem-sujeira', action='store_true', help='não injeta linhas que os cleaners descartam')
+    parser.add_argument('--formato', choices=['xlsx', 'parquet'], default='xlsx')
+    parser.add_argument('--saida', default='bases/sinteticas')
+    args = parser.parse_args()
+
+    if args.formato == 'xlsx' and args.linhas > MAX_LINHAS_XLSX:
+        parser.error(f"xlsx comporta até {MAX_LINHAS_XLSX} linhas; use --formato parquet")
+
+    df_estoque, df_notas = gerar_bases(args.linhas, args.produtos, args.semente, not args.sem_sujeira)
+    os.makedirs(args.saida, exist_ok=True)
+    for nome, df in [('relatorio_produtos', df_estoque), ('relatorio_notas', df_notas)]:
+        caminho = os.path.join(args.saida, f"{nome}.{args.formato}")
+        if args.formato == 'xlsx':
+            df.to_excel(caminho, index=False)
+        else:
+            df.to_parquet(caminho, index=False)
+        print(f"[INFO] {caminho}: {len(df)} linhas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# gravacao_assincrona.py
+# Gravação em segundo plano (write-behind) dos resultados de recomendação no PostgreSQL.
+
+import queue
+import threading
+import time
+
+from banco import conexao
+from main_test import codigo_para_gravar, inserir_recomendacoes
+
+_FIM = object()  # marcador de encerramento na fila
+
+
+class GravadorAssincrono:
+    """Fila limitada + thread gravadora: quem consulta só enfileira e segue em frente.
+
+    Os resultados são gravados em lotes, em uma transação por lote, quando o lote chega a
+    `tamanho_lote` itens ou `espera_max` segundos depois do primeiro item. Com a fila cheia,
+    `enfileirar` espera (contrapressão). Lotes com erro são repetidos `tentativas` vezes com
+    pausa crescente e, se ainda falharem, gravados item a item para não perder os válidos.
+    `fechar()` grava tudo o que estiver na fila antes de encerrar.
+    """
+
+    def __init__(self, tamanho_lote: int = 50, espera_max: float = 0.5, capacidade: int = 1000,
+                 tentativas: int = 3, pausa: float = 0.5):
+        self.tamanho_lote = tamanho_lote
+        self.espera_max = espera_max
+        self.tentativas = tentativas
+        self.pausa = pausa
+        self._fila = queue.Queue(maxsize=capacidade)
+        self._trava = threading.Lock()
+        self._fechado = False
+        self.enfileirados = self.gravados = self.lotes = self.falhas = self.descartados = 0
+
+        self._thread = threading.Thread(target=self._executar, name="gravador-recomendacoes", daemon=True)
+        self._thread.start()
+
+    def enfileirar(self, df_substitutos, df_associados, df_modelo, limite=6, timeout=None):
+        """Mesmos argumentos de salvar_no_banco; retorna assim que o resultado entra na fila.
+
+        Com a fila cheia, espera até `timeout` segundos (None = sem limite) e então levanta queue.Full.
+        """
+        if self._fechado:
+            raise RuntimeError("Gravador já encerrado.")
+        self._fila.put((df_substitutos, df_associados, df_modelo, limite), timeout=timeout)
+        with self._trava:
+            self.enfileirados += 1
+
+    def fechar(self, timeout=None) -> dict:
+        """Para de aceitar resultados, grava os pendentes e encerra a thread."""
+        if not self._fechado:
+            self._fechado = True
+            self._fila.put(_FIM)
+        self._thread.join(timeout)
+        return self.estatisticas()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def estatisticas(self) -> dict:
+        with self._trava:
+            return {
+                'enfileirados': self.enfileirados,
+                'pendentes': self._fila.qsize(),
+                'gravados': self.gravados,
+                'lotes': self.lotes,
+                'falhas': self.falhas,
+                'descartados': self.descartados,
+            }
+
+    def _executar(self):
+        fim = False
+        while not fim:
+            item = self._fila.get()
+            if item is _FIM:
+                break
+
+            # Junta itens até encher o lote ou vencer o prazo contado a partir do primeiro
+            lote = [item]
+            prazo = time.monotonic() + self.espera_max
+            while len(lote) < self.tamanho_lote:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    item = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if item is _FIM:
+                    fim = True
+                    break
+                lote.append(item)
+
+            self._gravar_lote(lote)
+
+    def _gravar_lote(self, lote):
+        # Mesmo código pesquisado mais de uma vez no lote: só o resultado mais recente é gravado
+        ultimos, quantidade = {}, {}
+        for df_substitutos, df_associados, df_modelo, limite in lote:
+            try:
+                codigo = codigo_para_gravar(df_substitutos, df_modelo)
+            except Exception as erro:
+                print(f"[ERRO] Resultado inválido descartado: {erro}")
+                codigo = None
+            if codigo is None:
+                with self._trava:
+                    self.descartados += 1
+                continue
+            ultimos[codigo] = (df_substitutos, df_associados, limite)
+            quantidade[codigo] = quantidade.get(codigo, 0) + 1
+
+        if not ultimos:
+            return
+
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                self._gravar(ultimos)
+                with self._trava:
+                    self.gravados += sum(quantidade.values())
+                    self.lotes += 1
+                return
+            except Exception as erro:
+                with self._trava:
+                    self.falhas += 1
+                print(f"[ERRO] Falha ao gravar lote de {len(ultimos)} códigos "
+                      f"(tentativa {tentativa}/{self.tentativas}): {erro}")
+                if tentativa < self.tentativas:
+                    time.sleep(self.pausa * 2 ** (tentativa - 1))
+
+        # Lote inteiro falhou: item a item, para que um resultado ruim não derrube os outros
+        for codigo, resultado in ultimos.items():
+            try:
+                self._gravar({codigo: resultado})
+                with self._trava:
+                    self.gravados += quantidade[codigo]
+            except Exception as erro:
+                with self._trava:
+                    self.descartados += quantidade[codigo]
+                print(f"[ERRO] Resultado de '{codigo}' descartado: {erro}")
+
+    @staticmethod
+    def _gravar(resultados: dict):
+        with conexao() as conn:
+            with conn.cursor() as cur:
+                for codigo, (df_substitutos, df_associados, limite) in resultados.items():
+                    inserir_recomendacoes(cur, codigo, df_substitutos, df_associados, limite)
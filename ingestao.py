@@ -0,0 +1,72 @@
+# ingestao.py
+# Leitura e limpeza de estoque e notas em processos separados (main.carregar_base com paralelo=True).
+# Cada processo grava o DataFrame limpo em um arquivo Arrow IPC, que o processo principal mapeia em
+# memória (sem pickle do DataFrame); o cache em Parquet da etapa também é gravado no próprio processo.
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pyarrow as pa
+
+from cache_base import CacheBase
+from instrumentacao import Execucao, incorporar
+
+
+def cpus_disponiveis() -> int:
+    """CPUs que este processo pode usar (afinidade/cgroup quando o sistema informa)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def gravar_arrow(df, caminho: str) -> None:
+    """DataFrame -> arquivo Arrow IPC, com índice e tipos (categorias, inteiros compactos) preservados."""
+    tabela = pa.Table.from_pandas(df)
+    with pa.OSFile(caminho, 'wb') as arquivo, pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+
+
+def ler_arrow(caminho: str):
+    """Arquivo Arrow IPC -> DataFrame, lendo os buffers direto do arquivo mapeado em memória."""
+    with pa.memory_map(caminho) as mapa:
+        return pa.ipc.open_file(mapa).read_all().to_pandas()
+
+
+def _executar_ramo(nome: str, funcao, argumentos: tuple, cache, pasta: str):
+    # No processo filho: limpa (ou lê do cache) e devolve só o caminho do Arrow e as medidas das etapas
+    with Execucao(nome, log=False) as execucao:
+        if cache is None:
+            df = funcao(*argumentos)
+        else:
+            pasta_cache, etapa, chave = cache
+            df = CacheBase(pasta_cache).obter(etapa, chave, lambda: funcao(*argumentos))
+    caminho = os.path.join(pasta, f"{nome}.arrow")
+    gravar_arrow(df, caminho)
+    return caminho, execucao.relatorio()
+
+
+def executar_ramos(ramos: dict) -> dict:
+    """Executa cada ramo {nome: (funcao, argumentos, cache)} em um processo e devolve {nome: DataFrame}.
+
+    `funcao` precisa ser importável (nível de módulo); `cache` é (pasta, etapa, chave) para usar
+    CacheBase.obter no processo filho, ou None. Cada resultado é lido assim que o seu processo
+    termina, enquanto os outros seguem rodando; as medidas dos filhos entram na Execucao ativa.
+    """
+    pasta = tempfile.mkdtemp(prefix='ingestao_')
+    resultados = {}
+    try:
+        with ProcessPoolExecutor(max_workers=len(ramos)) as executor:
+            tarefas = {
+                executor.submit(_executar_ramo, nome, funcao, argumentos, cache, pasta): nome
+                for nome, (funcao, argumentos, cache) in ramos.items()
+            }
+            for tarefa in as_completed(tarefas):
+                caminho, relatorio = tarefa.result()
+                resultados[tarefas[tarefa]] = ler_arrow(caminho)
+                incorporar(relatorio)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return resultados
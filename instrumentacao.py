@@ -0,0 +1,355 @@
+# instrumentacao.py
+# Medição das etapas do pipeline em lote (main.py): tempo de parede, tempo de CPU, pico de RSS e linhas que
+# entram, saem e são descartadas por regra. Cada etapa concluída vira uma linha de log [ETAPA] em JSON e a
+# execução inteira um relatório JSON; uma etapa escolhida pode ser perfilada com cProfile ou py-spy.
+#
+# Sem uma Execucao ativa, etapa() e as demais funções só repassam o bloco: o serviço e os benchmarks que
+# usam os mesmos cleaners não pagam nada além de uma checagem.
+
+import cProfile
+import inspect
+import json
+import os
+import platform
+import pstats
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PERFILADORES = ('cprofile', 'py-spy')
+
+_execucao = None
+
+
+def _zerar_pico_rss() -> bool:
+    # Linux: escrever 5 em clear_refs zera o VmHWM; nas demais plataformas o pico é o do processo inteiro
+    try:
+        with open('/proc/self/clear_refs', 'w') as arquivo:
+            arquivo.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _rss_mb(campo: str = 'VmHWM'):
+    # Linux: VmRSS (atual) ou VmHWM (pico) de /proc/self/status, em MB; None fora do Linux
+    try:
+        with open('/proc/self/status') as arquivo:
+            for linha in arquivo:
+                if linha.startswith(f'{campo}:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _pico_rss_mb():
+    """Pico de RSS do processo em MB (desde o último _zerar_pico_rss, no Linux); None se não houver como medir."""
+    pico = _rss_mb('VmHWM')
+    if pico is not None or resource is None:
+        return pico
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 ** 2 if sys.platform == 'darwin' else pico / 1024
+
+
+def _tempo_cpu() -> float:
+    # CPU do processo (todas as threads) mais a dos filhos já encerrados (ex.: workers do gerar_lote)
+    tempos = os.times()
+    return time.process_time() + tempos.children_user + tempos.children_system
+
+
+class Medida:
+    """Números de uma etapa. O código medido preenche linhas_entrada/linhas_saida e chama descartar()."""
+
+    def __init__(self, nome: str, caminho: str = '', nivel: int = 0, linhas_entrada=None):
+        self.nome = nome
+        self.caminho = caminho or nome
+        self.nivel = nivel
+        self.linhas_entrada = linhas_entrada
+        self.linhas_saida = None
+        self.descartes = {}
+        self.inicio_s = self.parede_s = self.cpu_s = self.rss_inicio_mb = self.rss_pico_mb = None
+
+    def descartar(self, regra: str, linhas) -> None:
+        self.descartes[regra] = self.descartes.get(regra, 0) + int(linhas)
+
+    def como_dict(self) -> dict:
+        registro = {
+            'etapa': self.caminho, 'nivel': self.nivel,
+            'inicio_s': self.inicio_s, 'parede_s': self.parede_s, 'cpu_s': self.cpu_s,
+            'rss_inicio_mb': self.rss_inicio_mb, 'rss_pico_mb': self.rss_pico_mb,
+            'linhas_entrada': self.linhas_entrada, 'linhas_saida': self.linhas_saida,
+        }
+        if self.linhas_entrada is not None and self.linhas_saida is not None:
+            registro['linhas_descartadas'] = self.linhas_entrada - self.linhas_saida
+        if self.descartes:
+            registro['descartes'] = dict(self.descartes)
+        return {chave: (round(valor, 4) if isinstance(valor, float) else valor) for chave, valor in registro.items()}
+
+
+class _MedidaVazia(Medida):
+    # Devolvida fora de uma Execucao: aceita as mesmas atribuições e chamadas e descarta tudo
+    def descartar(self, regra: str, linhas) -> None:
+        pass
+
+
+_MEDIDA_VAZIA = _MedidaVazia('')
+
+
+class Execucao:
+    """Uma execução medida do pipeline. Use com `with`: as etapas abertas dentro do bloco são registradas.
+
+    relatorio: caminho do JSON gravado ao sair (também em caso de erro)
+    perfilar: nome ou caminho ("pai/filho") de uma etapa a perfilar; cada ocorrência é perfilada
+    perfilador: 'cprofile' (grava .prof, para pstats/snakeviz) ou 'py-spy' (py-spy record anexado ao processo)
+    log: False silencia as linhas [ETAPA]
+    """
+
+    def __init__(self, nome: str, relatorio: str = None, perfilar: str = None, perfilador: str = 'cprofile',
+                 pasta_perfis: str = 'saida/perfis', log: bool = True):
+        if perfilador not in PERFILADORES:
+            raise ValueError(f"Perfilador '{perfilador}' inválido. Use um de {PERFILADORES}.")
+        self.nome = nome
+        self.caminho_relatorio = relatorio
+        self.perfilar = perfilar
+        self.perfilador = perfilador
+        self.pasta_perfis = pasta_perfis
+        self.log = log
+        self.medidas = []
+        self.pilha = []
+        self.perfis = []
+        self.rss_por_etapa = _zerar_pico_rss()
+        self._anterior = None
+        self._raiz = None
+
+    def __enter__(self):
+        global _execucao
+        self._anterior, _execucao = _execucao, self
+        self.inicio = datetime.now()
+        self._relogio, self._epoca = time.perf_counter(), time.time()
+        self._raiz = etapa(self.nome)
+        self._raiz.__enter__()
+        return self
+
+    def __exit__(self, tipo, erro, rastro):
+        global _execucao
+        try:
+            self._raiz.__exit__(tipo, erro, rastro)
+        finally:
+            _execucao = self._anterior
+            self.fim = datetime.now()
+            self.erro = None if erro is None else f"{tipo.__name__}: {erro}"
+            if self.caminho_relatorio:
+                self.salvar(self.caminho_relatorio)
+        return False
+
+    # Medidas abertas e fechadas por etapa(); o pico de RSS de cada uma também vale para as que a contêm
+    def _abrir(self, nome: str, linhas_entrada) -> Medida:
+        pai = self.pilha[-1] if self.pilha else None
+        medida = Medida(nome, f"{pai.caminho}/{nome}" if pai else nome, len(self.pilha), linhas_entrada)
+        if self.rss_por_etapa:
+            pico = _pico_rss_mb()
+            for aberta in self.pilha:
+                aberta.rss_pico_mb = max(aberta.rss_pico_mb or 0.0, pico)
+            _zerar_pico_rss()
+        medida.rss_inicio_mb = _rss_mb('VmRSS')
+        self.medidas.append(medida)
+        self.pilha.append(medida)
+        medida.inicio_s = time.perf_counter() - self._relogio
+        return medida
+
+    def _fechar(self, medida: Medida, parede: float, cpu: float):
+        self.pilha.pop()
+        medida.parede_s, medida.cpu_s = parede, cpu
+        pico = _pico_rss_mb()
+        if pico is not None:
+            medida.rss_pico_mb = max(medida.rss_pico_mb or 0.0, pico)
+            for aberta in self.pilha:
+                aberta.rss_pico_mb = max(aberta.rss_pico_mb or 0.0, medida.rss_pico_mb)
+
+        # Linhas que cada regra (subetapa com entrada e saída) descartou também aparecem na etapa de cima
+        if self.pilha and medida.linhas_entrada is not None and medida.linhas_saida is not None:
+            descartadas = medida.linhas_entrada - medida.linhas_saida
+            if descartadas > 0:
+                self.pilha[-1].descartar(medida.nome, descartadas)
+        if self.log:
+            print(f"[ETAPA] {json.dumps(medida.como_dict(), ensure_ascii=False)}")
+
+    # Perfilamento da etapa escolhida
+    def _deve_perfilar(self, medida: Medida) -> bool:
+        # Nome da etapa, caminho completo ou final do caminho ("modelo/BasePreparador.preparar_base")
+        return self.perfilar is not None and (
+            self.perfilar == medida.nome or f"/{medida.caminho}".endswith(f"/{self.perfilar}")
+        )
+
+    def _arquivo_perfil(self, medida: Medida, extensao: str) -> str:
+        os.makedirs(self.pasta_perfis, exist_ok=True)
+        nome = ''.join(c if c.isalnum() else '_' for c in medida.caminho)
+        return os.path.join(self.pasta_perfis, f"{nome}_{len(self.perfis)}.{extensao}")
+
+    def _iniciar_perfil(self, medida: Medida):
+        if self.perfilador == 'cprofile':
+            perfil = cProfile.Profile()
+            perfil.enable()
+            return perfil
+        if shutil.which('py-spy') is None or os.name != 'posix':
+            print("[ERRO] py-spy não encontrado (ou plataforma sem SIGINT); etapa seguirá sem perfil.")
+            return None
+        arquivo = self._arquivo_perfil(medida, 'svg')
+        processo = subprocess.Popen(['py-spy', 'record', '--pid', str(os.getpid()), '--subprocesses',
+                                     '--output', arquivo], stdout=subprocess.DEVNULL)
+        time.sleep(0.5)  # tempo para o py-spy se anexar antes de a etapa começar
+        return processo, arquivo
+
+    def _encerrar_perfil(self, medida: Medida, perfil):
+        if perfil is None:
+            return
+        if isinstance(perfil, cProfile.Profile):
+            perfil.disable()
+            arquivo = self._arquivo_perfil(medida, 'prof')
+            perfil.dump_stats(arquivo)
+            pstats.Stats(perfil).sort_stats('cumulative').print_stats(15)
+        else:
+            processo, arquivo = perfil
+            processo.send_signal(signal.SIGINT)  # py-spy grava o flamegraph ao receber SIGINT
+            processo.wait()
+        self.perfis.append({'etapa': medida.caminho, 'arquivo': arquivo})
+        print(f"[INFO] Perfil de '{medida.caminho}' gravado em {arquivo}")
+
+    def relatorio(self) -> dict:
+        return {
+            'execucao': self.nome,
+            'inicio': self.inicio.isoformat(timespec='seconds'),
+            'fim': self.fim.isoformat(timespec='seconds') if getattr(self, 'fim', None) else None,
+            'status': 'erro' if getattr(self, 'erro', None) else 'ok',
+            'erro': getattr(self, 'erro', None),
+            'comando': sys.argv,
+            'pid': os.getpid(),
+            'ambiente': {'python': platform.python_version(), 'plataforma': platform.platform(), 'cpus': os.cpu_count()},
+            # False: rss_pico_mb é o pico do processo até o fim de cada etapa, não só o da etapa
+            'rss_pico_por_etapa': self.rss_por_etapa,
+            'inicio_epoca': getattr(self, '_epoca', None),
+            'etapas': [medida.como_dict() for medida in self.medidas],
+            'perfis': self.perfis,
+        }
+
+    def salvar(self, caminho: str) -> None:
+        os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            json.dump(self.relatorio(), arquivo, ensure_ascii=False, indent=2)
+        print(f"[INFO] Relatório da execução gravado em {caminho}")
+
+
+@contextmanager
+def etapa(nome: str, linhas_entrada=None):
+    """Mede o bloco como uma etapa (dentro da etapa aberta no momento). Entrega a Medida para o bloco preencher."""
+    execucao = _execucao
+    if execucao is None:
+        yield _MEDIDA_VAZIA
+        return
+
+    medida = execucao._abrir(nome, linhas_entrada)
+    perfil = execucao._iniciar_perfil(medida) if execucao._deve_perfilar(medida) else None
+    inicio, inicio_cpu = time.perf_counter(), _tempo_cpu()
+    try:
+        yield medida
+    finally:
+        parede, cpu = time.perf_counter() - inicio, _tempo_cpu() - inicio_cpu
+        execucao._encerrar_perfil(medida, perfil)
+        execucao._fechar(medida, parede, cpu)
+
+
+def etapa_atual() -> Medida:
+    """Medida da etapa aberta mais interna (uma medida que descarta tudo fora de uma Execucao)."""
+    if _execucao is None or not _execucao.pilha:
+        return _MEDIDA_VAZIA
+    return _execucao.pilha[-1]
+
+
+def medir_metodo(nome: str, entrada: str = None):
+    """Decorador de métodos: mede a chamada como etapa, com linhas de saída = len do DataFrame devolvido e
+    linhas de entrada = len do parâmetro `entrada` (padrão: o primeiro DataFrame recebido)."""
+    def decorar(funcao):
+        parametros = list(inspect.signature(funcao).parameters)
+        posicao = parametros.index(entrada) if entrada else None
+
+        @wraps(funcao)
+        def medido(*args, **kwargs):
+            if _execucao is None:
+                return funcao(*args, **kwargs)
+            if entrada:
+                valor = kwargs[entrada] if entrada in kwargs else args[posicao] if posicao < len(args) else None
+                linhas = len(valor) if hasattr(valor, 'columns') else None
+            else:
+                linhas = next((len(arg) for arg in args[1:] if hasattr(arg, 'columns')), None)
+            with etapa(nome, linhas_entrada=linhas) as registro:
+                resultado = funcao(*args, **kwargs)
+                registro.linhas_saida = len(resultado) if hasattr(resultado, 'columns') else None
+                return resultado
+        return medido
+    return decorar
+
+
+def iterar(nome: str, iteravel):
+    """Repassa os itens de `iteravel` medindo só o tempo gasto para produzi-los (ex.: leitura em lotes).
+
+    Vira uma etapa filha da etapa aberta quando a iteração começa, com linhas_saida = soma dos len dos itens.
+    O pico de RSS não é medido: a produção se intercala com o trabalho de quem consome.
+    """
+    if _execucao is None:
+        yield from iteravel
+        return
+
+    execucao = _execucao
+    pai = execucao.pilha[-1] if execucao.pilha else None
+    medida = Medida(nome, f"{pai.caminho}/{nome}" if pai else nome, len(execucao.pilha))
+    medida.inicio_s = time.perf_counter() - execucao._relogio
+    medida.parede_s = medida.cpu_s = 0.0
+    medida.linhas_saida = 0
+    execucao.medidas.append(medida)
+
+    iterador = iter(iteravel)
+    while True:
+        inicio, inicio_cpu = time.perf_counter(), _tempo_cpu()
+        try:
+            item = next(iterador)
+        except StopIteration:
+            break
+        finally:
+            medida.parede_s += time.perf_counter() - inicio
+            medida.cpu_s += _tempo_cpu() - inicio_cpu
+        medida.linhas_saida += len(item)
+        yield item
+    if execucao.log:
+        print(f"[ETAPA] {json.dumps(medida.como_dict(), ensure_ascii=False)}")
+
+
+def incorporar(relatorio: dict) -> None:
+    """Anexa, sob a etapa aberta, as etapas de uma Execucao feita em outro processo (o seu relatorio())."""
+    execucao = _execucao
+    if execucao is None:
+        return
+    pai = execucao.pilha[-1] if execucao.pilha else None
+    deslocamento = relatorio['inicio_epoca'] - execucao._epoca
+    for registro in relatorio['etapas']:
+        caminho = f"{pai.caminho}/{registro['etapa']}" if pai else registro['etapa']
+        medida = Medida(caminho.rsplit('/', 1)[-1], caminho, registro['nivel'] + len(execucao.pilha),
+                        registro['linhas_entrada'])
+        medida.linhas_saida = registro['linhas_saida']
+        medida.descartes = dict(registro.get('descartes', {}))
+        medida.inicio_s = registro['inicio_s'] + deslocamento
+        medida.parede_s, medida.cpu_s = registro['parede_s'], registro['cpu_s']
+        medida.rss_inicio_mb, medida.rss_pico_mb = registro['rss_inicio_mb'], registro['rss_pico_mb']
+        execucao.medidas.append(medida)
+        if execucao.log:
+            print(f"[ETAPA] {json.dumps(medida.como_dict(), ensure_ascii=False)}")
@@ -0,0 +1,42 @@
+# leitura_notas.py
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+
+def _converter(valor):
+    # Mesma conversão do pd.read_excel: vazio vira NaN e número inteiro em float vira int
+    if valor is None:
+        return np.nan
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def ler_excel_em_lotes(caminho: str, tamanho_lote: int = 50_000, colunas=None):
+    """Lê a planilha em modo somente leitura e gera DataFrames de até `tamanho_lote` linhas.
+
+    O índice de cada lote continua a numeração do anterior, como se a planilha inteira
+    tivesse sido lida com pd.read_excel. Com `colunas`, só essas colunas são mantidas.
+    """
+    livro = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = livro.worksheets[0].iter_rows(values_only=True)
+        cabecalho = [str(nome) for nome in next(linhas)]
+        selecionadas = [i for i, nome in enumerate(cabecalho) if colunas is None or nome in colunas]
+        nomes = [cabecalho[i] for i in selecionadas]
+
+        inicio, lote = 0, []
+        for linha in linhas:
+            if all(valor is None for valor in linha):
+                continue
+            lote.append([_converter(linha[i]) if i < len(linha) else np.nan for i in selecionadas])
+            if len(lote) == tamanho_lote:
+                yield pd.DataFrame(lote, columns=nomes, index=pd.RangeIndex(inicio, inicio + len(lote)))
+                inicio, lote = inicio + len(lote), []
+
+        if lote or inicio == 0:
+            yield pd.DataFrame(lote, columns=nomes, index=pd.RangeIndex(inicio, inicio + len(lote)))
+    finally:
+        livro.close()
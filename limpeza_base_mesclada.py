@@ -1,56 +1,75 @@
 # base_preparador.py
 
+import numpy as np
 import pandas as pd
 
+from instrumentacao import etapa, medir_metodo
+from tipos_compactos import compactar, expandir_float32
+
 class BasePreparador:
-    def __init__(self):
+    # Incrementar ao mudar as regras de limpeza: invalida o cache em Parquet
+    VERSAO = 1
+
+    def __init__(self, compacto: bool = False):
+        # compacto: df_modelo com códigos no menor inteiro, textos como categoria e valores em float32
+        self.compacto = compacto
         self.df_completo = None
 
+    @medir_metodo("BasePreparador.preparar_base", entrada="df_notas")
     def preparar_base(self, df_estoque: pd.DataFrame, df_notas: pd.DataFrame) -> pd.DataFrame:
-        df = pd.merge(
-            df_notas,
-            df_estoque[["Código produto", "Código da categoria", "Categoria", "Código da Marca", "Marca", "Quantidade estoque"]],
-            on='Código produto',
-            how='inner'
-        )
-
-        # Remover notas com preço de custo nulo e removendo os valores zerados
-        df = df[~df["Preço de custo"].isna()]
-        df = df[df["Preço de custo"] != 0]
-
-        # Remover notas com valor unitário zerado
-        df = df[df["Valor unitário"] != 0]
-
-        # Cálculo de margem e markup
-        df["Margem bruta"] = (df["Valor unitário"] - df["Preço de custo"]).round(2)
-        df["Margem %"] = (df["Margem bruta"] / df["Valor unitário"]).round(2)
-        df["Markup"] = (df["Valor unitário"] - df["Preço de custo"]).round(2)
-
-        # Tipos e datas
-        df["Data da venda"] = pd.to_datetime(df["Data da venda"], format="%d/%m/%Y")
-        df["Quantidade do produto"] = df["Quantidade do produto"].astype(int)
-        df["Código da categoria"] = df["Código da categoria"].astype(int)
-        df["Código da Marca"] = df["Código da Marca"].astype(int)
-        df["Quantidade estoque"] = df["Quantidade estoque"].astype(int)
-
-        # Recalcular valores
-        df["Valor total produto"] = df["Quantidade do produto"] * df["Valor unitário"]
-        df["Valor da nota"] = df.groupby("Numero nota fiscal")["Valor total produto"].transform("sum")
-
-        # Remover notas com valores negativos
-        colunas_verificar = ["Quantidade do produto", "Valor unitário", "Preço de custo"]
-        for coluna in colunas_verificar:
-            df = df[df[coluna] >= 0]
-
-        # Remover notas com custo maior que o valor unitário
-        df = df[df["Preço de custo"] <= df["Valor unitário"]]
-
-        # Remover notas com valores críticos
-        df = df[
-            (df["Preço de custo"] > 0) &
-            (df["Valor da nota"] > 0) &
-            (df["Valor total produto"] > 0)
-        ]
-
-        self.df_completo = df.copy()
+        # Contas em float64 mesmo com entradas compactas: margem e markup saem iguais aos da base normal
+        df_notas = expandir_float32(df_notas)
+        with etapa("merge notas x estoque", linhas_entrada=len(df_notas)) as medida:
+            df = pd.merge(
+                df_notas,
+                df_estoque[["Código produto", "Código da categoria", "Categoria", "Código da Marca", "Marca", "Quantidade estoque"]],
+                on='Código produto',
+                how='inner'
+            )
+            medida.linhas_saida = len(df)
+
+        # Remover notas com preço de custo nulo ou zerado e com valor unitário zerado. É o único
+        # filtro antes dos cálculos: 'Valor da nota' soma exatamente essas linhas
+        with etapa("custo nulo ou zerado e valor unitário zerado", linhas_entrada=len(df)) as medida:
+            custo, valor_unitario = df["Preço de custo"], df["Valor unitário"]
+            df = df[(custo.notna() & (custo != 0) & (valor_unitario != 0)).to_numpy()]
+            medida.linhas_saida = len(df)
+
+        with etapa("margem, tipos e valores", linhas_entrada=len(df)):
+            # Cálculo de margem e markup
+            df["Margem bruta"] = (df["Valor unitário"] - df["Preço de custo"]).round(2)
+            df["Margem %"] = (df["Margem bruta"] / df["Valor unitário"]).round(2)
+            df["Markup"] = (df["Valor unitário"] - df["Preço de custo"]).round(2)
+
+            # Tipos e datas
+            df["Data da venda"] = pd.to_datetime(df["Data da venda"], format="%d/%m/%Y")
+            df["Quantidade do produto"] = df["Quantidade do produto"].astype(int)
+            df["Código da categoria"] = df["Código da categoria"].astype(int)
+            df["Código da Marca"] = df["Código da Marca"].astype(int)
+            df["Quantidade estoque"] = df["Quantidade estoque"].astype(int)
+
+            # Recalcular valores: sem arredondar e só com as linhas que casaram com o estoque, por isso
+            # não são os mesmos do NotasCleaner
+            df["Valor total produto"] = df["Quantidade do produto"] * df["Valor unitário"]
+            df["Valor da nota"] = df.groupby("Numero nota fiscal")["Valor total produto"].transform("sum")
+
+        # Remover, de uma vez, notas com valores negativos, com custo maior que o valor unitário
+        # e com valores críticos. As descartadas são contadas por regra, na ordem em que eram aplicadas
+        with etapa("valores negativos, custo acima do valor unitário e valores críticos",
+                   linhas_entrada=len(df)) as medida:
+            quantidade, custo, valor_unitario = df["Quantidade do produto"], df["Preço de custo"], df["Valor unitário"]
+            regras = {
+                "valores negativos": (quantidade >= 0) & (valor_unitario >= 0) & (custo >= 0),
+                "custo acima do valor unitário": custo <= valor_unitario,
+                "valores críticos": (custo > 0) & (df["Valor da nota"] > 0) & (df["Valor total produto"] > 0),
+            }
+            validas = np.ones(len(df), dtype=bool)
+            for regra, mascara in regras.items():
+                antes = int(validas.sum())
+                validas &= mascara.to_numpy()
+                medida.descartar(regra, antes - int(validas.sum()))
+            df = df[validas]
+            medida.linhas_saida = len(df)
+
+        self.df_completo = compactar(df) if self.compacto else df.copy()
         return self.df_completo
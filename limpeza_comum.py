@@ -0,0 +1,32 @@
+# limpeza_comum.py
+# Máscaras vetorizadas usadas pelos cleaners: as regras viram arrays booleanos e o filtro é aplicado uma vez só.
+
+import numpy as np
+import pandas as pd
+
+
+def linhas_ambiguas(chave: pd.Series, valor: pd.Series, validas: np.ndarray) -> np.ndarray:
+    """Máscara das linhas cuja `chave` tem mais de um `valor` distinto entre as linhas `validas`.
+
+    Equivale a `df[validas].groupby(chave)[valor].nunique() > 1` seguido de `isin` nas chaves,
+    mas sobre os códigos inteiros de `pd.factorize`, sem copiar o DataFrame. Como no groupby,
+    chaves e valores nulos não contam.
+    """
+    chaves, nomes = pd.factorize(chave)
+    valores, distintos = pd.factorize(valor)
+    usar = validas & (chaves >= 0) & (valores >= 0)
+
+    # Pares (chave, valor) distintos -> quantos valores cada chave tem
+    pares = np.unique(chaves[usar].astype(np.int64) * max(len(distintos), 1) + valores[usar])
+    ambigua = np.bincount(pares // max(len(distintos), 1), minlength=len(nomes)) > 1
+    return (chaves >= 0) & ambigua[np.maximum(chaves, 0)]
+
+
+def notas_marcadas(notas: pd.Series, problema: np.ndarray) -> np.ndarray:
+    """Máscara das linhas de notas que têm ao menos uma linha com `problema` (a nota inteira cai).
+
+    Como no `isin` com o conjunto de notas com problema, linhas sem número de nota não caem.
+    """
+    codigos, numeros = pd.factorize(notas)
+    marcadas = np.bincount(codigos[problema & (codigos >= 0)], minlength=len(numeros)) > 0
+    return (codigos >= 0) & marcadas[np.maximum(codigos, 0)]
@@ -1,42 +1,42 @@
+import numpy as np
 import pandas as pd
 
+from instrumentacao import etapa, medir_metodo
+from limpeza_comum import linhas_ambiguas
+from tipos_compactos import compactar
+
 class EstoqueCleaner:
-    def __init__(self):
+    # Incrementar ao mudar as regras de limpeza: invalida o cache em Parquet
+    VERSAO = 1
+
+    def __init__(self, compacto: bool = False):
+        # compacto: códigos no menor inteiro, textos como categoria e preço em float32 (tipos_compactos)
+        self.compacto = compacto
         self.colunas_utilizadas = [
             'Código', 'Produto', 'Código da categoria', 'Categoria',
             'Código da Marca', 'Marca', 'Preço de custo', 'Quantidade estoque'
         ]
 
+    @medir_metodo("EstoqueCleaner.clean")
     def clean(self, df: pd.DataFrame) -> pd.DataFrame:
         print("[INFO] Iniciando limpeza da base de estoque...")
-        # Tratamento de valores negativos e nulos em estoque
-        df.loc[df["Quantidade estoque"] < 0, "Quantidade estoque"] = 0
-        df["Quantidade estoque"] = df["Quantidade estoque"].fillna(0)
-
-        # Selecionar colunas relevantes
-        df = df[self.colunas_utilizadas].copy()
-
-        # Remover produtos com múltiplos códigos
-        produto_multiplos_codigos = df.groupby("Produto")["Código"].nunique()
-        produtos_problemas = produto_multiplos_codigos[produto_multiplos_codigos > 1].index
-        df = df[~df["Produto"].isin(produtos_problemas)].copy()
-
-        # Remover categorias com múltiplos códigos
-        categoria_multiplos_codigos = df.groupby("Categoria")["Código da categoria"].nunique()
-        categorias_problemas = categoria_multiplos_codigos[categoria_multiplos_codigos > 1].index
-        df = df[~df["Categoria"].isin(categorias_problemas)].copy()
-
-        # Remover marcas com múltiplos códigos
-        marca_multiplos_codigos = df.groupby("Marca")["Código da Marca"].nunique()
-        marcas_problemas = marca_multiplos_codigos[marca_multiplos_codigos > 1].index
-        df = df[~df["Marca"].isin(marcas_problemas)].copy()
-
-        # Conversões finais
-        df = df.astype({'Quantidade estoque': 'int64'})
+        # Remover produtos, categorias e marcas com múltiplos códigos. Cada regra é uma máscara
+        # sobre as linhas que sobraram das anteriores; o DataFrame só é filtrado no fim, uma vez.
+        validas = np.ones(len(df), dtype=bool)
+        for nome, codigo in (("Produto", "Código"), ("Categoria", "Código da categoria"), ("Marca", "Código da Marca")):
+            with etapa(f"{nome} com vários códigos", linhas_entrada=int(validas.sum())) as regra:
+                validas &= ~linhas_ambiguas(df[nome], df[codigo], validas)
+                regra.linhas_saida = int(validas.sum())
+
+        df = df.loc[validas, self.colunas_utilizadas]
+
+        # Estoque negativo ou nulo vira zero; conversões finais
+        estoque = df["Quantidade estoque"]
+        df["Quantidade estoque"] = estoque.mask(estoque < 0, 0).fillna(0).astype('int64')
         df["Preço de custo"] = df["Preço de custo"].round(2)
         df.rename(columns={"Código": "Código produto"}, inplace=True)
+        if self.compacto:
+            df = compactar(df)
 
         print("[INFO] Limpeza concluída.")
         return df
-
-
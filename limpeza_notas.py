@@ -1,47 +1,172 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+
+from instrumentacao import etapa, etapa_atual, iterar, medir_metodo
+from limpeza_comum import linhas_ambiguas, notas_marcadas
+from tipos_compactos import compactar
+
+# Colunas de texto: sempre string no Arrow, mesmo quando o Excel traz números em algumas células
+COLUNAS_TEXTO = ["Descrição do produto"]
+
+
+def _tabela_arrow(lote: pd.DataFrame) -> pa.Table:
+    """Lote -> tabela Arrow; colunas de texto e colunas object com tipos misturados viram string."""
+    lote = lote.copy(deep=False)
+    for coluna in lote.columns:
+        serie = lote[coluna]
+        if coluna in COLUNAS_TEXTO or serie.dtype == object:
+            if pd.api.types.infer_dtype(serie, skipna=True) not in ("string", "empty"):
+                lote[coluna] = serie.map(str, na_action="ignore").astype(object)
+    return pa.Table.from_pandas(lote, preserve_index=False)
+
+
+def _concatenar(partes: list) -> pa.Table:
+    """Junta as tabelas dos lotes; coluna que é string em um lote e número em outro vira string em todos."""
+    tipos = {}
+    for parte in partes:
+        for campo in parte.schema:
+            tipos.setdefault(campo.name, set()).add(campo.type)
+    for nome, tipos_coluna in tipos.items():
+        if pa.string() in tipos_coluna and len(tipos_coluna) > 1:
+            partes = [
+                parte.set_column(parte.schema.get_field_index(nome), nome, parte.column(nome).cast(pa.string()))
+                for parte in partes
+            ]
+    return pa.concat_tables(partes, promote_options="permissive")
+
 
 class NotasCleaner:
-    def __init__(self):
-        pass  
+    # Incrementar ao mudar as regras de limpeza: invalida o cache em Parquet
+    VERSAO = 1
+
+    COLUNAS_FINAIS = [
+        "Numero nota fiscal", "Data da venda", "Código produto",
+        "Descrição do produto", "Quantidade do produto", "Valor unitário",
+        "Preço de custo", "Valor total produto", "Valor da nota"
+    ]
+
+    def __init__(self, compacto: bool = False, descricoes_anteriores: pd.DataFrame = None):
+        # compacto: códigos no menor inteiro, descrição como categoria e valores em float32 (tipos_compactos)
+        self.compacto = compacto
+        # descricoes_anteriores: pares (descrição, código) das notas já incorporadas (ver descricoes).
+        # Com eles, limpar só as notas novas dá a mesma regra de descrições ambíguas que limpar o histórico todo.
+        self.descricoes_anteriores = descricoes_anteriores
+        self._linhas_regra = None
 
+    @property
+    def descricoes(self) -> pd.DataFrame:
+        """Pares (descrição, código) distintos das linhas que chegaram à regra de descrições ambíguas
+        na última limpeza, somados a `descricoes_anteriores`: o estado da próxima carga de notas novas.
+
+        Montados só quando pedidos; a limpeza normal não paga por eles.
+        """
+        if self._linhas_regra is None:
+            return self.descricoes_anteriores
+        descricoes, codigos, validas = self._linhas_regra
+        pares = pd.DataFrame({"Descrição do produto": descricoes[validas].to_numpy(dtype=object),
+                              "Código produto": codigos[validas].to_numpy()})
+        if self.descricoes_anteriores is not None:
+            pares = pd.concat([self.descricoes_anteriores[pares.columns], pares], ignore_index=True)
+        return pares.drop_duplicates(ignore_index=True)
+
+    def _linhas_ambiguas(self, descricoes: pd.Series, codigos: pd.Series, validas: np.ndarray) -> np.ndarray:
+        self._linhas_regra = descricoes, codigos, validas.copy()
+        anteriores = self.descricoes_anteriores
+        if anteriores is None or anteriores.empty:
+            return linhas_ambiguas(descricoes, codigos, validas)
+
+        # Os pares anteriores entram depois das linhas atuais só para a contagem de códigos por descrição
+        ambiguas = linhas_ambiguas(
+            pd.concat([descricoes.astype(object), anteriores["Descrição do produto"].astype(object)], ignore_index=True),
+            pd.concat([codigos, anteriores["Código produto"]], ignore_index=True),
+            np.concatenate([validas, np.ones(len(anteriores), dtype=bool)]),
+        )
+        return ambiguas[:len(descricoes)]
+
+    @medir_metodo("NotasCleaner.clean")
     def clean(self, df: pd.DataFrame) -> pd.DataFrame:
-        try:
-            # 1. Remover registros com quantidades <= 0 ou valores unitários zerados
-            notas_com_problemas = set()
+        # As regras 1 e 2 viram máscaras sobre as linhas originais e o DataFrame é filtrado uma vez só
+        # 1. Remover notas com alguma quantidade <= 0 ou valor unitário zerado
+        with etapa("notas com quantidade <= 0 ou valor unitário zerado", linhas_entrada=len(df)) as regra:
+            problema = ((df['Quantidade do produto'] <= 0) | (df['Valor unitário'] == 0)).to_numpy()
+            validas = ~notas_marcadas(df['Numero nota fiscal'], problema)
+            regra.linhas_saida = int(validas.sum())
 
-            notas_com_problemas.update(df[df['Quantidade do produto'] <= 0]['Numero nota fiscal'].unique())
-            notas_com_problemas.update(df[df['Valor unitário'] == 0]['Numero nota fiscal'].unique())
+        # 2. Remover registros com descrições ambíguas (vários códigos para mesma descrição)
+        with etapa("descrições ambíguas", linhas_entrada=regra.linhas_saida) as regra:
+            validas &= ~self._linhas_ambiguas(df['Descrição do produto'], df['Código produto'], validas)
+            regra.linhas_saida = int(validas.sum())
 
-            df_limpo = df[~df['Numero nota fiscal'].isin(notas_com_problemas)].copy()
+        df_limpo = df.loc[validas, [coluna for coluna in self.COLUNAS_FINAIS if coluna in df.columns]]
 
-            # 2. Remover registros com descrições ambíguas (vários códigos para mesma descrição)
-            descricoes_ambiguas = df_limpo.groupby('Descrição do produto')['Código produto'].nunique()
-            descricoes_ambiguas = descricoes_ambiguas[descricoes_ambiguas > 1].index.tolist()
+        # 3. Calcular 'Valor total produto' (com o valor unitário ainda sem arredondar)
+        df_limpo["Valor total produto"] = (
+            df_limpo["Quantidade do produto"] * df_limpo["Valor unitário"]
+        ).round(2)
 
-            df_limpo = df_limpo[~df_limpo['Descrição do produto'].isin(descricoes_ambiguas)]
+        # 4. Recalcular 'Valor da nota'
+        valor_por_nota = df_limpo.groupby('Numero nota fiscal')['Valor total produto'].sum().round(2)
+        df_limpo['Valor da nota'] = df_limpo['Numero nota fiscal'].map(valor_por_nota)
 
-            # 3. Calcular 'Valor total produto'
-            df_limpo["Valor total produto"] = (
-                df_limpo["Quantidade do produto"] * df_limpo["Valor unitário"]
-            ).round(2)
+        # 5. Arredondar colunas
+        df_limpo['Valor unitário'] = df_limpo['Valor unitário'].round(2)
+        df_limpo['Preço de custo'] = df_limpo['Preço de custo'].round(2)
 
-            # 4. Recalcular 'Valor da nota'
-            valor_por_nota = df_limpo.groupby('Numero nota fiscal')['Valor total produto'].sum().round(2)
-            df_limpo['Valor da nota'] = df_limpo['Numero nota fiscal'].map(valor_por_nota)
+        # 6. Selecionar colunas finais
+        df_limpo = df_limpo[self.COLUNAS_FINAIS]
+        return compactar(df_limpo) if self.compacto else df_limpo
 
-            # 5. Arredondar colunas
-            df_limpo['Valor unitário'] = df_limpo['Valor unitário'].round(2)
-            df_limpo['Preço de custo'] = df_limpo['Preço de custo'].round(2)
+    @medir_metodo("NotasCleaner.clean_em_lotes")
+    def clean_em_lotes(self, lotes) -> pd.DataFrame:
+        """Mesmo resultado de clean(), recebendo as notas em lotes (ver leitura_notas.ler_excel_em_lotes).
 
-            # 6. Selecionar colunas finais
-            colunas_finais = [
-                "Numero nota fiscal", "Data da venda", "Código produto",
-                "Descrição do produto", "Quantidade do produto", "Valor unitário",
-                "Preço de custo", "Valor total produto", "Valor da nota"
-            ]
-            df_limpo = df_limpo[colunas_finais]
+        As regras de linha (quantidade <= 0, valor unitário zerado, cálculos e arredondamentos)
+        rodam em cada lote, que é guardado já reduzido às colunas finais em formato Arrow.
+        Só as regras entre notas (notas com problema, descrições ambíguas e 'Valor da nota')
+        usam o estado agregado no fim. Descrições e colunas com números e textos misturados
+        (no lote ou entre lotes) chegam como texto.
+        """
+        notas_com_problemas = set()
+        colunas_lote = [coluna for coluna in self.COLUNAS_FINAIS if coluna != "Valor da nota"]
+        partes = []
+        medida, linhas_lidas = etapa_atual(), 0
+
+        for lote in iterar("leitura dos lotes", lotes):
+            # 1. Linhas com quantidade <= 0 ou valor unitário zerado condenam a nota inteira
+            problema = (lote['Quantidade do produto'] <= 0) | (lote['Valor unitário'] == 0)
+            notas_com_problemas.update(lote.loc[problema, 'Numero nota fiscal'].unique())
+            linhas_lidas += len(lote)
+            medida.descartar("linhas com quantidade <= 0 ou valor unitário zerado", problema.sum())
+
+            # 3 e 5. Cálculos e arredondamentos por linha, sobre uma única cópia das linhas mantidas
+            lote = lote.loc[~problema, [coluna for coluna in colunas_lote if coluna in lote.columns]]
+            valor_unitario = lote["Valor unitário"]
+            lote["Valor total produto"] = (lote["Quantidade do produto"] * valor_unitario).round(2)
+            lote["Valor unitário"] = valor_unitario.round(2)
+            lote["Preço de custo"] = lote["Preço de custo"].round(2)
+            lote["_linha"] = lote.index
+            partes.append(_tabela_arrow(lote[colunas_lote + ["_linha"]]))
+
+        medida.linhas_entrada = linhas_lidas
+        if not partes:
+            return pd.DataFrame(columns=self.COLUNAS_FINAIS)
+
+        df_limpo = _concatenar(partes).to_pandas()
+        df_limpo = df_limpo.set_index("_linha").rename_axis(None)
+
+        # Notas com problema e, entre as que sobram, descrições ambíguas: uma máscara, um filtro
+        with etapa("demais linhas das notas com problema", linhas_entrada=len(df_limpo)) as regra:
+            validas = ~df_limpo['Numero nota fiscal'].isin(notas_com_problemas).to_numpy()
+            regra.linhas_saida = int(validas.sum())
+        with etapa("descrições ambíguas", linhas_entrada=regra.linhas_saida) as regra:
+            validas &= ~self._linhas_ambiguas(df_limpo['Descrição do produto'], df_limpo['Código produto'], validas)
+            regra.linhas_saida = int(validas.sum())
+        df_limpo = df_limpo[validas]
 
-            return df_limpo
+        # 4. Recalcular 'Valor da nota'
+        valor_por_nota = df_limpo.groupby('Numero nota fiscal')['Valor total produto'].sum().round(2)
+        df_limpo = df_limpo.assign(**{'Valor da nota': df_limpo['Numero nota fiscal'].map(valor_por_nota)})
 
-        except Exception as e:
-            raise  # Simplesmente propaga a exceção sem tratamento de log
\ No newline at end of file
+        df_limpo = df_limpo[self.COLUNAS_FINAIS]
+        return compactar(df_limpo) if self.compacto else df_limpo
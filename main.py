@@ -1,35 +1,174 @@
 # main.py
 
+import argparse
+import time
+from datetime import datetime
+from itertools import chain
+
 import pandas as pd
 from limpeza_estoque import EstoqueCleaner
 from limpeza_notas import NotasCleaner
 from limpeza_base_mesclada import BasePreparador
 from substitutos import RecomendadorSubstituto
 from recomendador import RecomendadorCrossSelling
-from main_test import salvar_no_banco
-
-def main():
-    print("[INFO] Iniciando processo de recomendação...\n")
+from gravacao_assincrona import GravadorAssincrono
+from cache_base import CacheBase
+from leitura_notas import ler_excel_em_lotes
+from carga_banco import carga_completa, linhas_associados, linhas_substitutos
+from ingestao import cpus_disponiveis, executar_ramos
+from instrumentacao import PERFILADORES, Execucao, etapa
 
-    # 1. Limpar bases
+def limpar_estoque(caminho_estoque, compacto=False):
     print("[INFO] Limpando base de estoque...")
-    estoque_raw = pd.read_excel("bases/relatorio_produtos.xlsx")
-    df_estoque_limpo = EstoqueCleaner().clean(estoque_raw)
+    with etapa("read_excel estoque") as medida:
+        df_bruto = pd.read_excel(caminho_estoque)
+        medida.linhas_saida = len(df_bruto)
+    df = EstoqueCleaner(compacto).clean(df_bruto)
     print("[INFO] Estoque limpo com sucesso.")
+    return df
 
+
+def limpar_notas(caminho_notas, compacto=False):
     print("[INFO] Limpando base de notas fiscais...")
-    notas_raw = pd.read_excel("bases/relatorio_notas.xlsx")
-    df_notas_limpa = NotasCleaner().clean(notas_raw)
+    df = NotasCleaner(compacto).clean_em_lotes(ler_excel_em_lotes(caminho_notas, colunas=NotasCleaner.COLUNAS_FINAIS))
     print("[INFO] Notas limpas com sucesso.")
+    return df
 
-    # 2. Preparar base final
-    preparador = BasePreparador()
-    df_modelo = preparador.preparar_base(df_estoque_limpo, df_notas_limpa)
 
+def carregar_base(caminho_estoque="bases/relatorio_produtos.xlsx", caminho_notas="bases/relatorio_notas.xlsx",
+                  pasta_cache="cache", compacto=False, paralelo=True):
+    # Saídas de cada etapa ficam em Parquet; só são refeitas quando a origem ou a versão da limpeza mudam.
+    # compacto=True usa tipos menores (tipos_compactos) e tem entradas próprias no cache.
+    # paralelo=True: quando estoque e notas precisam ser refeitos, cada um é lido e limpo em um processo (ingestao.py);
+    # com uma CPU só não há ganho e a carga segue sequencial.
+    # Com uma Execucao ativa (instrumentacao.py), cada etapa e regra de limpeza é medida
+    cache = CacheBase(pasta_cache) if pasta_cache else None
+    versao_modelo = f"{EstoqueCleaner.VERSAO}.{NotasCleaner.VERSAO}.{BasePreparador.VERSAO}"
+    fontes = {
+        "estoque": ([caminho_estoque], EstoqueCleaner.VERSAO, limpar_estoque, (caminho_estoque, compacto)),
+        "notas": ([caminho_notas], NotasCleaner.VERSAO, limpar_notas, (caminho_notas, compacto)),
+        "modelo": ([caminho_estoque, caminho_notas], versao_modelo, None, None),
+    }
+    nomes = {nome: f"{nome}-compacto" if compacto else nome for nome in fontes}
+    chaves = {nome: cache.chave(nomes[nome], arquivos, versao) for nome, (arquivos, versao, _, _) in fontes.items()} \
+        if cache else {}
+
+    def em_cache(nome):
+        return cache is not None and cache.contem(nomes[nome], chaves[nome])
+
+    def etapa_cache(nome, gerar):
+        with etapa(nome) as medida:
+            df = cache.obter(nomes[nome], chaves[nome], gerar) if cache else gerar()
+            medida.linhas_saida = len(df)
+        return df
+
+    def limpar(nome):
+        _, _, funcao, argumentos = fontes[nome]
+        return etapa_cache(nome, lambda: funcao(*argumentos))
+
+    # 1. Limpar bases: com as duas por refazer (e sem o modelo em cache), uma em cada processo
+    limpas = {}
+    if paralelo and cpus_disponiveis() > 1 and not (em_cache("estoque") or em_cache("notas") or em_cache("modelo")):
+        with etapa("leitura paralela"):
+            limpas = executar_ramos({
+                nome: (fontes[nome][2], fontes[nome][3], (pasta_cache, nomes[nome], chaves[nome]) if cache else None)
+                for nome in ("estoque", "notas")
+            })
+    df_estoque_limpo = limpas["estoque"] if "estoque" in limpas else limpar("estoque")
+
+    # 2. Preparar base final
+    df_modelo = etapa_cache(
+        "modelo",
+        lambda: BasePreparador(compacto).preparar_base(
+            df_estoque_limpo, limpas["notas"] if "notas" in limpas else limpar("notas")
+        )
+    )
 
     print(f"[INFO] Base final possui {len(df_modelo)} registros válidos\n")
+    return df_estoque_limpo, df_modelo
+
+
+def descricoes_notas(caminho_notas="bases/relatorio_notas.xlsx", pasta_cache="cache"):
+    """Pares (descrição, código) das notas do histórico que chegam à regra de descrições ambíguas.
+
+    É o estado que atualizar_notas precisa para aplicar a regra ao histórico somado às notas novas.
+    Fica em cache como as outras etapas e só é refeito quando o arquivo de notas muda.
+    """
+    def gerar():
+        cleaner = NotasCleaner()
+        cleaner.clean_em_lotes(ler_excel_em_lotes(caminho_notas, colunas=NotasCleaner.COLUNAS_FINAIS))
+        return cleaner.descricoes
+
+    if not pasta_cache:
+        return gerar()
+    cache = CacheBase(pasta_cache)
+    return cache.obter("descricoes", cache.chave("descricoes", [caminho_notas], NotasCleaner.VERSAO), gerar)
+
+
+def atualizar_notas(cross, df_estoque_limpo, df_modelo, caminho_notas_novas, descricoes,
+                    caminho_notas="bases/relatorio_notas.xlsx"):
+    """Passa só o lote de notas novas pela limpeza e preparação e soma às contagens do cross-selling.
+
+    A regra de descrições ambíguas vale para o histórico todo: `descricoes` (ver descricoes_notas) traz
+    os pares (descrição, código) já vistos. Se as notas novas tornarem ambígua uma descrição que já
+    estava no histórico, as linhas dela saem do histórico (e o 'Valor da nota' dessas notas muda):
+    nesse caso histórico e notas novas são limpos juntos a partir das planilhas e o índice é remontado.
+    Retorna (cross, df_modelo, descricoes) atualizados; descricoes serve para a próxima carga.
+    """
+    print(f"[INFO] Lendo notas novas de '{caminho_notas_novas}'...")
+    cleaner = NotasCleaner(descricoes_anteriores=descricoes)
+    notas_novas = cleaner.clean_em_lotes(ler_excel_em_lotes(caminho_notas_novas, colunas=NotasCleaner.COLUNAS_FINAIS))
+
+    def ambiguas(pares):
+        codigos_por_descricao = pares.groupby("Descrição do produto")["Código produto"].nunique()
+        return set(codigos_por_descricao.index[codigos_por_descricao > 1])
+
+    no_historico = (ambiguas(cleaner.descricoes) - ambiguas(descricoes)) & set(descricoes["Descrição do produto"])
+    if no_historico:
+        print(f"[AVISO] {len(no_historico)} descrições do histórico ficaram ambíguas com as notas novas: "
+              f"histórico e notas novas serão limpos de novo e o índice, remontado.")
+        lotes = chain(*(ler_excel_em_lotes(caminho, colunas=NotasCleaner.COLUNAS_FINAIS)
+                        for caminho in (caminho_notas, caminho_notas_novas)))
+        df_modelo = BasePreparador().preparar_base(df_estoque_limpo, NotasCleaner().clean_em_lotes(lotes))
+        cross = RecomendadorCrossSelling(df_modelo, motor=cross.motor)
+        print(f"[INFO] Índice remontado com {cross.indice.n_notas} notas.")
+        return cross, df_modelo, cleaner.descricoes
+
+    df_novas = BasePreparador().preparar_base(df_estoque_limpo, notas_novas)
+    # Como em cross.atualizar, notas com número já visto ficam de fora
+    df_novas = df_novas[~df_novas["Numero nota fiscal"].isin(cross.indice.notas_vistas)]
+    adicionadas = cross.atualizar(df_novas)
+    df_modelo = pd.concat([df_modelo, df_novas], ignore_index=True)
+    print(f"[INFO] {adicionadas} notas novas incorporadas ({cross.indice.n_notas} no total).")
+    return cross, df_modelo, cleaner.descricoes
+
+
+def montar_cross(df_estoque_limpo, df_modelo, caminho_notas_novas=None, caminho_notas="bases/relatorio_notas.xlsx"):
+    """Índice de cross-selling do histórico e, com `caminho_notas_novas`, das notas novas somadas a ele.
+
+    Retorna (cross, df_modelo); com notas novas, df_modelo já as inclui.
+    """
+    with etapa("RecomendadorCrossSelling (índice)", linhas_entrada=len(df_modelo)):
+        cross = RecomendadorCrossSelling(df_modelo)
+    if caminho_notas_novas:
+        with etapa("notas novas") as medida:
+            cross, df_modelo, _ = atualizar_notas(
+                cross, df_estoque_limpo, df_modelo, caminho_notas_novas, descricoes_notas(caminho_notas), caminho_notas
+            )
+            medida.linhas_saida = len(df_modelo)
+    return cross, df_modelo
+
+
+def main(notas_novas=None):
+    print("[INFO] Iniciando processo de recomendação...\n")
+
+    df_estoque_limpo, df_modelo = carregar_base()
+    cross, df_modelo = montar_cross(df_estoque_limpo, df_modelo, notas_novas)
+    gravador = GravadorAssincrono()
+
     # 3. Recomendação de Substitutos
     cod_produto = 6560
+    inicio_consulta = time.perf_counter()
 
     # busca descrição do produto pesquisado
     desc_produto_pesquisado = None
@@ -42,8 +181,11 @@ def main():
 
     print(f"🔍 Produto pesquisado: {cod_produto} (Substituição)\n")
 
-    recomendador = RecomendadorSubstituto(df_modelo)
-    resultado_sub = recomendador.recomendar(cod_produto)
+    with etapa("RecomendadorSubstituto (índices)", linhas_entrada=len(df_modelo)):
+        recomendador = RecomendadorSubstituto(df_modelo)
+    with etapa("recomendar") as medida:
+        resultado_sub = recomendador.recomendar(cod_produto)
+        medida.linhas_saida = len(resultado_sub)
 
     # 🔹 Adiciona código e descrição do produto pesquisado no DataFrame
     resultado_sub.insert(0, "Código pesquisado", cod_produto)
@@ -55,24 +197,106 @@ def main():
 
     # 4. Recomendação por Cross-Selling
     print(f"🔄 Produto pesquisado: {cod_produto} (Cross-Selling)\n")
-    cross = RecomendadorCrossSelling(df_modelo)
-    regras = cross.gerar_regras(cod_produto, min_support=0.005, min_threshold=1.0, max_len=2)
+    with etapa("gerar_regras") as medida:
+        regras = cross.gerar_regras(cod_produto, min_support=0.005, min_threshold=1.0, max_len=2)
+        medida.linhas_saida = len(regras)
 
     df_formatado = pd.DataFrame()
 
     if regras.empty:
         print("⚠️ Nenhum produto associado encontrado para cross-selling.")
     else:
-        df_formatado = cross.formatar_regras(regras)
+        with etapa("formatar_regras", linhas_entrada=len(regras)) as medida:
+            df_formatado = cross.formatar_regras(regras)
+            medida.linhas_saida = len(df_formatado)
         print("🤝 Produtos frequentemente comprados juntos:")
-        print(df_formatado.head(6).to_string())
+        print(cross.para_exibicao(df_formatado.head(6)).to_string())
 
         # Salvar no banco
-    # Depois de gerar df_modelo, resultado_sub e df_formatado
-    salvar_no_banco(resultado_sub, df_formatado, df_modelo, limite=6)
+    # Depois de gerar df_modelo, resultado_sub e df_formatado: a gravação vai para a fila e a
+    # consulta não espera o banco; fechar() grava o que estiver pendente antes de sair
+    gravador.enfileirar(resultado_sub, df_formatado, df_modelo, limite=6)
+    print(f"[INFO] Consulta concluída em {(time.perf_counter() - inicio_consulta) * 1000:.1f} ms (gravação em segundo plano).")
 
+    with etapa("gravação no banco") as medida:
+        estatisticas = gravador.fechar()
+        medida.linhas_saida = estatisticas['gravados']
+    print(f"[INFO] Gravação concluída: {estatisticas}")
 
     return cod_produto, desc_produto_pesquisado, resultado_sub, df_formatado
 
+def main_lote(saida="saida/cross_selling", formato="csv", processos=None, notas_novas=None):
+    print("[INFO] Iniciando cross-selling em lote para todo o catálogo...\n")
+
+    df_estoque_limpo, df_modelo = carregar_base()
+    cross, df_modelo = montar_cross(df_estoque_limpo, df_modelo, notas_novas)
+    codigos = df_estoque_limpo["Código produto"].unique()
+    with etapa("gerar_lote", linhas_entrada=len(codigos)):
+        arquivos = cross.gerar_lote(
+            codigos,
+            n_recomendacoes=6, min_support=0.005, min_threshold=1.0,
+            saida=saida, formato=formato, processos=processos
+        )
+
+    print(f"[INFO] Cross-selling em lote concluído: {len(arquivos)} arquivos em '{saida}'.")
+    return arquivos
+
+
+def main_carga(saida="saida/cross_selling", processos=None, notas_novas=None):
+    """Recalcula substitutos e cross-selling de todo o catálogo e substitui as tabelas do banco via COPY."""
+    print("[INFO] Iniciando carga completa das recomendações no banco...\n")
+
+    df_estoque_limpo, df_modelo = carregar_base()
+    cross, df_modelo = montar_cross(df_estoque_limpo, df_modelo, notas_novas)
+    agora = datetime.now()
+
+    with etapa("RecomendadorSubstituto (índices)", linhas_entrada=len(df_modelo)):
+        recomendador = RecomendadorSubstituto(df_modelo, verboso=False)
+    with etapa("recomendar_todos") as medida:
+        substitutos = linhas_substitutos(recomendador, recomendador.recomendar_todos(), agora)
+        medida.linhas_saida = len(substitutos)
+
+    codigos = df_estoque_limpo["Código produto"].unique()
+    with etapa("gerar_lote", linhas_entrada=len(codigos)):
+        arquivos = cross.gerar_lote(
+            codigos,
+            n_recomendacoes=6, min_support=0.005, min_threshold=1.0,
+            saida=saida, formato="parquet", processos=processos
+        )
+
+    # As partes do cross-selling são lidas uma a uma durante o COPY
+    with etapa("carga no banco") as medida:
+        totais = carga_completa({
+            "produtos_substitutos": [substitutos],
+            "produtos_associados": (linhas_associados(pd.read_parquet(arquivo), agora) for arquivo in arquivos),
+        })
+        medida.linhas_saida = sum(totais.values())
+    return totais
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Sistema de recomendação")
+    parser.add_argument("--lote", action="store_true", help="gera o cross-selling de todo o catálogo")
+    parser.add_argument("--carga", action="store_true",
+                        help="grava substitutos e cross-selling de todo o catálogo no banco (COPY + troca atômica)")
+    parser.add_argument("--saida", default="saida/cross_selling")
+    parser.add_argument("--formato", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--processos", type=int, default=None)
+    parser.add_argument("--notas-novas", default=None, metavar="CAMINHO",
+                        help="planilha só com as notas novas: limpas e somadas ao índice do histórico, sem refazê-lo")
+    parser.add_argument("--relatorio", default=None,
+                        help="JSON com as medidas de cada etapa (padrão: saida/execucoes/<modo>_<data>.json)")
+    parser.add_argument("--perfilar", default=None, metavar="ETAPA",
+                        help='perfila a etapa com esse nome ou caminho (ex.: "modelo/BasePreparador.preparar_base")')
+    parser.add_argument("--perfilador", choices=PERFILADORES, default="cprofile")
+    args = parser.parse_args()
+
+    modo = "carga" if args.carga else "lote" if args.lote else "consulta"
+    relatorio = args.relatorio or f"saida/execucoes/{modo}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with Execucao(modo, relatorio=relatorio, perfilar=args.perfilar, perfilador=args.perfilador):
+        if args.carga:
+            main_carga(args.saida, args.processos, args.notas_novas)
+        elif args.lote:
+            main_lote(args.saida, args.formato, args.processos, args.notas_novas)
+        else:
+            main(args.notas_novas)
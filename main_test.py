@@ -1,60 +1,48 @@
-import psycopg2
 from psycopg2.extras import execute_values
 from datetime import datetime
+from pandas.api.types import is_integer_dtype
 
-def salvar_no_banco(df_substitutos, df_associados, df_modelo, limite=6):
+from banco import COLUNAS_BANCO, comando_upsert, conexao, remover_antigos
+
+def codigo_para_gravar(df_substitutos, df_modelo):
+    """Código pesquisado, se o resultado puder ser gravado; None (com o motivo no log) se não."""
     # Obter código pesquisado
     if df_substitutos.empty:
         print("[INFO] DataFrame de substitutos vazio. Nenhum registro será inserido.")
-        return
+        return None
 
     codigo_pesquisado = str(df_substitutos.iloc[0]["Código pesquisado"])
 
-    # Verificar se código está no df_modelo (produtos ou categorias)
-    codigo_no_produto = codigo_pesquisado in df_modelo["Código produto"].astype(str).values
+    # Verificar se código está no df_modelo (produtos ou categorias).
+    # Coluna inteira é comparada como número: converter 67 mil códigos para texto a cada gravação custava ~20 ms
+    codigos = df_modelo["Código produto"]
+    if is_integer_dtype(codigos) and codigo_pesquisado.lstrip("-").isdigit():
+        codigo_no_produto = bool((codigos.to_numpy() == int(codigo_pesquisado)).any())
+    else:
+        codigo_no_produto = codigo_pesquisado in codigos.astype(str).values
     codigo_na_categoria = codigo_pesquisado in df_modelo["Categoria"].astype(str).values
 
     if not (codigo_no_produto or codigo_na_categoria):
         print(f"[INFO] Código '{codigo_pesquisado}' não encontrado em produtos nem categorias no df_modelo. Nenhum registro será inserido.")
+        return None
+
+    return codigo_pesquisado
+
+
+def salvar_no_banco(df_substitutos, df_associados, df_modelo, limite=6):
+    codigo_pesquisado = codigo_para_gravar(df_substitutos, df_modelo)
+    if codigo_pesquisado is None:
         return
 
-    # Conexão e criação das tabelas (igual antes)
-    conn = psycopg2.connect(
-        host="localhost",
-        dbname="bd_recomenda",
-        user="postgres",
-        password="recomenda",
-        port=5432
-    )
-    cur = conn.cursor()
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS produtos_substitutos (
-        id SERIAL PRIMARY KEY,
-        produto_pesquisado_cod VARCHAR,
-        produto_pesquisado_des VARCHAR,
-        produto_recomendado_cod VARCHAR,
-        produto_recomendado_des VARCHAR,
-        valor_unitario NUMERIC,
-        margem_percentual NUMERIC,
-        estoque INTEGER,
-        categoria VARCHAR,
-        data_insersao TIMESTAMP
-    );
-    """)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS produtos_associados (
-        id SERIAL PRIMARY KEY,
-        produto_pesquisado_cod VARCHAR,
-        produto_pesquisado_des VARCHAR,
-        produto_associado_cod VARCHAR,
-        produto_associado_des VARCHAR,
-        suporte NUMERIC,
-        confianca NUMERIC,
-        data_insersao TIMESTAMP
-    );
-    """)
+    # Conexão emprestada do pool compartilhado; o esquema já foi criado na abertura do pool
+    with conexao() as conn:
+        with conn.cursor() as cur:
+            inserir_recomendacoes(cur, codigo_pesquisado, df_substitutos, df_associados, limite)
+    print("[INFO] Inserção concluída com sucesso.")
+
 
+def inserir_recomendacoes(cur, codigo_pesquisado, df_substitutos, df_associados, limite=6):
+    """Insere as recomendações com o cursor recebido; commit e conexão ficam com quem chamou."""
     agora = datetime.now()
 
     df_sub_limited = df_substitutos.head(limite)
@@ -69,31 +57,21 @@ def salvar_no_banco(df_substitutos, df_associados, df_modelo, limite=6):
             float(row["Margem %"]),
             int(row["Quantidade estoque"]),
             str(row["Categoria"]),
+            posicao,
             agora
         )
-        for _, row in df_sub_limited.iterrows()
+        for posicao, (_, row) in enumerate(df_sub_limited.iterrows(), start=1)
     ]
 
-    insert_substitutos = """
-        INSERT INTO produtos_substitutos (
-            produto_pesquisado_cod,
-            produto_pesquisado_des,
-            produto_recomendado_cod,
-            produto_recomendado_des,
-            valor_unitario,
-            margem_percentual,
-            estoque,
-            categoria,
-            data_insersao
-        ) VALUES %s
-    """
-
-    execute_values(cur, insert_substitutos, substitutos_values)
-    print(f"[INFO] {len(substitutos_values)} registros inseridos em 'produtos_substitutos'.")
+    # Upsert pelo par (pesquisado, recomendado) e remoção do que saiu do conjunto: gravar de novo não duplica
+    execute_values(cur, comando_upsert('produtos_substitutos', COLUNAS_BANCO['produtos_substitutos']), substitutos_values)
+    remover_antigos(cur, 'produtos_substitutos', codigo_pesquisado, [linha[2] for linha in substitutos_values])
+    print(f"[INFO] {len(substitutos_values)} registros gravados em 'produtos_substitutos'.")
 
+    # Sem regras, main() passa um DataFrame vazio, sem colunas
     df_assoc_filtrado = df_associados[
         df_associados["Antecedente"].astype(str) == codigo_pesquisado
-    ].head(limite)
+    ].head(limite) if not df_associados.empty else df_associados
 
     associados_values = [
         (
@@ -101,30 +79,16 @@ def salvar_no_banco(df_substitutos, df_associados, df_modelo, limite=6):
             str(row["Descrição Antecedente"]),
             str(row["Consequente"]),
             str(row["Descrição Consequente"]),
-            float(str(row["Aparece junto (%)"]).replace("%", "").strip()),
-            float(str(row["Chance de comprar junto (%)"]).replace("%", "").strip()),
+            round(float(row["Aparece junto (%)"]), 2),
+            round(float(row["Chance de comprar junto (%)"]), 2),
+            posicao,
             agora
         )
-        for _, row in df_assoc_filtrado.iterrows()
+        for posicao, (_, row) in enumerate(df_assoc_filtrado.iterrows(), start=1)
     ]
 
-    insert_associados = """
-        INSERT INTO produtos_associados (
-            produto_pesquisado_cod,
-            produto_pesquisado_des,
-            produto_associado_cod,
-            produto_associado_des,
-            suporte,
-            confianca,
-            data_insersao
-        ) VALUES %s
-    """
-
-    execute_values(cur, insert_associados, associados_values)
-    print(f"[INFO] {len(associados_values)} registros inseridos em 'produtos_associados'.")
-
-    conn.commit()
-    cur.close()
-    conn.close()
-    print("[INFO] Inserção concluída com sucesso.")
+    execute_values(cur, comando_upsert('produtos_associados', COLUNAS_BANCO['produtos_associados']), associados_values)
+    remover_antigos(cur, 'produtos_associados', codigo_pesquisado, [linha[2] for linha in associados_values])
+    print(f"[INFO] {len(associados_values)} registros gravados em 'produtos_associados'.")
+
 
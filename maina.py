@@ -1,5 +1,69 @@
+import threading
+import time
+
 import flet as ft
 
+from main import carregar_base
+from servico import ServicoRecomendacao
+
+CAMINHO_ESTOQUE = "bases/relatorio_produtos.xlsx"
+CAMINHO_NOTAS = "bases/relatorio_notas.xlsx"
+N_RECOMENDACOES = 6
+MIN_SUPPORT = 0.005
+N_SUGESTOES = 8
+ESPERA_SUGESTOES = 0.25  # segundos sem digitar antes de buscar sugestões
+
+
+def formatar_moeda(valor):
+    return "R$ " + f"{valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def formatar_percentual(valor):
+    return f"{valor:.2f}%".replace(".", ",")
+
+
+class FilaPesquisa:
+    """Uma thread executa as pesquisas, sempre a mais recente.
+
+    Um pedido novo substitui o que ainda não começou, e `atual(pesquisa)` diz se a pesquisa em
+    andamento já foi superada: quem executa confere entre uma etapa e outra e para de mexer na tela.
+    """
+
+    def __init__(self, executar):
+        self._executar = executar
+        self._condicao = threading.Condition()
+        self._pendente = None
+        self._ultima = 0
+        threading.Thread(target=self._laco, name="pesquisa", daemon=True).start()
+
+    def pedir(self, codigo) -> int:
+        with self._condicao:
+            self._ultima += 1
+            self._pendente = (self._ultima, codigo)
+            self._condicao.notify()
+            return self._ultima
+
+    def cancelar(self):
+        with self._condicao:
+            self._ultima += 1
+            self._pendente = None
+
+    def atual(self, pesquisa) -> bool:
+        return pesquisa == self._ultima
+
+    def _laco(self):
+        while True:
+            with self._condicao:
+                while self._pendente is None:
+                    self._condicao.wait()
+                pesquisa, codigo = self._pendente
+                self._pendente = None
+            try:
+                self._executar(pesquisa, codigo)
+            except Exception as erro:
+                print(f"[ERRO] Falha na pesquisa de '{codigo}': {erro}")
+
+
 def main(page: ft.Page):
     # Configurações da página
     page.title = "Recomenda"
@@ -8,7 +72,9 @@ def main(page: ft.Page):
     page.window_resizable = False
     page.window_prevent_close = True
     page.theme_mode = ft.ThemeMode.LIGHT  # ou DARK para tema escuro
-    
+
+    servico = None  # montado em segundo plano por carregar_modelo
+
     # Elementos da interface
     titulo = ft.Text(
         "Bem-vindo ao Sistema de Recomendações",
@@ -17,149 +83,92 @@ def main(page: ft.Page):
         color=ft.Colors.BLUE_800
     )
 
+    campo_codigo = ft.TextField(
+        label="Código ou descrição",
+        hint_text="ex.: 32581 ou caneta azul",
+        disabled=True,
+        on_submit=lambda e: pesquisar(campo_codigo.value),
+        on_change=lambda e: agendar_sugestoes(campo_codigo.value),
+    )
+    botao_pesquisar = ft.TextButton(
+        content=ft.Row(
+            [
+                ft.Icon(ft.Icons.SEARCH, size=20),
+                ft.Text("Pesquisar")
+            ]
+        ),
+        disabled=True,
+        on_click=lambda e: pesquisar(campo_codigo.value)
+    )
+
     barra_pesquisa = ft.Row(
         [
-            ft.TextField(
-                label="Código",
-                hint_text="ex.: 32581"
-            ), 
-
-            ft.TextButton(
-                content=ft.Row(
-                    [
-                        ft.Icon(ft.Icons.SEARCH, size=20),
-                        ft.Text("Pesquisar")
-                    ]
-                ),
-                on_click=lambda e: print("Pesquisar clicado")
-            ),
-            ft.Row([ft.TextButton(text="Limpar pesquisa")],alignment=ft.MainAxisAlignment.END),
+            campo_codigo,
+            botao_pesquisar,
+            ft.Row([ft.TextButton(text="Limpar pesquisa", on_click=lambda e: limpar())],
+                   alignment=ft.MainAxisAlignment.END),
         ],
         alignment=ft.MainAxisAlignment.START,
     )
 
-    produto = 32581
-    descricao =' Papel A4 -Produto Exemplo Premium'
-    valor = 254.25
-    margem = 56
-    estoque = 41
+    # Sugestões pela descrição, enquanto se digita
+    sugestoes = ft.Column(spacing=0, visible=False, width=750)
 
-    codigo_nao_econtrado = ft.Container(
-        content=ft.Column(
-            [
-                ft.Text(value="RESULTADO DA PESQUISA:", size=16, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800),
-                ft.Text(value=f"Produto {produto} não foi encontrado na Base !!!", style=ft.TextStyle(size=18, color=ft.Colors.BLACK, weight=ft.FontWeight.BOLD))
-            ]
-        )
-    )
-    codigo_foi_encontrado = ft.Container(
-        content=ft.Column(
-            [
-                ft.Text(value="RESULTADO DA PESQUISA:", size=16, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_800),
-                ft.Text(
-                    spans=[
-                        ft.TextSpan(f"Item {produto} - "),
-                        ft.TextSpan(f"{descricao}", style=ft.TextStyle(size=18, weight="bold", color=ft.Colors.BLUE)),
-                        ft.TextSpan(" - Valor "),
-                        ft.TextSpan(f"R$ {valor}", style=ft.TextStyle(size=18, weight="bold", color=ft.Colors.BLUE)),
-                        ft.TextSpan(", tem uma Margem "),
-                        ft.TextSpan(f"{margem} %", style=ft.TextStyle(size=18, weight="bold", color=ft.Colors.BLUE)),
-                        ft.TextSpan(f" com estoque de {estoque} unidades."),
-                    ],
-                    size=16
-                )
-            ]
-        )
-    )
-    resultado = [codigo_nao_econtrado, codigo_foi_encontrado]
+    # Carregamento da base e andamento / latência das pesquisas
+    progresso = ft.ProgressBar(value=None, width=750)
+    indicador_pesquisa = ft.ProgressRing(width=16, height=16, stroke_width=2, visible=False)
+    texto_status = ft.Text("Carregando base de dados...", size=12, color=ft.Colors.BLUE_GREY_700)
+    status = ft.Column([progresso, ft.Row([indicador_pesquisa, texto_status])], spacing=5)
+
+    titulo_resultado = ft.Text(value="RESULTADO DA PESQUISA:", size=16, weight=ft.FontWeight.BOLD,
+                               color=ft.Colors.BLUE_800)
+    texto_resultado = ft.Text(size=16)
     resultado_pesquisa = ft.Container(
         content=ft.Row(
             controls=[
-                resultado[1],
+                ft.Column([titulo_resultado, texto_resultado]),
             ],
             spacing=10,
             alignment=ft.MainAxisAlignment.START,
-        )
+        ),
+        visible=False,
+    )
+
+    tabela_recomendados = ft.DataTable(
+        columns=[
+            ft.DataColumn(ft.Text("Código", weight=ft.FontWeight.BOLD)),
+            ft.DataColumn(ft.Text("Descrição", weight=ft.FontWeight.BOLD)),
+            ft.DataColumn(ft.Text("Valor Unitário", weight=ft.FontWeight.BOLD),
+                        numeric=True),
+            ft.DataColumn(ft.Text("Margem %", weight=ft.FontWeight.BOLD),
+                        numeric=True),
+            ft.DataColumn(ft.Text("Estoque", weight=ft.FontWeight.BOLD),
+                        numeric=True),
+        ],
+        rows=[],
+        # Estilização da tabela
+        border=ft.border.all(1, ft.Colors.BLUE_GREY_200),
+        border_radius=8,
+        vertical_lines=ft.border.BorderSide(1, ft.Colors.BLUE_GREY_100),
+        horizontal_lines=ft.border.BorderSide(1, ft.Colors.BLUE_GREY_100),
+        heading_row_color=ft.Colors.BLUE_GREY_50,
+        heading_row_height=40,
+        data_row_color={"hovered": ft.Colors.BLUE_GREY_100},
+        show_checkbox_column=False,
+        width=750,
     )
 
     recomendacao = ft.Container(
     content=ft.Column(
         controls=[
-            ft.Text("PRODUTOS RECOMENDADOS", 
-                   size=16, 
+            ft.Text("PRODUTOS RECOMENDADOS",
+                   size=16,
                    weight=ft.FontWeight.BOLD,
                    color=ft.Colors.BLUE_800),
             ft.Divider(height=1, color=ft.Colors.BLUE_GREY_300),
-            
+
             # Tabela de produtos recomendados
-            ft.DataTable(
-                columns=[
-                    ft.DataColumn(ft.Text("Código", weight=ft.FontWeight.BOLD)),
-                    ft.DataColumn(ft.Text("Descrição", weight=ft.FontWeight.BOLD)),
-                    ft.DataColumn(ft.Text("Valor Unitário", weight=ft.FontWeight.BOLD),
-                                numeric=True),
-                    ft.DataColumn(ft.Text("Margem %", weight=ft.FontWeight.BOLD),
-                                numeric=True),
-                    ft.DataColumn(ft.Text("Estoque", weight=ft.FontWeight.BOLD),
-                                numeric=True),
-                ],
-                rows=[
-                    # Exemplo de registro 1
-                    ft.DataRow(
-                        cells=[
-                            ft.DataCell(ft.Text("48721")),
-                            ft.DataCell(ft.Text("Kit Upgrade Performance")),
-                            ft.DataCell(ft.Text("R$ 189,90")),
-                            ft.DataCell(ft.Text("32,5%")),
-                            ft.DataCell(ft.Text("15")),
-                        ],
-                        on_select_changed=lambda e: print("Produto selecionado: 48721")
-                    ),
-                    # Exemplo de registro 2
-                    ft.DataRow(
-                        cells=[
-                            ft.DataCell(ft.Text("56233")),
-                            ft.DataCell(ft.Text("Sensor de Temperatura Premium")),
-                            ft.DataCell(ft.Text("R$ 79,50")),
-                            ft.DataCell(ft.Text("28,0%")),
-                            ft.DataCell(ft.Text("22")),
-                        ],
-                        on_select_changed=lambda e: print("Produto selecionado: 56233")
-                    ),
-                    # Exemplo de registro 3
-                    ft.DataRow(
-                        cells=[
-                            ft.DataCell(ft.Text("60565")),
-                            ft.DataCell(ft.Text("Conector Blindado 5 polos")),
-                            ft.DataCell(ft.Text("R$ 45,20")),
-                            ft.DataCell(ft.Text("35,5%")),
-                            ft.DataCell(ft.Text("37")),
-                        ],
-                        on_select_changed=lambda e: print("Produto selecionado: 60565")
-                    ),
-                    # Exemplo de registro 4
-                    ft.DataRow(
-                        cells=[
-                            ft.DataCell(ft.Text("71289")),
-                            ft.DataCell(ft.Text("Filtro de Linha com Proteção")),
-                            ft.DataCell(ft.Text("R$ 120,00")),
-                            ft.DataCell(ft.Text("40,0%")),
-                            ft.DataCell(ft.Text("8")),
-                        ],
-                        on_select_changed=lambda e: print("Produto selecionado: 71289")
-                    ),
-                ],
-                # Estilização da tabela
-                border=ft.border.all(1, ft.Colors.BLUE_GREY_200),
-                border_radius=8,
-                vertical_lines=ft.border.BorderSide(1, ft.Colors.BLUE_GREY_100),
-                horizontal_lines=ft.border.BorderSide(1, ft.Colors.BLUE_GREY_100),
-                heading_row_color=ft.Colors.BLUE_GREY_50,
-                heading_row_height=40,
-                data_row_color={"hovered": ft.Colors.BLUE_GREY_100},
-                show_checkbox_column=False,
-                width=750,
-            ),
+            tabela_recomendados,
         ],
         spacing=10
     ),
@@ -167,78 +176,44 @@ def main(page: ft.Page):
     margin=ft.margin.only(bottom=15),
     )
 
+    titulo_associados = ft.Text("PRODUTOS QUE NORMALMENTE SÃO COMPRADOS JUNTOS",
+                                size=16,
+                                weight=ft.FontWeight.BOLD,
+                                color=ft.Colors.BLUE_800)
+    tabela_associados = ft.DataTable(
+        columns=[
+            ft.DataColumn(ft.Text("Código", weight=ft.FontWeight.BOLD)),
+            ft.DataColumn(ft.Text("Descrição", weight=ft.FontWeight.BOLD)),
+            ft.DataColumn(ft.Text("V. Unitário", weight=ft.FontWeight.BOLD),
+                        numeric=True),
+            ft.DataColumn(ft.Text("Margem %", weight=ft.FontWeight.BOLD),
+                        numeric=True),
+            ft.DataColumn(ft.Text("Aparecem Juntos", weight=ft.FontWeight.BOLD),
+                        numeric=True, tooltip="Frequência que aparecem juntos nas vendas"),
+            ft.DataColumn(ft.Text("Comprados Juntos", weight=ft.FontWeight.BOLD),
+                        numeric=True, tooltip="Taxa de conversão quando aparecem juntos"),
+        ],
+        rows=[],
+        # Estilização da tabela (igual ao anterior para manter consistência)
+        border=ft.border.all(1, ft.Colors.BLUE_GREY_200),
+        border_radius=8,
+        vertical_lines=ft.border.BorderSide(1, ft.Colors.BLUE_GREY_100),
+        horizontal_lines=ft.border.BorderSide(1, ft.Colors.BLUE_GREY_100),
+        heading_row_color=ft.Colors.BLUE_GREY_50,
+        heading_row_height=40,
+        data_row_color={"hovered": ft.Colors.BLUE_GREY_100},
+        show_checkbox_column=False,
+        width=850,
+    )
+
     associados = ft.Container(
     content=ft.Column(
         controls=[
-            ft.Text(f"PRODUTOS QUE NORMALMENTE SÃO COMPRADOS JUNTOS COM {produto} {descricao}", 
-                   size=16, 
-                   weight=ft.FontWeight.BOLD,
-                   color=ft.Colors.BLUE_800),
+            titulo_associados,
             ft.Divider(height=1, color=ft.Colors.BLUE_GREY_300),
-            
+
             # Tabela de produtos associados
-            ft.DataTable(
-                columns=[
-                    ft.DataColumn(ft.Text("Código", weight=ft.FontWeight.BOLD)),
-                    ft.DataColumn(ft.Text("Descrição", weight=ft.FontWeight.BOLD)),
-                    ft.DataColumn(ft.Text("V. Unitário", weight=ft.FontWeight.BOLD),
-                                numeric=True),
-                    ft.DataColumn(ft.Text("Margem %", weight=ft.FontWeight.BOLD),
-                                numeric=True),
-                    ft.DataColumn(ft.Text("Aparecem Juntos", weight=ft.FontWeight.BOLD),
-                                numeric=True, tooltip="Frequência que aparecem juntos nas vendas"),
-                    ft.DataColumn(ft.Text("Comprados Juntos", weight=ft.FontWeight.BOLD),
-                                numeric=True, tooltip="Taxa de conversão quando aparecem juntos"),
-                ],
-                rows=[
-                    # Exemplo de registro 1
-                    ft.DataRow(
-                        cells=[
-                            ft.DataCell(ft.Text("38914")),
-                            ft.DataCell(ft.Text("Cabos de Conexão Premium")),
-                            ft.DataCell(ft.Text("R$ 65,80")),
-                            ft.DataCell(ft.Text("30,2%")),
-                            ft.DataCell(ft.Text("78%")),
-                            ft.DataCell(ft.Text("62%")),
-                        ],
-                        on_select_changed=lambda e: print("Produto associado selecionado: 38914")
-                    ),
-                    # Exemplo de registro 2
-                    ft.DataRow(
-                        cells=[
-                            ft.DataCell(ft.Text("45672")),
-                            ft.DataCell(ft.Text("Fonte Alimentação 12V 5A")),
-                            ft.DataCell(ft.Text("R$ 89,90")),
-                            ft.DataCell(ft.Text("35,0%")),
-                            ft.DataCell(ft.Text("65%")),
-                            ft.DataCell(ft.Text("58%")),
-                        ],
-                        on_select_changed=lambda e: print("Produto associado selecionado: 45672")
-                    ),
-                    # Exemplo de registro 3
-                    ft.DataRow(
-                        cells=[
-                            ft.DataCell(ft.Text("52108")),
-                            ft.DataCell(ft.Text("Suporte Metálico Universal")),
-                            ft.DataCell(ft.Text("R$ 32,50")),
-                            ft.DataCell(ft.Text("40,5%")),
-                            ft.DataCell(ft.Text("72%")),
-                            ft.DataCell(ft.Text("45%")),
-                        ],
-                        on_select_changed=lambda e: print("Produto associado selecionado: 52108")
-                    ),
-                ],
-                # Estilização da tabela (igual ao anterior para manter consistência)
-                border=ft.border.all(1, ft.Colors.BLUE_GREY_200),
-                border_radius=8,
-                vertical_lines=ft.border.BorderSide(1, ft.Colors.BLUE_GREY_100),
-                horizontal_lines=ft.border.BorderSide(1, ft.Colors.BLUE_GREY_100),
-                heading_row_color=ft.Colors.BLUE_GREY_50,
-                heading_row_height=40,
-                data_row_color={"hovered": ft.Colors.BLUE_GREY_100},
-                show_checkbox_column=False,
-                width=850,
-            ),
+            tabela_associados,
         ],
         spacing=10
     ),
@@ -246,6 +221,201 @@ def main(page: ft.Page):
     margin=ft.margin.only(bottom=15),
 )
 
+    def linha(valores, codigo):
+        # Clicar em uma linha pesquisa o produto dela
+        return ft.DataRow(
+            cells=[ft.DataCell(ft.Text(str(valor))) for valor in valores],
+            on_select_changed=lambda e: pesquisar(codigo),
+        )
+
+    def mostrar_produto(codigo):
+        produtos = servico.cross.produtos
+        if codigo not in produtos.index:
+            texto_resultado.spans = None
+            texto_resultado.value = f"Produto {codigo} não foi encontrado na Base !!!"
+            texto_resultado.style = ft.TextStyle(size=18, color=ft.Colors.BLACK, weight=ft.FontWeight.BOLD)
+            titulo_associados.value = "PRODUTOS QUE NORMALMENTE SÃO COMPRADOS JUNTOS"
+            return
+
+        produto = produtos.loc[codigo]
+        destaque = ft.TextStyle(size=18, weight="bold", color=ft.Colors.BLUE)
+        texto_resultado.value = None
+        texto_resultado.style = None
+        texto_resultado.spans = [
+            ft.TextSpan(f"Item {codigo} - "),
+            ft.TextSpan(f"{produto['Descrição do produto']}", style=destaque),
+            ft.TextSpan(" - Valor "),
+            ft.TextSpan(formatar_moeda(produto['Valor unitário']), style=destaque),
+            ft.TextSpan(", tem uma Margem "),
+            ft.TextSpan(formatar_percentual(produto['Margem %'] * 100), style=destaque),
+            ft.TextSpan(f" com estoque de {int(produto['Quantidade estoque'])} unidades."),
+        ]
+        titulo_associados.value = (f"PRODUTOS QUE NORMALMENTE SÃO COMPRADOS JUNTOS COM {codigo} "
+                                   f"{produto['Descrição do produto']}")
+
+    def linhas_associados(df_associados):
+        produtos = servico.cross.produtos
+        for _, regra in df_associados.iterrows():
+            codigo = regra['Consequente']
+            # Consequente com mais de um produto ("123 + 456") não tem preço e margem únicos
+            if isinstance(codigo, str) or codigo not in produtos.index:
+                valor = margem = "-"
+            else:
+                valor = formatar_moeda(produtos.at[codigo, 'Valor unitário'])
+                margem = formatar_percentual(produtos.at[codigo, 'Margem %'] * 100)
+            yield linha([codigo, regra['Descrição Consequente'], valor, margem,
+                         formatar_percentual(regra['Aparece junto (%)']),
+                         formatar_percentual(regra['Chance de comprar junto (%)'])],
+                        None if isinstance(codigo, str) else codigo)
+
+    trava_tela = threading.Lock()
+
+    def na_tela(pesquisa, alterar):
+        # Só mexe na tela se a pesquisa ainda for a mais recente; a trava evita que uma pesquisa
+        # superada escreva depois de pesquisar()/limpar() terem limpado as tabelas
+        with trava_tela:
+            if not fila.atual(pesquisa):
+                return False
+            alterar()
+            page.update()
+            return True
+
+    def executar_pesquisa(pesquisa, codigo):
+        # Roda na thread da FilaPesquisa; a cada etapa, desiste se outra pesquisa já foi pedida
+        inicio = time.perf_counter()
+        if not na_tela(pesquisa, lambda: mostrar_produto(codigo)):
+            return
+
+        df_substitutos = servico.substitutos(codigo, N_RECOMENDACOES)
+        tempo_substitutos = time.perf_counter() - inicio
+        for _, produto in df_substitutos.iterrows():
+            nova_linha = linha(
+                [produto['Código produto'], produto['Descrição do produto'],
+                 formatar_moeda(produto['Valor unitário']), formatar_percentual(produto['Margem %']),
+                 int(produto['Quantidade estoque'])],
+                int(produto['Código produto'])
+            )
+            if not na_tela(pesquisa, lambda: tabela_recomendados.rows.append(nova_linha)):
+                return
+
+        inicio_cross = time.perf_counter()
+        # As regras vêm em pares (ida e volta); na tela só as que partem do produto pesquisado
+        df_associados = servico.cross_selling(codigo, 2 * N_RECOMENDACOES, min_support=MIN_SUPPORT)
+        if not df_associados.empty:
+            df_associados = df_associados[df_associados['Antecedente'].astype(str) == str(codigo)].head(N_RECOMENDACOES)
+        tempo_cross = time.perf_counter() - inicio_cross
+        for nova_linha in linhas_associados(df_associados):
+            if not na_tela(pesquisa, lambda: tabela_associados.rows.append(nova_linha)):
+                return
+
+        def concluir():
+            if df_associados.empty:
+                titulo_associados.value += " (nenhum produto associado encontrado)"
+            indicador_pesquisa.visible = False
+            texto_status.value = (f"Pesquisa de {codigo}: substitutos {tempo_substitutos * 1000:.1f} ms | "
+                                  f"cross-selling {tempo_cross * 1000:.1f} ms | "
+                                  f"total {(time.perf_counter() - inicio) * 1000:.1f} ms")
+        na_tela(pesquisa, concluir)
+
+    fila = FilaPesquisa(executar_pesquisa)
+
+    temporizador = None
+
+    def agendar_sugestoes(texto):
+        # Debounce: só busca quando a digitação para por ESPERA_SUGESTOES segundos
+        nonlocal temporizador
+        if temporizador is not None:
+            temporizador.cancel()
+        temporizador = threading.Timer(ESPERA_SUGESTOES, mostrar_sugestoes, args=(texto,))
+        temporizador.daemon = True
+        temporizador.start()
+
+    def mostrar_sugestoes(texto):
+        texto = (texto or "").strip()
+        encontrados = None
+        if servico is not None and len(texto) >= 2 and not texto.isdigit():
+            inicio = time.perf_counter()
+            encontrados = servico.buscar(texto, N_SUGESTOES)
+            tempo_busca = time.perf_counter() - inicio
+
+        with trava_tela:
+            if (campo_codigo.value or "").strip() != texto:
+                return  # o texto mudou enquanto buscava; a próxima chamada mostra as certas
+            sugestoes.controls.clear()
+            if encontrados is not None:
+                for _, produto in encontrados.iterrows():
+                    codigo = int(produto['Código produto'])
+                    sugestoes.controls.append(ft.ListTile(
+                        title=ft.Text(f"{codigo} - {produto['Descrição do produto']}", size=14),
+                        dense=True,
+                        on_click=lambda e, codigo=codigo: pesquisar(codigo),
+                    ))
+                texto_status.value = f"{len(encontrados)} sugestões para '{texto}' em {tempo_busca * 1000:.1f} ms"
+            sugestoes.visible = bool(sugestoes.controls)
+            page.update()
+
+    def pesquisar(valor):
+        if servico is None or valor is None:
+            return
+        texto = str(valor).strip()
+        if not texto.isdigit():
+            # Texto em vez de código: vai direto para o produto mais parecido
+            encontrados = servico.buscar(texto, 1)
+            if encontrados.empty:
+                texto_status.value = f"Nenhum produto encontrado para '{texto}'"
+                page.update()
+                return
+            texto = str(encontrados['Código produto'].iloc[0])
+        codigo = int(texto)
+
+        # A pesquisa anterior, se ainda estiver rodando, não escreve mais na tela
+        with trava_tela:
+            fila.pedir(codigo)
+            campo_codigo.value = str(codigo)
+            sugestoes.controls.clear()
+            sugestoes.visible = False
+            tabela_recomendados.rows.clear()
+            tabela_associados.rows.clear()
+            resultado_pesquisa.visible = True
+            indicador_pesquisa.visible = True
+            texto_status.value = f"Pesquisando {codigo}..."
+            page.update()
+
+    def limpar():
+        with trava_tela:
+            fila.cancelar()
+            campo_codigo.value = ""
+            sugestoes.controls.clear()
+            sugestoes.visible = False
+            tabela_recomendados.rows.clear()
+            tabela_associados.rows.clear()
+            resultado_pesquisa.visible = False
+            indicador_pesquisa.visible = False
+            if servico is not None:
+                texto_status.value = "Pronto."
+            page.update()
+
+    def carregar_modelo():
+        # Em segundo plano: a janela abre logo e mostra o andamento
+        nonlocal servico
+        try:
+            inicio = time.perf_counter()
+            _, df_modelo = carregar_base(CAMINHO_ESTOQUE, CAMINHO_NOTAS)
+            progresso.value = 0.5
+            texto_status.value = "Montando recomendadores..."
+            page.update()
+
+            servico = ServicoRecomendacao(df_modelo)
+            progresso.value = 1
+            progresso.visible = False
+            campo_codigo.disabled = botao_pesquisar.disabled = False
+            texto_status.value = (f"Base carregada em {time.perf_counter() - inicio:.1f} s "
+                                  f"({df_modelo['Código produto'].nunique()} produtos). Pronto.")
+        except Exception as erro:
+            progresso.visible = False
+            texto_status.value = f"Erro ao carregar a base: {erro}"
+            texto_status.color = ft.Colors.RED
+        page.update()
 
     # Área de conteúdo principal
     conteudo = ft.Column(
@@ -261,11 +431,13 @@ def main(page: ft.Page):
         spacing=0,
         scroll=ft.ScrollMode.AUTO
     )
-   
+
     # Layout principal
     layout_principal = ft.Column(
         [
             barra_pesquisa,
+            sugestoes,
+            status,
             ft.Divider(height=1),
             conteudo,
         ],
@@ -273,10 +445,10 @@ def main(page: ft.Page):
         scroll=True,
         spacing=10,
     )
-    
+
     # Barra de status (rodapé)
     barra_status = ft.Text("Sistema Recomenda mvp v1.0 - © 2025   - Paulo Quirino - ", size=12, color=ft.Colors.GREY)
-    
+
     # Adiciona todos os elementos à página
     page.add(
         titulo,
@@ -285,6 +457,8 @@ def main(page: ft.Page):
         ft.Divider(),
         barra_status
     )
+    page.run_thread(carregar_modelo)
 
 # Inicia a aplicação
-ft.app(target=main)
\ No newline at end of file
+if __name__ == "__main__":
+    ft.app(target=main)
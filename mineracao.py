@@ -0,0 +1,102 @@
+# mineracao.py
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+from mlxtend.frequent_patterns import apriori, fpgrowth
+from scipy import sparse
+
+from coocorrencia import COLUNAS_REGRAS, IndiceCoocorrencia, dataframe_esparso, regras_vazias
+
+
+def _itemsets_mlxtend(algoritmo, indice: IndiceCoocorrencia, cod_produto: int, min_contagem: int, max_len: int):
+    linhas = indice.notas_com(cod_produto)
+    if len(linhas) < min_contagem:
+        return {}
+
+    # Só as notas com o produto; colunas abaixo do mínimo não formam itemset frequente
+    sub = indice.submatriz_notas(cod_produto)
+    contagens = np.asarray(sub.sum(axis=0)).ravel()
+    colunas = np.flatnonzero(contagens >= min_contagem)
+    sub = sub[:, colunas].tocsr()
+    pos_produto = int(np.flatnonzero(indice.codigos[colunas] == cod_produto)[0])
+
+    frequentes = algoritmo(dataframe_esparso(sub), min_support=min_contagem / len(linhas), max_len=max_len)
+
+    itemsets = {}
+    for suporte, itemset in zip(frequentes['support'], frequentes['itemsets']):
+        if len(itemset) < 2 or pos_produto not in itemset:
+            continue
+        codigos = frozenset(int(indice.codigos[colunas[i]]) for i in itemset)
+        itemsets[codigos] = int(round(suporte * len(linhas)))
+    return itemsets
+
+
+def itemsets_apriori(indice: IndiceCoocorrencia, cod_produto: int, min_contagem: int, max_len: int):
+    return _itemsets_mlxtend(apriori, indice, cod_produto, min_contagem, max_len)
+
+
+def itemsets_fpgrowth(indice: IndiceCoocorrencia, cod_produto: int, min_contagem: int, max_len: int):
+    return _itemsets_mlxtend(fpgrowth, indice, cod_produto, min_contagem, max_len)
+
+
+def itemsets_contagem(indice: IndiceCoocorrencia, cod_produto: int, min_contagem: int, max_len: int):
+    """Contagem direta: pares saem do índice e trios da coocorrência dentro das notas do produto."""
+    if max_len > 3:
+        raise ValueError("O motor 'contagem' suporta apenas pares e trios (max_len <= 3).")
+
+    indices, conjunta = indice.vizinhos(cod_produto)
+    frequentes = conjunta >= min_contagem
+    indices, conjunta = indices[frequentes], conjunta[frequentes]
+
+    itemsets = {
+        frozenset((int(cod_produto), int(cod))): int(cont)
+        for cod, cont in zip(indice.codigos[indices], conjunta)
+    }
+
+    if max_len >= 3 and len(indices) >= 2:
+        # Par (B, C) dentro das notas que contêm A = trio (A, B, C)
+        sub = indice.submatriz_notas(cod_produto)[:, indices].astype(np.int32)
+        trios = sparse.triu(sub.T @ sub, k=1).tocoo()
+        manter = trios.data >= min_contagem
+        for i, j, cont in zip(trios.row[manter], trios.col[manter], trios.data[manter]):
+            trio = (int(cod_produto), int(indice.codigos[indices[i]]), int(indice.codigos[indices[j]]))
+            itemsets[frozenset(trio)] = int(cont)
+
+    return itemsets
+
+
+MOTORES = {
+    'apriori': itemsets_apriori,
+    'fpgrowth': itemsets_fpgrowth,
+    'contagem': itemsets_contagem,
+}
+
+
+def regras_de_itemsets(indice: IndiceCoocorrencia, itemsets: dict, min_threshold=1.0) -> pd.DataFrame:
+    """Gera todas as regras X -> S \\ X de cada itemset S, com métricas sobre todas as notas."""
+    n = indice.n_notas
+    linhas = []
+    for itemset, cont in itemsets.items():
+        for tamanho in range(1, len(itemset)):
+            for antecedente in combinations(sorted(itemset), tamanho):
+                antecedente = frozenset(antecedente)
+                consequente = itemset - antecedente
+                cont_ant = indice.contar(antecedente)
+                cont_cons = indice.contar(consequente)
+                lift = cont * n / (cont_ant * cont_cons)
+                if lift < min_threshold:
+                    continue
+                linhas.append((
+                    antecedente, consequente, cont_ant / n, cont_cons / n,
+                    cont / n, cont / cont_ant, lift
+                ))
+
+    if not linhas:
+        return regras_vazias()
+
+    # Lift e suporte decrescentes; empates pelos códigos do antecedente e do consequente,
+    # para a ordem não depender da posição dos produtos no índice
+    linhas.sort(key=lambda linha: (-linha[6], -linha[4], sorted(linha[0]), sorted(linha[1])))
+    return pd.DataFrame(linhas, columns=COLUNAS_REGRAS)
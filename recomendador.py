@@ -1,66 +1,221 @@
 # cross_selling.py
 
+import threading
+from multiprocessing import Pool
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
-from mlxtend.frequent_patterns import apriori, association_rules
-from mlxtend.preprocessing import TransactionEncoder
+from coocorrencia import COLUNAS_ASSOCIADOS, IndiceCoocorrencia, IndiceMensal, contagem_minima, regras_vazias
+from mineracao import MOTORES, regras_de_itemsets
+
+FORMATOS_LOTE = ('csv', 'parquet')
+COLUNAS_PRODUTO = ['Descrição do produto', 'Valor unitário', 'Margem %', 'Quantidade estoque']
+# Colunas inteiras do resultado de gerar_lote; as métricas são float64
+TIPOS_LOTE = {'Código pesquisado': np.int64, 'Código associado': np.int64, 'Posição': np.int64}
+
+# Índice compartilhado por cada processo do pool (definido no initializer)
+_indice_lote = None
+
+
+def _iniciar_lote(indice):
+    global _indice_lote
+    _indice_lote = indice
+
+
+def _top_associados(tarefa):
+    codigos, n, min_support, min_threshold = tarefa
+    colunas = {coluna: [] for coluna in ['Código pesquisado'] + COLUNAS_ASSOCIADOS + ['Posição']}
+    for cod in codigos:
+        if cod not in _indice_lote.posicao:
+            continue
+        metricas = _indice_lote.metricas(cod, min_support, min_threshold, n)
+        quantidade = len(metricas['Código associado'])
+        colunas['Código pesquisado'].append(np.full(quantidade, cod, dtype=np.int64))
+        for coluna, valores in metricas.items():
+            colunas[coluna].append(valores)
+        colunas['Posição'].append(np.arange(1, quantidade + 1, dtype=np.int64))
+
+    # Lote sem nenhum associado também sai com os tipos das colunas: as partes têm todas o mesmo esquema
+    return pd.DataFrame({
+        coluna: np.concatenate(partes) if partes else np.empty(0, dtype=TIPOS_LOTE.get(coluna, np.float64))
+        for coluna, partes in colunas.items()
+    })
+
 
 class RecomendadorCrossSelling:
-    def __init__(self, df: pd.DataFrame):
-        self.df = df
+    def __init__(self, df: pd.DataFrame, motor: str = 'contagem'):
+        if motor not in MOTORES:
+            raise ValueError(f"Motor '{motor}' inválido. Use um de {tuple(MOTORES)}.")
+        self.motor = motor
+        self.indice = IndiceCoocorrencia(df)
+        self.produtos = self._dimensao_produtos(df)
+        # Partições mensais só são montadas na primeira consulta com período (inicio/fim/ultimos_meses)
+        self._indice_mensal = None
+        self._pendentes_mensal = [df]
+        self._trava_mensal = threading.Lock()
+
+    @staticmethod
+    def _dimensao_produtos(df: pd.DataFrame) -> pd.DataFrame:
+        return df.drop_duplicates('Código produto').set_index('Código produto')[COLUNAS_PRODUTO]
+
+    def atualizar(self, df_novas: pd.DataFrame) -> int:
+        """Incorpora notas novas (já limpas e preparadas) às contagens.
+
+        Notas com número já visto são ignoradas. Retorna quantas notas novas entraram.
+        """
+        adicionadas = self.indice.atualizar(df_novas)
+        with self._trava_mensal:
+            if self._indice_mensal is None:
+                self._pendentes_mensal.append(df_novas)
+            else:
+                self._indice_mensal.atualizar(df_novas)
+
+        produtos_novos = df_novas[~df_novas['Código produto'].isin(self.produtos.index)]
+        if not produtos_novos.empty:
+            self.produtos = pd.concat([self.produtos, self._dimensao_produtos(produtos_novos)])
+        return adicionadas
+
+    @property
+    def indice_mensal(self) -> IndiceMensal:
+        """Contagens por mês de venda, montadas na primeira vez que são pedidas."""
+        with self._trava_mensal:
+            if self._indice_mensal is None:
+                self._indice_mensal = IndiceMensal()
+                for df in self._pendentes_mensal:
+                    self._indice_mensal.atualizar(df)
+                self._pendentes_mensal = []
+            return self._indice_mensal
+
+    def indice_periodo(self, inicio=None, fim=None, ultimos_meses=None) -> IndiceCoocorrencia:
+        """Índice de todo o histórico ou, com período, a soma das partições mensais dele.
 
-    def gerar_regras(self, cod_produto: int, min_support=0.005, min_threshold=1.0, max_len=2):
-        notas_com_produto = self.df[self.df['Código produto'] == cod_produto]['Numero nota fiscal'].unique()
-        df_filtrado = self.df[self.df['Numero nota fiscal'].isin(notas_com_produto)]
-        transacoes = df_filtrado.groupby('Numero nota fiscal')['Código produto'].apply(list)
+        `inicio`/`fim` são datas ou 'AAAA-MM' (inclusive, por mês); `ultimos_meses=n` pega os n
+        meses terminando em `fim` (ou no último mês com notas).
+        """
+        if ultimos_meses is not None:
+            if inicio is not None:
+                raise ValueError("Informe inicio ou ultimos_meses, não os dois.")
+            return self.indice_mensal.ultimos_meses(ultimos_meses, ate=fim)
+        if inicio is None and fim is None:
+            return self.indice
+        return self.indice_mensal.janela(inicio, fim)
 
-        te = TransactionEncoder()
-        te_ary = te.fit_transform(transacoes)
-        df_onehot = pd.DataFrame(te_ary, columns=te.columns_)
+    def gerar_regras(self, cod_produto: int, min_support=0.005, min_threshold=1.0, max_len=2, motor=None,
+                     inicio=None, fim=None, ultimos_meses=None):
+        """Regras envolvendo cod_produto; com período (ver indice_periodo), suporte e lift são os das notas dele.
 
-        frequent_itemsets = apriori(df_onehot, min_support=min_support, use_colnames=True, max_len=max_len)
-        if frequent_itemsets.empty:
-            return pd.DataFrame()
+        `min_support` é relativo às notas que contêm cod_produto: o padrão 0.005 pede que o itemset
+        apareça em pelo menos 0,5% delas (e em ao menos uma). Suporte, confiança e lift das regras
+        continuam calculados sobre todas as notas.
+        """
+        motor = motor or self.motor
+        if motor not in MOTORES:
+            raise ValueError(f"Motor '{motor}' inválido. Use um de {tuple(MOTORES)}.")
+        indice = self.indice_periodo(inicio, fim, ultimos_meses)
 
+        # Pares saem direto do índice de coocorrência, sem minerar de novo
+        if motor == 'contagem' and max_len <= 2:
+            return indice.regras(cod_produto, min_support=min_support, min_threshold=min_threshold)
 
-        rules = association_rules(frequent_itemsets, metric='lift', min_threshold=min_threshold)
-        produto_str = str(cod_produto)
+        min_contagem = contagem_minima(min_support, indice.contar([cod_produto]))
+        itemsets = MOTORES[motor](indice, int(cod_produto), min_contagem, max_len)
+        if not itemsets:
+            return regras_vazias()
+        return regras_de_itemsets(indice, itemsets, min_threshold=min_threshold)
 
-        regras_produto = rules[
-            rules['antecedents'].apply(lambda x: produto_str in str(x)) |
-            rules['consequents'].apply(lambda x: produto_str in str(x))
+    def gerar_lote(self, codigos=None, n_recomendacoes=6, min_support=0.005, min_threshold=1.0,
+                   saida='saida/cross_selling', formato='csv', tamanho_lote=1000, processos=None,
+                   inicio=None, fim=None, ultimos_meses=None):
+        """Top-N produtos associados para vários códigos (todos os vendidos, se codigos=None).
+
+        Os lotes são distribuídos entre processos e cada lote concluído é gravado em um
+        arquivo próprio em `saida` (parte_00000.csv, ...), sem acumular o resultado em memória.
+        Com período (ver indice_periodo), as métricas são as das notas dele.
+        Retorna a lista de arquivos gerados.
+        """
+        if formato not in FORMATOS_LOTE:
+            raise ValueError(f"Formato '{formato}' inválido. Use um de {FORMATOS_LOTE}.")
+        indice = self.indice_periodo(inicio, fim, ultimos_meses)
+
+        if codigos is None:
+            codigos = indice.codigos
+        codigos = [int(cod) for cod in codigos]
+        tarefas = [
+            (codigos[i:i + tamanho_lote], n_recomendacoes, min_support, min_threshold)
+            for i in range(0, len(codigos), tamanho_lote)
         ]
-        return regras_produto
+
+        pasta = Path(saida)
+        pasta.mkdir(parents=True, exist_ok=True)
+        for antigo in pasta.glob('parte_*'):
+            antigo.unlink()
+
+        descricoes = self.produtos['Descrição do produto']
+
+        arquivos = []
+        with Pool(processes=processos, initializer=_iniciar_lote, initargs=(indice,)) as pool:
+            for i, resultado in enumerate(pool.imap(_top_associados, tarefas)):
+                resultado.insert(1, 'Descrição pesquisada', resultado['Código pesquisado'].map(descricoes))
+                resultado.insert(3, 'Descrição associada', resultado['Código associado'].map(descricoes))
+
+                arquivo = pasta / f'parte_{i:05d}.{formato}'
+                if formato == 'parquet':
+                    resultado.to_parquet(arquivo, index=False)
+                else:
+                    resultado.to_csv(arquivo, index=False)
+                arquivos.append(arquivo)
+                print(f"[INFO] Lote {i + 1}/{len(tarefas)} gravado em {arquivo}")
+
+        return arquivos
 
     def formatar_regras(self, df_regras):
-        produtos_info = self.df.drop_duplicates('Código produto').set_index('Código produto')[
-            ['Descrição do produto', 'Valor unitário', 'Margem %', 'Quantidade estoque']
-        ].to_dict('index')
-
-        def extrair_codigo(itemset):
-            return next(iter(itemset))
-
-        def get_info(cod):
-            return produtos_info.get(cod, {
-                'Descrição do produto': 'PRODUTO NÃO ENCONTRADO',
-                'Valor unitário': 0,
-                'Margem %': 0,
-                'Quantidade estoque': 0
-            })
-
-        resultados = []
-        for _, r in df_regras.iterrows():
-            ant = extrair_codigo(r['antecedents'])
-            cons = extrair_codigo(r['consequents'])
-            info_ant = get_info(ant)
-            info_cons = get_info(cons)
-
-            resultados.append({
-                'Antecedente': ant,
-                'Descrição Antecedente': info_ant['Descrição do produto'],
-                'Consequente': cons,
-                'Descrição Consequente': info_cons['Descrição do produto'],
-                'Aparece junto (%)': f"{r['support']*100:.2f}%",
-                'Chance de comprar junto (%)': f"{r['confidence']*100:.2f}%",
-            })
-
-        return pd.DataFrame(resultados)
+        """Regras com códigos e descrições legíveis, mantendo as métricas numéricas.
+
+        'Aparece junto (%)' e 'Chance de comprar junto (%)' são números em %, e 'Lift' é o lift;
+        o texto com '%' só é montado para exibição, em `para_exibicao`.
+        """
+        antecedentes, desc_antecedentes = self._codigos_e_descricoes(df_regras['antecedents'])
+        consequentes, desc_consequentes = self._codigos_e_descricoes(df_regras['consequents'])
+
+        return pd.DataFrame({
+            'Antecedente': antecedentes,
+            'Descrição Antecedente': desc_antecedentes,
+            'Consequente': consequentes,
+            'Descrição Consequente': desc_consequentes,
+            'Aparece junto (%)': df_regras['support'].to_numpy() * 100,
+            'Chance de comprar junto (%)': df_regras['confidence'].to_numpy() * 100,
+            'Lift': df_regras['lift'].to_numpy(),
+        })
+
+    def _codigos_e_descricoes(self, itemsets):
+        # Itemset de um produto mantém o código inteiro; com mais de um, vira "123 + 456" (em ordem)
+        ordenados = [sorted(itemset) for itemset in itemsets]
+        tamanhos = np.fromiter((len(codigos) for codigos in ordenados), dtype=np.int64, count=len(ordenados))
+        itens = [cod for codigos in ordenados for cod in codigos]
+
+        # Descrição de todos os itens de uma vez, pela posição no índice de produtos
+        descricoes = self.produtos['Descrição do produto']
+        posicoes = descricoes.index.get_indexer(itens)
+        nomes = np.where(posicoes >= 0, descricoes.to_numpy(dtype=object)[posicoes], 'PRODUTO NÃO ENCONTRADO')
+
+        if (tamanhos == 1).all():
+            return np.array(itens, dtype=np.int64 if itens else object), nomes.astype(str).astype(object)
+
+        fins = np.cumsum(tamanhos)
+        codigos, textos = [], []
+        for codigos_regra, inicio, fim in zip(ordenados, fins - tamanhos, fins):
+            codigos.append(codigos_regra[0] if len(codigos_regra) == 1 else ' + '.join(map(str, codigos_regra)))
+            textos.append(' + '.join(map(str, nomes[inicio:fim])))
+        return np.array(codigos, dtype=object), np.array(textos, dtype=object)
+
+    @staticmethod
+    def para_exibicao(df_formatado: pd.DataFrame) -> pd.DataFrame:
+        """Cópia para mostrar na tela: percentuais como texto '12.34%' e lift com 2 casas."""
+        exibicao = df_formatado.copy()
+        for coluna in ('Aparece junto (%)', 'Chance de comprar junto (%)'):
+            if coluna in exibicao:
+                exibicao[coluna] = exibicao[coluna].map('{:.2f}%'.format)
+        if 'Lift' in exibicao:
+            exibicao['Lift'] = exibicao['Lift'].round(2)
+        return exibicao
@@ -0,0 +1,306 @@
+# servico.py
+# Serviço residente de recomendação: carrega a base e monta os recomendadores uma única vez
+# e responde consultas HTTP/JSON de vários terminais ao mesmo tempo.
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from banco import ler_associados, ler_substitutos
+from busca_produtos import IndiceDescricoes
+from cache_consultas import CacheConsultas
+from main import carregar_base
+from recomendador import RecomendadorCrossSelling
+from substitutos import RecomendadorSubstituto
+
+
+def _tipo_inteiro_para(coluna: pd.Series, valores: pd.Series):
+    """Tipo inteiro de `coluna` ou, se os valores não couberem nele, o menor que comporta os dois."""
+    return np.promote_types(coluna.dtype, pd.to_numeric(valores, downcast='integer').dtype)
+
+
+class ServicoRecomendacao:
+    """Recomendadores montados uma vez sobre `df_modelo`; as consultas só leem os índices.
+
+    As respostas passam por um CacheConsultas (LRU + TTL). Quando o estoque de um produto
+    muda, só saem do cache as respostas que dependem dele.
+    """
+
+    def __init__(self, df_modelo: pd.DataFrame, motor: str = 'contagem', capacidade_cache: int = 1024,
+                 ttl_cache: float = 300.0):
+        inicio = time.perf_counter()
+        self.df_modelo = df_modelo
+        self.substituto = RecomendadorSubstituto(df_modelo, verboso=False)
+        self.cross = RecomendadorCrossSelling(df_modelo, motor=motor)
+        self.busca = IndiceDescricoes(df_modelo)
+        self.cache = CacheConsultas(capacidade_cache, ttl_cache)
+        self._trava_estoque = threading.Lock()
+        print(f"[INFO] Recomendadores montados em {time.perf_counter() - inicio:.2f} s")
+
+    def substitutos(self, codigo: int, n_recomendacoes: int = 6) -> pd.DataFrame:
+        # A instância é lida dentro de gerar(), depois de o cache marcar a geração: se atualizar_estoque
+        # trocar o índice a partir daí, a invalidação impede que a resposta antiga fique guardada.
+        # Resposta e dependências saem da mesma instância.
+        usado = []
+
+        def gerar():
+            usado.append(self.substituto)
+            return usado[0].recomendar(codigo, n_recomendacoes)
+
+        return self.cache.obter(
+            ('substitutos', codigo, n_recomendacoes),
+            gerar, lambda resultado: self._dependencias_substitutos(usado[0], codigo, resultado)
+        )
+
+    def buscar(self, texto: str, k: int = 10) -> pd.DataFrame:
+        """Produtos pela descrição (prefixo e aproximada); rápido o bastante para não passar pelo cache."""
+        return self.busca.buscar(texto, k)
+
+    def cross_selling(self, codigo: int, n_recomendacoes: int = 6, min_support=0.005, min_threshold=1.0,
+                      max_len=2, inicio=None, fim=None, ultimos_meses=None) -> pd.DataFrame:
+        def gerar():
+            regras = self.cross.gerar_regras(codigo, min_support=min_support, min_threshold=min_threshold,
+                                             max_len=max_len, inicio=inicio, fim=fim, ultimos_meses=ultimos_meses)
+            if regras.empty:
+                return pd.DataFrame()
+            return self.cross.formatar_regras(regras.head(n_recomendacoes))
+
+        return self.cache.obter(
+            ('cross-selling', codigo, n_recomendacoes, min_support, min_threshold, max_len, inicio, fim, ultimos_meses),
+            gerar, lambda resultado: self._dependencias_cross_selling(codigo, resultado)
+        )
+
+    @staticmethod
+    def _dependencias_substitutos(substituto, codigo, resultado):
+        # Produto pesquisado, produtos devolvidos e as categorias de onde eles podem sair.
+        # Alternativas fora da categoria são sorteadas de todo o estoque: dependem de 'estoque'.
+        codigos = [int(cod) for cod in resultado['Código produto']]
+        if codigo in substituto.posicao:
+            categoria = int(substituto.categoria[substituto.posicao[codigo]])
+        else:
+            categoria = int(codigo) if codigo in substituto.categorias_validas else None
+
+        categorias = {int(substituto.categoria[substituto.posicao[cod]]) for cod in codigos}
+        dependencias = {int(codigo), *codigos, *(('categoria', cat) for cat in categorias)}
+        if categoria is None or not categorias or categorias != {categoria}:
+            dependencias.add(('estoque',))
+        return dependencias
+
+    @staticmethod
+    def _dependencias_cross_selling(codigo, resultado):
+        dependencias = {int(codigo)}
+        for coluna in ('Antecedente', 'Consequente'):
+            if coluna in resultado:
+                for valor in resultado[coluna]:
+                    dependencias.update(int(cod) for cod in str(valor).split(' + '))
+        return dependencias
+
+    def atualizar_estoque(self, quantidades: dict) -> dict:
+        """Aplica novas quantidades em estoque ({código: quantidade}) e invalida só o que depende delas.
+
+        Saem do cache as respostas do produto alterado e as que o trazem na resposta. Se o produto
+        entrou ou saiu do estoque, saem também as de substitutos da sua categoria e as alternativas
+        sorteadas do estoque geral, porque ele pode passar a aparecer (ou deixar de aparecer) nelas.
+        """
+        quantidades = {int(cod): int(qtd) for cod, qtd in quantidades.items()}
+        with self._trava_estoque:
+            df = self.df_modelo
+            novas = df['Código produto'].map(quantidades)
+            mudou = novas.notna() & (novas != df['Quantidade estoque'])
+            if not mudou.any():
+                return {'alterados': 0, 'invalidadas': 0}
+
+            alterados = df.loc[mudou, ['Código produto', 'Código da categoria', 'Quantidade estoque']]
+            alterados = alterados.assign(nova=novas[mudou]).drop_duplicates('Código produto')
+            virou = (alterados['Quantidade estoque'] > 0) != (alterados['nova'] > 0)
+
+            df = df.copy()
+            # Base compacta guarda o estoque em int8/int16: amplia o tipo se a nova quantidade não couber
+            valores = novas[mudou].astype(np.int64)
+            tipo = _tipo_inteiro_para(df['Quantidade estoque'], valores)
+            df['Quantidade estoque'] = df['Quantidade estoque'].astype(tipo)
+            df.loc[mudou, 'Quantidade estoque'] = valores.to_numpy(dtype=tipo)
+            antigo = self.substituto
+            substituto = RecomendadorSubstituto(
+                df, semente=antigo.semente, peso_preco=antigo.peso_preco, peso_margem=antigo.peso_margem,
+                max_distancia_preco=antigo.max_distancia_preco, verboso=False
+            )
+            produtos = self.cross.produtos.copy()
+            estoque_produtos = alterados.set_index('Código produto')['nova'].astype(np.int64)
+            comuns = produtos.index.intersection(estoque_produtos.index)
+            tipo = _tipo_inteiro_para(produtos['Quantidade estoque'], estoque_produtos)
+            produtos['Quantidade estoque'] = produtos['Quantidade estoque'].astype(tipo)
+            produtos.loc[comuns, 'Quantidade estoque'] = estoque_produtos[comuns].to_numpy(dtype=tipo)
+
+            # Troca das referências: consultas em andamento terminam com a instância antiga
+            self.df_modelo, self.substituto, self.cross.produtos = df, substituto, produtos
+
+            dependencias = [int(cod) for cod in alterados['Código produto']]
+            if virou.any():
+                dependencias += [('categoria', int(cat)) for cat in alterados.loc[virou, 'Código da categoria'].unique()]
+                dependencias.append(('estoque',))
+            invalidadas = self.cache.invalidar(*dependencias)
+
+        print(f"[INFO] Estoque atualizado: {len(alterados)} produtos, {invalidadas} respostas invalidadas no cache.")
+        return {'alterados': int(len(alterados)), 'invalidadas': invalidadas}
+
+
+# Parâmetros aceitos na query string de cada rota: nome -> (conversão, padrão)
+PARAMETROS = {
+    'substitutos': {'n': (int, 6)},
+    'cross-selling': {'n': (int, 6), 'min_support': (float, 0.005), 'min_threshold': (float, 1.0),
+                      'max_len': (int, 2), 'inicio': (str, None), 'fim': (str, None), 'ultimos_meses': (int, None)},
+}
+
+
+class ManipuladorRecomendacao(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # conexões persistentes: cada terminal reaproveita a sua
+    disable_nagle_algorithm = True  # cabeçalho e corpo saem em escritas separadas; sem isso cada resposta espera ~40 ms
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        partes = [parte for parte in url.path.split('/') if parte]
+
+        if partes == ['saude']:
+            return self._responder(200, {'status': 'ok', 'notas': int(self.server.servico.cross.indice.n_notas)})
+        if partes == ['busca']:
+            return self._responder_busca(parse_qs(url.query))
+        if partes == ['estatisticas']:
+            return self._responder(200, self.server.servico.cache.estatisticas())
+        if len(partes) == 3 and partes[0] == 'salvos' and partes[1] in PARAMETROS:
+            return self._responder_salvos(partes[1], partes[2], parse_qs(url.query))
+        if len(partes) != 2 or partes[0] not in PARAMETROS:
+            return self._responder(404, {'erro': f"Rota '{url.path}' não encontrada."})
+
+        rota, codigo = partes
+        try:
+            codigo = int(codigo)
+            consulta = parse_qs(url.query)
+            parametros = {
+                nome: converter(consulta[nome][0]) if nome in consulta else padrao
+                for nome, (converter, padrao) in PARAMETROS[rota].items()
+            }
+            if parametros['n'] < 1:
+                raise ValueError(f"n deve ser pelo menos 1 (recebido {parametros['n']})")
+        except ValueError as erro:
+            return self._responder(400, {'erro': f"Parâmetro inválido: {erro}"})
+
+        inicio = time.perf_counter()
+        try:
+            if rota == 'substitutos':
+                resultado = self.server.servico.substitutos(codigo, parametros['n'])
+            else:
+                resultado = self.server.servico.cross_selling(
+                    codigo, parametros['n'], parametros['min_support'], parametros['min_threshold'],
+                    parametros['max_len'], parametros['inicio'], parametros['fim'], parametros['ultimos_meses']
+                )
+        except ValueError as erro:
+            return self._responder(400, {'erro': str(erro)})
+
+        self._responder(200, {
+            'codigo': codigo,
+            'recomendacoes': json.loads(resultado.to_json(orient='records', force_ascii=False)),
+            'tempo_ms': round((time.perf_counter() - inicio) * 1000, 3),
+        })
+
+    def _responder_busca(self, consulta):
+        # GET /busca?q=<texto>&k=10: sugestões pela descrição, para quem não sabe o código
+        try:
+            texto = consulta.get('q', [''])[0]
+            k = int(consulta['k'][0]) if 'k' in consulta else 10
+        except ValueError as erro:
+            return self._responder(400, {'erro': f"Parâmetro inválido: {erro}"})
+
+        inicio = time.perf_counter()
+        resultado = self.server.servico.buscar(texto, k)
+        self._responder(200, {
+            'texto': texto,
+            'produtos': json.loads(resultado.to_json(orient='records', force_ascii=False)),
+            'tempo_ms': round((time.perf_counter() - inicio) * 1000, 3),
+        })
+
+    def _responder_salvos(self, rota, codigo, consulta):
+        # Recomendações já gravadas no banco (salvar_no_banco / main.py --carga), sem recalcular
+        try:
+            codigo = int(codigo)
+            limite = int(consulta['n'][0]) if 'n' in consulta else 6
+        except ValueError as erro:
+            return self._responder(400, {'erro': f"Parâmetro inválido: {erro}"})
+
+        inicio = time.perf_counter()
+        try:
+            ler = ler_substitutos if rota == 'substitutos' else ler_associados
+            resultado = ler(codigo, limite)
+        except psycopg2.Error as erro:
+            return self._responder(503, {'erro': f"Banco indisponível: {erro}".strip()})
+
+        self._responder(200, {
+            'codigo': codigo,
+            'recomendacoes': json.loads(resultado.to_json(orient='records', date_format='iso', force_ascii=False)),
+            'tempo_ms': round((time.perf_counter() - inicio) * 1000, 3),
+        })
+
+    def do_POST(self):
+        # POST /estoque com {"<código>": <quantidade>, ...}
+        if urlsplit(self.path).path.strip('/') != 'estoque':
+            return self._responder(404, {'erro': f"Rota '{self.path}' não encontrada."})
+        try:
+            tamanho = int(self.headers.get('Content-Length', 0))
+            quantidades = json.loads(self.rfile.read(tamanho) or b'{}')
+            resultado = self.server.servico.atualizar_estoque(quantidades)
+        except (ValueError, AttributeError) as erro:
+            return self._responder(400, {'erro': f"Corpo inválido: {erro}"})
+        self._responder(200, resultado)
+
+    def _responder(self, status: int, corpo: dict):
+        dados = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, formato, *args):
+        if self.server.verboso:
+            super().log_message(formato, *args)
+
+
+def criar_servidor(servico: ServicoRecomendacao, host='127.0.0.1', porta=8000, verboso=False):
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorRecomendacao)
+    servidor.daemon_threads = True
+    servidor.servico = servico
+    servidor.verboso = verboso
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço HTTP/JSON de recomendação")
+    parser.add_argument("--estoque", default="bases/relatorio_produtos.xlsx")
+    parser.add_argument("--notas", default="bases/relatorio_notas.xlsx")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--motor", default="contagem")
+    parser.add_argument("--capacidade-cache", type=int, default=1024, help="respostas mantidas no cache LRU")
+    parser.add_argument("--ttl-cache", type=float, default=300.0, help="validade de cada resposta, em segundos")
+    parser.add_argument("--verboso", action="store_true", help="registra cada requisição no terminal")
+    parser.add_argument("--compacto", action="store_true", help="df_modelo com tipos compactos (menos memória)")
+    args = parser.parse_args()
+
+    _, df_modelo = carregar_base(args.estoque, args.notas, compacto=args.compacto)
+    servico = ServicoRecomendacao(df_modelo, args.motor, args.capacidade_cache, args.ttl_cache)
+    servidor = criar_servidor(servico, args.host, args.porta, args.verboso)
+    print(f"[INFO] Serviço ouvindo em http://{args.host}:{args.porta} "
+          f"(/substitutos/<codigo>, /cross-selling/<codigo>, /busca?q=, /salvos/..., /estatisticas, /saude, POST /estoque)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INFO] Encerrando serviço...")
+    finally:
+        servidor.server_close()
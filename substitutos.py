@@ -1,74 +1,228 @@
+import numpy as np
 import pandas as pd
 
+from tipos_compactos import valores_float64
+
 class RecomendadorSubstituto:
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, semente: int = 0, peso_preco: float = 0.7, peso_margem: float = 0.3,
+                 max_distancia_preco: float = None, verboso: bool = True):
         self.df = df.drop_duplicates(subset='Código produto')
-        self.categorias_validas = df['Código da categoria'].unique()
+        self.categorias_validas = set(df['Código da categoria'].unique())
+        self.semente = semente
+        self.verboso = verboso  # False silencia as mensagens (ex.: consultas concorrentes no servico.py)
+
+        # Similaridade = peso_preco * (1 - |Δpreço| / preço) + peso_margem * (1 - |Δmargem|).
+        # max_distancia_preco (ex.: 0.3 = ±30% do preço pesquisado) descarta candidatos fora da faixa.
+        self.peso_preco = peso_preco
+        self.peso_margem = peso_margem
+        self.max_distancia_preco = max_distancia_preco
+
+        # Índices montados uma única vez: código -> posição (linha de self.df)
+        codigos = self.df['Código produto'].to_numpy()
+        self.posicao = {int(cod): i for i, cod in enumerate(codigos)}
+        self.preco = valores_float64(self.df['Valor unitário'])  # float64 também com a base compacta
+        self.margem = valores_float64(self.df['Margem %'])
+        self.categoria = self.df['Código da categoria'].to_numpy()
+
+        # Produtos em estoque agrupados por categoria em arrays contíguos, ordenados por preço e margem
+        # (empates na ordem original); a busca dos vizinhos parte da posição do preço pesquisado
+        em_estoque = np.flatnonzero(self.df['Quantidade estoque'].to_numpy() > 0)
+        ordem = em_estoque[np.lexsort((self.margem[em_estoque], self.preco[em_estoque], self.categoria[em_estoque]))]
+        categorias, inicios = np.unique(self.categoria[ordem], return_index=True)
+        fins = np.append(inicios[1:], len(ordem))
+
+        self.pool_em_estoque = em_estoque
+        self.estoque_por_categoria = ordem
+        self.preco_por_categoria = self.preco[ordem]
+        self.margem_por_categoria = self.margem[ordem]
+        self.faixa_categoria = {
+            int(cat): (int(inicio), int(fim)) for cat, inicio, fim in zip(categorias, inicios, fins)
+        }
+
+    def _distancia(self, preco_base, margem_base, preco, margem):
+        """Distância relativa de preço e distância ponderada (peso total - similaridade).
+
+        Candidatos sem preço ou fora de `max_distancia_preco` recebem distância infinita.
+        """
+        distancia_preco = np.abs(preco - preco_base) / preco_base
+        distancia = self.peso_preco * distancia_preco + self.peso_margem * np.abs(margem - margem_base)
+        fora = np.isnan(distancia)
+        if self.max_distancia_preco is not None:
+            fora |= distancia_preco > self.max_distancia_preco
+        return distancia_preco, np.where(fora, np.inf, distancia)
+
+    def _lado_encerrado(self, preco_base, preco_borda, pior):
+        # Preços só se afastam a partir da borda, e a margem só soma distância:
+        # peso_preco * distância de preço da borda é um limite inferior para tudo que está além dela
+        if preco_borda is None:
+            return True
+        distancia_preco = abs(preco_borda - preco_base) / preco_base
+        if self.max_distancia_preco is not None and distancia_preco > self.max_distancia_preco:
+            return True
+        return self.peso_preco * distancia_preco > pior
+
+    def _vizinhos(self, pos: int, n: int):
+        """Os `n` produtos em estoque mais similares a `pos` na mesma categoria, do mais similar ao menos.
+
+        Busca binária pelo preço pesquisado e janela que dobra para os dois lados até que nada além
+        das bordas possa superar o n-ésimo melhor. Empates ficam na ordem de preço e margem.
+        """
+        inicio, fim = self.faixa_categoria.get(int(self.categoria[pos]), (0, 0))
+        candidatos = self.estoque_por_categoria[inicio:fim]
+        precos = self.preco_por_categoria[inicio:fim]
+        margens = self.margem_por_categoria[inicio:fim]
+        preco_base, margem_base = self.preco[pos], self.margem[pos]
+
+        centro = int(np.searchsorted(precos, preco_base))
+        largura = max(n, 8)
+        while True:
+            esq, dir = max(0, centro - largura), min(len(candidatos), centro + largura)
+            _, distancia = self._distancia(preco_base, margem_base, precos[esq:dir], margens[esq:dir])
+            distancia[candidatos[esq:dir] == pos] = np.inf
+
+            melhores = np.argsort(distancia, kind='stable')[:n]
+            melhores = melhores[np.isfinite(distancia[melhores])]
+            pior = distancia[melhores[-1]] if len(melhores) == n else np.inf
+
+            if (self._lado_encerrado(preco_base, precos[esq - 1] if esq > 0 else None, pior) and
+                    self._lado_encerrado(preco_base, precos[dir] if dir < len(candidatos) else None, pior)):
+                return candidatos[esq + melhores]
+            largura *= 2
+
+    def _log(self, *mensagem):
+        if self.verboso:
+            print(*mensagem)
+
+    def _rng(self, codigo: int):
+        # Mesma consulta -> mesma amostra, independente da ordem das chamadas
+        return np.random.default_rng([self.semente, abs(int(codigo))])
+
+    @staticmethod
+    def _validar_n(n_recomendacoes: int):
+        if n_recomendacoes < 1:
+            raise ValueError(f"n_recomendacoes deve ser pelo menos 1 (recebido {n_recomendacoes}).")
 
     def recomendar(self, codigo_pesquisado: int, n_recomendacoes: int = 6):
-        if codigo_pesquisado in self.df['Código produto'].values:
+        self._validar_n(n_recomendacoes)
+        if codigo_pesquisado in self.posicao:
             return self._recomendar_por_produto(codigo_pesquisado, n_recomendacoes)
         elif codigo_pesquisado in self.categorias_validas:
             return self._recomendar_por_categoria(codigo_pesquisado, n_recomendacoes)
         else:
-            print(f"⚠️ Código {codigo_pesquisado} não corresponde a produto ou categoria válida.")
-            print("\n📦 Resultado da Recomendação de Substitutos:")
-            return self._formatar_resultado(None, self._recomendar_alternativas(n_recomendacoes))
-    
+            self._log(f"⚠️ Código {codigo_pesquisado} não corresponde a produto ou categoria válida.")
+            self._log("\n📦 Resultado da Recomendação de Substitutos:")
+            return self._formatar_resultado(None, self._recomendar_alternativas(n_recomendacoes, codigo_pesquisado))
+
     def _recomendar_por_produto(self, cod_produto: int, n: int):
-        produto_base = self.df[self.df['Código produto'] == cod_produto].iloc[0]
-        
+        pos = self.posicao[int(cod_produto)]
+        produto_base = self.df.iloc[pos]
+
         if produto_base['Quantidade estoque'] > 0:
-            print(f"ℹ️ Produto {cod_produto} em estoque. Mostrando alternativas similares:")
+            self._log(f"ℹ️ Produto {cod_produto} em estoque. Mostrando alternativas similares:")
         else:
-            print(f"⚠️ Produto {cod_produto} sem estoque. Mostrando alternativas:")
-        
-        substitutos = self.df[
-            (self.df['Código da categoria'] == produto_base['Código da categoria']) &
-            (self.df['Código produto'] != cod_produto) &
-            (self.df['Quantidade estoque'] > 0)
-        ].copy()
-        
-        if not substitutos.empty:
-            substitutos['similaridade'] = (
-                0.7 * (1 - (substitutos['Valor unitário'] - produto_base['Valor unitário']).abs() / produto_base['Valor unitário']) +
-                0.3 * (1 - (substitutos['Margem %'] - produto_base['Margem %']).abs())
-            )
-            return self._formatar_resultado(produto_base, substitutos.nsmallest(n, 'similaridade'))
-        
-        print("⚠️ Nenhum substituto na mesma categoria.")
-        return self._formatar_resultado(produto_base, self._recomendar_alternativas(n))
-    
+            self._log(f"⚠️ Produto {cod_produto} sem estoque. Mostrando alternativas:")
+
+        melhores = self._vizinhos(pos, n)
+        if len(melhores):
+            return self._formatar_resultado(produto_base, self.df.iloc[melhores])
+
+        self._log("⚠️ Nenhum substituto na mesma categoria.")
+        return self._formatar_resultado(produto_base, self._recomendar_alternativas(n, cod_produto))
+
+    def recomendar_todos(self, n_recomendacoes: int = 6, max_elementos: int = 1 << 22) -> pd.DataFrame:
+        """Top-N substitutos de todos os produtos de uma vez, em formato longo.
+
+        Para cada categoria, a distância entre os produtos consultados e os candidatos em
+        estoque é calculada como matriz NumPy, em blocos de até `max_elementos` valores.
+        A ordem é a mesma de `recomendar`; produtos sem substituto em estoque na mesma
+        categoria (ou dentro de `max_distancia_preco`) ficam fora da tabela.
+        Colunas: Código pesquisado, Código recomendado, Similaridade, Posição.
+        """
+        self._validar_n(n_recomendacoes)
+        codigos = self.df['Código produto'].to_numpy()
+        ordem = np.argsort(self.categoria, kind='stable')
+        categorias, inicios = np.unique(self.categoria[ordem], return_index=True)
+        fins = np.append(inicios[1:], len(ordem))
+
+        pesquisados, recomendados, similaridades, posicoes = [], [], [], []
+        for cat, inicio, fim in zip(categorias, inicios, fins):
+            if int(cat) not in self.faixa_categoria:
+                continue
+            ini_cand, fim_cand = self.faixa_categoria[int(cat)]
+            candidatos = self.estoque_por_categoria[ini_cand:fim_cand]
+            preco_cand = self.preco_por_categoria[ini_cand:fim_cand]
+            margem_cand = self.margem_por_categoria[ini_cand:fim_cand]
+            k = min(n_recomendacoes, len(candidatos))
+
+            consultas = ordem[inicio:fim]
+            passo = max(1, max_elementos // len(candidatos))
+            for i in range(0, len(consultas), passo):
+                linhas = consultas[i:i + passo]
+                _, distancia = self._distancia(
+                    self.preco[linhas, None], self.margem[linhas, None], preco_cand, margem_cand
+                )
+                # O próprio produto nunca é seu substituto
+                distancia[linhas[:, None] == candidatos[None, :]] = np.inf
+
+                # Mesma ordem de _vizinhos: distância crescente e, no empate, ordem de preço e margem.
+                # Os k menores entram pelo valor de corte; empates no corte ficam com os primeiros da faixa.
+                corte = np.partition(distancia, k - 1, axis=1)[:, k - 1:k]
+                empate = distancia == corte
+                faltam = k - (distancia < corte).sum(axis=1, keepdims=True)
+                escolhidos = (distancia < corte) | (empate & (np.cumsum(empate, axis=1) <= faltam))
+                top = np.nonzero(escolhidos)[1].reshape(len(linhas), k)
+
+                valores = np.take_along_axis(distancia, top, axis=1)
+                ordem_top = np.lexsort((top, valores), axis=-1)
+                top = np.take_along_axis(top, ordem_top, axis=1)
+                valores = np.take_along_axis(valores, ordem_top, axis=1)
+
+                validos = np.isfinite(valores)
+                pesquisados.append(np.repeat(codigos[linhas], k)[validos.ravel()])
+                recomendados.append(codigos[candidatos[top]][validos])
+                similaridades.append(self.peso_preco + self.peso_margem - valores[validos])
+                posicoes.append(np.cumsum(validos, axis=1)[validos])
+
+        if not pesquisados:
+            return pd.DataFrame(columns=['Código pesquisado', 'Código recomendado', 'Similaridade', 'Posição'])
+
+        tabela = pd.DataFrame({
+            'Código pesquisado': np.concatenate(pesquisados),
+            'Código recomendado': np.concatenate(recomendados),
+            'Similaridade': np.concatenate(similaridades),
+            'Posição': np.concatenate(posicoes),
+        })
+        return tabela.sort_values(['Código pesquisado', 'Posição'], kind='stable').reset_index(drop=True)
+
     def _recomendar_por_categoria(self, cod_categoria: int, n: int):
-        produtos_categoria = self.df[
-            (self.df['Código da categoria'] == cod_categoria) &
-            (self.df['Quantidade estoque'] > 0)
-        ]
-        
-        if not produtos_categoria.empty:
-            categoria_nome = produtos_categoria.iloc[0]['Categoria']
-            print(f"ℹ️ Categoria {categoria_nome} encontrada.")
-            return self._formatar_resultado(produtos_categoria.iloc[0], produtos_categoria.sample(min(n, len(produtos_categoria))))
-        
-        print(f"⚠️ Categoria {cod_categoria} sem produtos em estoque.")
-        return self._formatar_resultado(None, self._recomendar_alternativas(n))
-    
-    def _recomendar_alternativas(self, n: int):
-        alternativas = self.df[self.df['Quantidade estoque'] > 0].sample(min(n, len(self.df)))
-        return alternativas
-    
+        inicio, fim = self.faixa_categoria.get(int(cod_categoria), (0, 0))
+        produtos_categoria = self.estoque_por_categoria[inicio:fim]
+
+        if len(produtos_categoria):
+            categoria_nome = self.df.iloc[produtos_categoria[0]]['Categoria']
+            self._log(f"ℹ️ Categoria {categoria_nome} encontrada.")
+            amostra = self._rng(cod_categoria).choice(produtos_categoria, min(n, len(produtos_categoria)), replace=False)
+            return self._formatar_resultado(self.df.iloc[produtos_categoria[0]], self.df.iloc[amostra])
+
+        self._log(f"⚠️ Categoria {cod_categoria} sem produtos em estoque.")
+        return self._formatar_resultado(None, self._recomendar_alternativas(n, cod_categoria))
+
+    def _recomendar_alternativas(self, n: int, codigo: int = 0):
+        amostra = self._rng(codigo).choice(self.pool_em_estoque, min(n, len(self.pool_em_estoque)), replace=False)
+        return self.df.iloc[amostra]
+
     def _formatar_resultado(self, produto_base, recomendacoes):
         """Formata a saída no padrão consistente"""
         if produto_base is not None:
-            print(f"\n🔄 Produto pesquisado: {produto_base['Código produto']} ({produto_base['Descrição do produto']})")
+            self._log(f"\n🔄 Produto pesquisado: {produto_base['Código produto']} ({produto_base['Descrição do produto']})")
         else:
-            print("\n📦 Resultado da Recomendação de Substitutos:")
-        
-        cols = ['Código produto', 'Descrição do produto', 'Valor unitário', 
+            self._log("\n📦 Resultado da Recomendação de Substitutos:")
+
+        cols = ['Código produto', 'Descrição do produto', 'Valor unitário',
                 'Margem %', 'Quantidade estoque', 'Categoria']
-        
+
         recomendacoes = recomendacoes[cols].copy()
-        recomendacoes['Valor unitário'] = recomendacoes['Valor unitário'].round(2)
-        recomendacoes['Margem %'] = (recomendacoes['Margem %'] * 100).round(2)
-        
+        recomendacoes['Valor unitário'] = valores_float64(recomendacoes['Valor unitário']).round(2)
+        recomendacoes['Margem %'] = (valores_float64(recomendacoes['Margem %']) * 100).round(2)
+
         return recomendacoes
\ No newline at end of file
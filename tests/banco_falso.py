@@ -0,0 +1,69 @@
+# banco_falso.py
+# Conexão, cursor e pool que registram os comandos em vez de falar com o PostgreSQL.
+
+
+def respostas_da_troca(texto, parametros):
+    # Consultas de carga_banco._trocar_tabela: índices e sequência que a tabela de carga criou
+    if texto.startswith("SELECT indexname"):
+        return [(f"{parametros[0]}_carga_chave",), (f"{parametros[0]}_carga_pesquisado_posicao",)]
+    if texto.startswith("SELECT pg_get_serial_sequence"):
+        return [(f"public.{parametros[0]}_carga_id_seq",)]
+    return []
+
+
+class CursorFalso:
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self._resposta = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, comando, parametros=None):
+        texto = ' '.join((comando if isinstance(comando, str) else comando.as_string(self)).split())
+        self.conexao.comandos.append(texto)
+        self.conexao.parametros.append(parametros)
+        self._resposta = self.conexao.responder(texto, parametros)
+
+    def copy_expert(self, comando, arquivo):
+        self.conexao.comandos.append(comando)
+        self.conexao.parametros.append(None)
+        self.conexao.copiado.append(arquivo.read())
+
+    def fetchall(self):
+        return self._resposta
+
+    def fetchone(self):
+        return self._resposta[0] if self._resposta else None
+
+
+class ConexaoFalsa:
+    def __init__(self, responder=respostas_da_troca):
+        self.responder = responder
+        self.comandos, self.parametros, self.copiado = [], [], []
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def commit(self):
+        self.comandos.append("COMMIT")
+        self.parametros.append(None)
+
+    def rollback(self):
+        self.comandos.append("ROLLBACK")
+        self.parametros.append(None)
+
+
+class PoolFalso:
+    def __init__(self, conexao):
+        self.conexao, self.emprestadas = conexao, 0
+
+    def getconn(self):
+        self.emprestadas += 1
+        return self.conexao
+
+    def putconn(self, conexao):
+        self.emprestadas -= 1
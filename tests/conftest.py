@@ -0,0 +1,21 @@
+# conftest.py
+# Os módulos do projeto ficam na raiz do repositório, sem pacote.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def df_modelo():
+    """df_modelo de uma base sintética pequena, passada pelos cleaners e pelo BasePreparador."""
+    from dados_sinteticos import gerar_bases
+    from limpeza_base_mesclada import BasePreparador
+    from limpeza_estoque import EstoqueCleaner
+    from limpeza_notas import NotasCleaner
+
+    df_estoque, df_notas = gerar_bases(20_000, semente=0)
+    return BasePreparador().preparar_base(EstoqueCleaner().clean(df_estoque), NotasCleaner().clean(df_notas))
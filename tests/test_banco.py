@@ -0,0 +1,65 @@
+import sqlite3
+
+from banco import (COLUNAS_BANCO, INDICES, MIGRACOES, TABELAS, comando_upsert, comandos_tabela, criar_esquema,
+                   remover_antigos)
+from banco_falso import ConexaoFalsa, CursorFalso
+
+
+def test_upsert_atualiza_o_par_existente_em_vez_de_duplicar():
+    # O SQLite entende o mesmo INSERT ... ON CONFLICT (...) DO UPDATE do PostgreSQL
+    conn = sqlite3.connect(':memory:')
+    for comando in comandos_tabela('produtos_associados'):
+        conn.execute(comando)
+    colunas = COLUNAS_BANCO['produtos_associados']
+    # execute_values troca o %s pelas tuplas; aqui, um marcador por coluna e executemany
+    comando = comando_upsert('produtos_associados', colunas).replace('%s', f"({', '.join('?' * len(colunas))})")
+
+    def linha(associado, suporte, posicao):
+        return ('10', 'PESQUISADO', associado, f'ASSOCIADO {associado}', suporte, 50.0, posicao, '2024-01-01')
+
+    conn.executemany(comando, [linha('20', 5.0, 1), linha('30', 4.0, 2)])
+    conn.executemany(comando, [linha('30', 6.0, 1), linha('40', 1.0, 2)])
+
+    gravadas = conn.execute("SELECT produto_associado_cod, suporte, posicao FROM produtos_associados "
+                            "ORDER BY produto_associado_cod").fetchall()
+    assert gravadas == [('20', 5, 1), ('30', 6, 1), ('40', 1, 2)]
+
+
+def test_upsert_nao_sobrescreve_a_chave():
+    comando = comando_upsert('produtos_substitutos', COLUNAS_BANCO['produtos_substitutos'])
+    atualizadas = comando.split('DO UPDATE SET ')[1]
+    assert 'ON CONFLICT (produto_pesquisado_cod, produto_recomendado_cod)' in comando
+    assert 'produto_pesquisado_cod =' not in atualizadas and 'produto_recomendado_cod =' not in atualizadas
+    assert 'posicao = EXCLUDED.posicao' in atualizadas
+
+
+def test_remover_antigos_apaga_so_o_que_saiu_do_conjunto():
+    conexao = ConexaoFalsa()
+    remover_antigos(CursorFalso(conexao), 'produtos_substitutos', '10', ('20', '30'))
+
+    assert conexao.comandos == ["DELETE FROM produtos_substitutos WHERE produto_pesquisado_cod = %s "
+                                "AND NOT (produto_recomendado_cod = ANY(%s))"]
+    assert conexao.parametros == [('10', ['20', '30'])]
+
+
+def _esquema(chave_existe):
+    conexao = ConexaoFalsa(lambda texto, parametros: [(1,)] if chave_existe and 'indexname = %s' in texto else [])
+    criar_esquema(conexao)
+    return conexao.comandos
+
+
+def test_criar_esquema_migra_tabelas_sem_chave_unica():
+    comandos = _esquema(chave_existe=False)
+    for tabela in TABELAS:
+        migracoes = [' '.join(comando.format(tabela=tabela).split()) for comando in MIGRACOES[tabela]]
+        indices = [indice.format(tabela=tabela) for indice in INDICES[tabela]]
+        # Duplicatas removidas antes de criar o índice único
+        posicoes = [comandos.index(comando) for comando in migracoes + indices]
+        assert posicoes == sorted(posicoes)
+    assert comandos[-1] == 'COMMIT'
+
+
+def test_criar_esquema_nao_migra_de_novo():
+    comandos = _esquema(chave_existe=True)
+    assert not any(comando.startswith(('ALTER TABLE', 'DELETE')) for comando in comandos)
+    assert comandos[-1] == 'COMMIT'
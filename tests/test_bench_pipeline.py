@@ -0,0 +1,42 @@
+import time
+
+from bench_pipeline import comparar, medir
+
+
+def _relatorio(*registros):
+    return {'parametros': {}, 'resultados': [
+        {'linhas': 10_000, 'etapa': etapa, 'segundos': segundos, 'desvio_segundos': desvio, 'pico_mb': 10.0}
+        for etapa, segundos, desvio in registros
+    ]}
+
+
+def test_oscilacao_dentro_do_ruido_nao_e_regressao():
+    # 50,2 -> 58,1 ms: acima de uma tolerância de 10%, mas abaixo do piso de 20 ms
+    assert comparar(_relatorio(('gerar_regras', 0.0581, 0.001)), _relatorio(('gerar_regras', 0.0502, 0.001)),
+                    0.10, 0.10) == []
+    # Acima do piso, mas dentro de 3x o desvio das repetições
+    assert comparar(_relatorio(('preparar_base', 0.400, 0.040)), _relatorio(('preparar_base', 0.300, 0.010)),
+                    0.25, 0.10) == []
+
+
+def test_piora_real_e_regressao():
+    regressoes = comparar(_relatorio(('preparar_base', 0.600, 0.010)), _relatorio(('preparar_base', 0.300, 0.010)),
+                          0.25, 0.10)
+    assert [r['regressao'] for r in regressoes] == ['TEMPO']
+
+
+def test_json_antigo_sem_desvio():
+    anterior = _relatorio(('preparar_base', 0.300, 0.0))
+    del anterior['resultados'][0]['desvio_segundos']
+    assert comparar(_relatorio(('preparar_base', 0.310, 0.001)), anterior, 0.25, 0.10) == []
+    assert len(comparar(_relatorio(('preparar_base', 0.600, 0.001)), anterior, 0.25, 0.10)) == 1
+
+
+def test_medir_usa_a_mediana():
+    tempos = iter([0.0, 0.0, 0.05, 0.0, 0.0, 0.0])
+
+    def funcao():
+        time.sleep(next(tempos))
+
+    _, segundos, desvio, _ = medir(funcao, 5)
+    assert segundos < 0.01 and desvio < 0.01
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from busca_produtos import IndiceDescricoes, normalizar, trigramas
+
+CATALOGO = pd.DataFrame({
+    'Código produto': [1, 2, 3, 4, 5, 6],
+    'Descrição do produto': ['CAFÉ TORRADO 500G', 'Café Solúvel', 'AÇÚCAR CRISTAL 1KG', 'CAFETEIRA ELÉTRICA',
+                             'CHÁ MATE', 'MACARRÃO ESPAGUETE'],
+})
+
+
+@pytest.fixture(scope="module")
+def indice():
+    return IndiceDescricoes(CATALOGO)
+
+
+def _resultado(indice, texto, **kwargs):
+    achados = indice.buscar(texto, **kwargs)
+    return list(zip(achados['Código produto'], achados['Tipo']))
+
+
+def test_normalizar_tira_acentos_e_pontuacao():
+    assert normalizar('  Açúcar CRISTAL-1kg ') == 'acucar cristal 1kg'
+
+
+def test_busca_ignora_acentos_e_maiusculas(indice):
+    assert _resultado(indice, 'acucar') == [(3, 'prefixo')]
+    assert _resultado(indice, 'AÇÚCAR') == [(3, 'prefixo')]
+    assert _resultado(indice, 'elétrica cafe') == [(4, 'prefixo')]
+
+
+def test_prefixo_com_palavras_exatas_primeiro(indice):
+    # 'cafe' é palavra inteira em 1 e 2 (a descrição mais curta antes) e só início de 'cafeteira' em 4
+    assert _resultado(indice, 'cafe') == [(2, 'prefixo'), (1, 'prefixo'), (4, 'prefixo')]
+    # Todas as palavras precisam iniciar alguma palavra da descrição
+    assert _resultado(indice, 'caf torr') == [(1, 'prefixo')]
+    assert _resultado(indice, 'cafe', k=2) == [(2, 'prefixo'), (1, 'prefixo')]
+
+    # A palavra exata vence mesmo com similaridade menor: 'chefe do' completa os trigramas de 'cafe torrado'
+    outro = IndiceDescricoes(pd.DataFrame({'Código produto': [1, 2],
+                                           'Descrição do produto': ['CAFETEIRA TORRADORA CHEFE DO', 'CAFÉ TORRADOR']}))
+    achados = outro.buscar('cafe torrado')
+    assert list(achados['Código produto']) == [2, 1] and list(achados['Similaridade']) == [0.923, 1.0]
+
+
+def test_erro_de_digitacao_vira_busca_aproximada(indice):
+    achados = indice.buscar('macarao')
+    assert list(achados['Código produto']) == [6] and list(achados['Tipo']) == ['aproximada']
+    assert achados['Similaridade'].iloc[0] >= indice.limiar
+    assert _resultado(indice, 'cafetera') == [(4, 'aproximada')]
+    # Acima do limiar pedido, nada
+    assert _resultado(indice, 'espageti', limiar=0.9) == []
+
+
+def test_texto_vazio_ou_sem_parecidos(indice):
+    for texto in ('', '  -- ', 'xyz'):
+        achados = indice.buscar(texto)
+        assert achados.empty and list(achados.columns) == ['Código produto', 'Descrição do produto', 'Similaridade',
+                                                           'Tipo']
+    assert indice.buscar('cafe', k=0).empty
+
+
+def test_igual_a_forca_bruta(df_modelo):
+    produtos = df_modelo.drop_duplicates('Código produto')
+    indice = IndiceDescricoes(produtos)
+    palavras_produto = [normalizar(texto).split() for texto in produtos['Descrição do produto']]
+    trigramas_produto = [{t for palavra in palavras for t in trigramas(palavra)} for palavras in palavras_produto]
+
+    rng = np.random.default_rng(0)
+    for linha in rng.choice(len(produtos), size=30, replace=False):
+        # Prefixo de uma palavra, descrição com uma letra trocada e uma palavra sem relação
+        palavras = palavras_produto[linha]
+        for texto in (palavras[0][:3], ' '.join(palavras)[:-1] + 'x', 'zzqw'):
+            digitadas = normalizar(texto).split()
+            consulta = {t for palavra in digitadas for t in trigramas(palavra)}
+            similaridade = np.array([len(consulta & t) / len(consulta) for t in trigramas_produto])
+            prefixo = np.array([all(any(p.startswith(d) for p in palavras) for d in digitadas)
+                                for palavras in palavras_produto])
+            esperados = np.flatnonzero(prefixo | (similaridade >= indice.limiar))
+
+            achados = indice.buscar(texto, k=len(produtos))
+            posicao = {codigo: i for i, codigo in enumerate(indice.codigos)}
+            linhas = np.array([posicao[codigo] for codigo in achados['Código produto']], dtype=np.int64)
+            assert sorted(linhas) == sorted(esperados)
+            assert np.allclose(achados['Similaridade'], similaridade[linhas].round(3))
+            assert list(achados['Tipo']) == ['prefixo' if prefixo[p] else 'aproximada' for p in linhas]
+            # Prefixos antes dos aproximados, estes pela similaridade
+            tipos = list(achados['Tipo'])
+            assert tipos == sorted(tipos, key=lambda tipo: tipo != 'prefixo')
+            aproximados = achados.loc[achados['Tipo'] == 'aproximada', 'Similaridade']
+            assert aproximados.is_monotonic_decreasing
@@ -0,0 +1,108 @@
+import threading
+
+from cache_consultas import CacheConsultas
+
+
+def test_invalidar_durante_gerar_nao_guarda_valor_antigo():
+    cache = CacheConsultas()
+    estoque = {'valor': 'antigo'}
+    gerando, invalidado = threading.Event(), threading.Event()
+
+    def gerar_lento():
+        valor = estoque['valor']
+        gerando.set()
+        invalidado.wait(5)  # a atualização do estoque acontece aqui, no meio da consulta
+        return valor
+
+    consulta = threading.Thread(target=lambda: cache.obter('chave', gerar_lento, lambda valor: {42}))
+    consulta.start()
+    assert gerando.wait(5)
+    estoque['valor'] = 'novo'
+    cache.invalidar(42)
+    invalidado.set()
+    consulta.join(5)
+
+    assert cache.obter('chave', lambda: estoque['valor'], lambda valor: {42}) == 'novo'
+    assert cache.estatisticas()['descartadas'] == 1
+
+
+def test_invalidar_outra_dependencia_durante_gerar_mantem_o_valor():
+    cache = CacheConsultas()
+
+    def gerar():
+        cache.invalidar(7)
+        return 'valor'
+
+    cache.obter('chave', gerar, lambda valor: {42})
+    assert cache.obter('chave', lambda: 'outro', lambda valor: {42}) == 'valor'
+
+
+def test_limpar_durante_gerar_nao_guarda_valor():
+    cache = CacheConsultas()
+
+    def gerar():
+        cache.limpar()
+        return 'antigo'
+
+    cache.obter('chave', gerar)
+    assert cache.obter('chave', lambda: 'novo') == 'novo'
+
+
+def test_registro_de_invalidacoes_nao_cresce():
+    cache = CacheConsultas()
+    for codigo in range(1000):
+        cache.obter(codigo, lambda: 'valor', lambda valor, codigo=codigo: {codigo})
+        cache.invalidar(codigo)
+    assert cache._invalidada_em == {}
+
+    # Com uma consulta em andamento as invalidações ficam registradas até ela terminar
+    def gerar():
+        for codigo in range(1000):
+            cache.invalidar(codigo)
+        assert len(cache._invalidada_em) == 1000
+        return 'valor'
+
+    cache.obter('chave', gerar, lambda valor: {5000})
+    assert cache._invalidada_em == {} and not cache._em_andamento
+    assert cache.obter('chave', lambda: 'outro') == 'valor'
+
+
+def test_consulta_mais_antiga_poda_o_registro_ao_terminar():
+    cache = CacheConsultas()
+    primeira_gerando, segunda_terminou = threading.Event(), threading.Event()
+
+    def gerar_lento():
+        primeira_gerando.set()
+        segunda_terminou.wait(5)
+        return 'antigo'
+
+    antiga = threading.Thread(target=lambda: cache.obter('antiga', gerar_lento, lambda valor: {1}))
+    antiga.start()
+    assert primeira_gerando.wait(5)
+    cache.invalidar(1)
+
+    def gerar_recente():
+        cache.invalidar(2)
+        return 'recente'
+
+    cache.obter('recente', gerar_recente, lambda valor: {3})
+    assert set(cache._invalidada_em) == {1, 2}  # a consulta antiga ainda precisa dos dois
+    segunda_terminou.set()
+    antiga.join(5)
+
+    assert cache._invalidada_em == {}
+    assert cache.obter('antiga', lambda: 'novo', lambda valor: {1}) == 'novo'
+
+
+def test_erro_em_gerar_nao_deixa_consulta_em_andamento():
+    cache = CacheConsultas()
+
+    def gerar():
+        raise RuntimeError('falhou')
+
+    try:
+        cache.obter('chave', gerar)
+    except RuntimeError:
+        pass
+    cache.invalidar(1)
+    assert not cache._em_andamento and cache._invalidada_em == {}
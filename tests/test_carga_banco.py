@@ -0,0 +1,96 @@
+import pandas as pd
+import psycopg2.extensions
+import pytest
+
+import banco
+from banco import COLUNAS_BANCO
+from banco_falso import ConexaoFalsa, CursorFalso, PoolFalso
+from carga_banco import carga_completa, copiar
+
+
+@pytest.fixture(autouse=True)
+def identificadores(monkeypatch):
+    # sql.Identifier pede uma conexão de verdade para escapar nomes; aqui basta a regra das aspas
+    monkeypatch.setattr(psycopg2.extensions, 'quote_ident', lambda nome, contexto: '"' + nome.replace('"', '""') + '"')
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = PoolFalso(ConexaoFalsa())
+    monkeypatch.setattr(banco, '_pool', pool)
+    return pool
+
+
+def _substitutos(n):
+    return pd.DataFrame({coluna: [f"{coluna}{i}" for i in range(n)] for coluna in COLUNAS_BANCO['produtos_substitutos']})
+
+
+def test_copiar_envia_csv_em_blocos():
+    conexao = ConexaoFalsa()
+    df = pd.DataFrame({'a': [1, 2, 3, 4, 5], 'b': ['x', 'y,z', 'w', 'v', 'u'], 'ignorada': 0})
+
+    assert copiar(CursorFalso(conexao), 'tabela', df, ['a', 'b'], tamanho_lote=2) == 5
+    assert conexao.comandos == ['COPY "tabela" ("a", "b") FROM STDIN WITH (FORMAT csv)'] * 3
+    assert ''.join(conexao.copiado) == df[['a', 'b']].to_csv(header=False, index=False)
+
+
+def test_carga_completa_copia_para_tabela_de_carga_e_troca_no_fim(pool):
+    totais = carga_completa({'produtos_substitutos': [_substitutos(3), _substitutos(2)]})
+
+    assert totais == {'produtos_substitutos': 5}
+    comandos = pool.conexao.comandos
+    assert comandos[0] == 'DROP TABLE IF EXISTS "produtos_substitutos_carga"'
+    assert comandos[1].startswith('CREATE TABLE IF NOT EXISTS produtos_substitutos_carga (')
+    # Dados antes dos índices, cópia confirmada antes da troca
+    assert comandos[2:4] == [
+        'COPY "produtos_substitutos_carga" ({}) FROM STDIN WITH (FORMAT csv)'.format(
+            ', '.join(f'"{coluna}"' for coluna in COLUNAS_BANCO['produtos_substitutos']))
+    ] * 2
+    assert comandos[4].startswith('CREATE UNIQUE INDEX IF NOT EXISTS produtos_substitutos_carga_chave')
+    assert comandos[5].startswith('CREATE INDEX IF NOT EXISTS produtos_substitutos_carga_pesquisado_posicao')
+    assert comandos[6:] == [
+        'COMMIT',
+        'DROP TABLE IF EXISTS "produtos_substitutos"',
+        'ALTER TABLE "produtos_substitutos_carga" RENAME TO "produtos_substitutos"',
+        'SELECT indexname FROM pg_indexes WHERE tablename = %s',
+        'ALTER INDEX "produtos_substitutos_carga_chave" RENAME TO "produtos_substitutos_chave"',
+        'ALTER INDEX "produtos_substitutos_carga_pesquisado_posicao" RENAME TO "produtos_substitutos_pesquisado_posicao"',
+        "SELECT pg_get_serial_sequence(%s, 'id')",
+        'ALTER SEQUENCE public.produtos_substitutos_carga_id_seq RENAME TO "produtos_substitutos_id_seq"',
+        'COMMIT',
+    ]
+    assert len(pool.conexao.copiado) == 2 and pool.emprestadas == 0
+
+
+def test_falha_durante_o_copy_desfaz_sem_trocar_as_tabelas(pool):
+    def partes():
+        yield _substitutos(3)
+        raise RuntimeError("parte corrompida")
+
+    with pytest.raises(RuntimeError, match="parte corrompida"):
+        carga_completa({'produtos_substitutos': partes()})
+
+    comandos = pool.conexao.comandos
+    assert comandos[-1] == 'ROLLBACK' and 'COMMIT' not in comandos
+    assert not any('RENAME' in comando or comando == 'DROP TABLE IF EXISTS "produtos_substitutos"'
+                   for comando in comandos)
+    assert pool.emprestadas == 0
+
+
+def test_falha_na_troca_desfaz_a_transacao_da_troca(pool, monkeypatch):
+    original = CursorFalso.execute
+
+    def execute(self, comando, parametros=None):
+        original(self, comando, parametros)
+        if self.conexao.comandos[-1].startswith('ALTER TABLE'):
+            raise psycopg2.Error("lock timeout")
+
+    monkeypatch.setattr(CursorFalso, 'execute', execute)
+    with pytest.raises(psycopg2.Error):
+        carga_completa({'produtos_substitutos': [_substitutos(2)]})
+
+    # A cópia foi confirmada; o DROP da tabela original está na transação desfeita
+    comandos = pool.conexao.comandos
+    troca = comandos[comandos.index('COMMIT') + 1:]
+    assert troca[0] == 'DROP TABLE IF EXISTS "produtos_substitutos"'
+    assert troca[-1] == 'ROLLBACK' and 'COMMIT' not in troca
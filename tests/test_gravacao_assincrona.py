@@ -0,0 +1,84 @@
+from contextlib import contextmanager
+
+import pandas as pd
+import pytest
+
+import gravacao_assincrona
+from banco_falso import ConexaoFalsa
+from gravacao_assincrona import GravadorAssincrono
+
+DF_MODELO = pd.DataFrame({'Código produto': [1, 2, 3], 'Categoria': ['A', 'A', 'B']})
+
+
+def _substitutos(codigo):
+    return pd.DataFrame({'Código pesquisado': [codigo], 'Código produto': [codigo + 100]})
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    """Troca a conexão e a inserção do gravador; `banco.falhar(codigo)` decide se a gravação do código falha."""
+    class Banco:
+        gravados, tentativas, pendentes = [], [], []
+
+        @staticmethod
+        def falhar(codigo):
+            return False
+
+    conn = ConexaoFalsa()
+
+    @contextmanager
+    def conexao():
+        # Como banco.conexao: commit sem erro, rollback com exceção; só o que foi confirmado conta como gravado
+        try:
+            yield conn
+            conn.commit()
+            Banco.gravados += Banco.pendentes
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            Banco.pendentes.clear()
+
+    def inserir_recomendacoes(cur, codigo, df_substitutos, df_associados, limite):
+        Banco.tentativas.append(codigo)
+        if Banco.falhar(codigo):
+            raise RuntimeError(f"falha ao gravar {codigo}")
+        Banco.pendentes.append(codigo)
+
+    monkeypatch.setattr(gravacao_assincrona, 'conexao', conexao)
+    monkeypatch.setattr(gravacao_assincrona, 'inserir_recomendacoes', inserir_recomendacoes)
+    Banco.conn = conn
+    return Banco
+
+
+def _gravar(*codigos, tentativas=3):
+    gravador = GravadorAssincrono(tamanho_lote=len(codigos), espera_max=5.0, tentativas=tentativas, pausa=0.0)
+    for codigo in codigos:
+        gravador.enfileirar(_substitutos(codigo), pd.DataFrame(), DF_MODELO)
+    return gravador.fechar(timeout=10)
+
+
+def test_falha_passageira_e_repetida(banco):
+    falhas = iter([True, True])
+    banco.falhar = lambda codigo: next(falhas, False)
+
+    estatisticas = _gravar(1, 2)
+    assert estatisticas['gravados'] == 2 and estatisticas['falhas'] == 2 and estatisticas['lotes'] == 1
+    assert sorted(banco.gravados) == ['1', '2'] and estatisticas['descartados'] == 0
+    assert banco.conn.comandos.count('ROLLBACK') == 2
+
+
+def test_lote_que_sempre_falha_e_gravado_item_a_item(banco):
+    banco.falhar = lambda codigo: codigo == '2'
+
+    estatisticas = _gravar(1, 2, 3, tentativas=2)
+    assert estatisticas['falhas'] == 2 and estatisticas['lotes'] == 0
+    assert estatisticas['gravados'] == 2 and estatisticas['descartados'] == 1
+    assert sorted(banco.gravados) == ['1', '3']
+
+
+def test_resultado_invalido_e_descartado_sem_ir_ao_banco(banco):
+    # 99 não existe em df_modelo; o 1 repetido no lote só é gravado uma vez (o código chega como texto)
+    estatisticas = _gravar(99, 1, 1)
+    assert estatisticas['descartados'] == 1 and estatisticas['gravados'] == 2
+    assert banco.tentativas == ['1']
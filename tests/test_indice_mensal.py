@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from coocorrencia import IndiceCoocorrencia
+from recomendador import RecomendadorCrossSelling
+
+
+@pytest.fixture(scope="module")
+def historico(df_modelo):
+    # Uma nota com itens em dois meses: vai inteira para o mês da primeira data
+    df = df_modelo.copy()
+    nota = df.loc[df['Data da venda'].dt.month == 3, 'Numero nota fiscal'].value_counts().index[0]
+    linhas = df.index[df['Numero nota fiscal'] == nota]
+    df.loc[linhas[-1], 'Data da venda'] = pd.Timestamp('2024-04-02')
+    return df
+
+
+@pytest.fixture(scope="module")
+def cross(historico):
+    return RecomendadorCrossSelling(historico)
+
+
+def _do_periodo(df, inicio, fim):
+    mes = df.groupby('Numero nota fiscal')['Data da venda'].transform('min').dt.to_period('M')
+    return df[(mes >= pd.Period(inicio, 'M')) & (mes <= pd.Period(fim, 'M'))]
+
+
+def _conferir(indice, df_periodo):
+    # Partições somadas x índice montado só com as notas do período
+    indice, esperado = IndiceCoocorrencia.somar([indice]), IndiceCoocorrencia.somar([IndiceCoocorrencia(df_periodo)])
+    np.testing.assert_array_equal(indice.codigos, esperado.codigos)
+    np.testing.assert_array_equal(indice.contagem_produto, esperado.contagem_produto)
+    assert (indice.blocos_pares[0] != esperado.blocos_pares[0]).nnz == 0
+    assert indice.n_notas == esperado.n_notas and indice.notas_vistas == esperado.notas_vistas
+
+
+@pytest.mark.parametrize('inicio, fim', [
+    ('2024-01', '2024-01'),
+    ('2024-03-15', '2024-05-02'),  # datas arredondadas ao mês
+    ('2024-04', '2024-12'),
+])
+def test_janela_igual_ao_indice_so_do_periodo(cross, historico, inicio, fim):
+    df_periodo = _do_periodo(historico, inicio, fim)
+    _conferir(cross.indice_mensal.janela(inicio, fim), df_periodo)
+
+    do_periodo = RecomendadorCrossSelling(df_periodo)
+    for codigo in df_periodo['Código produto'].value_counts().index[:20]:
+        for max_len in (2, 3):
+            pd.testing.assert_frame_equal(
+                cross.gerar_regras(codigo, min_support=0.001, max_len=max_len, inicio=inicio, fim=fim),
+                do_periodo.gerar_regras(codigo, min_support=0.001, max_len=max_len))
+
+
+@pytest.mark.parametrize('n, ate, inicio, fim', [
+    (3, None, '2024-10', '2024-12'),
+    (3, '2024-04-30', '2024-02', '2024-04'),
+    (1, '2024-03', '2024-03', '2024-03'),
+])
+def test_ultimos_meses_igual_ao_indice_so_do_periodo(cross, historico, n, ate, inicio, fim):
+    df_periodo = _do_periodo(historico, inicio, fim)
+    _conferir(cross.indice_mensal.ultimos_meses(n, ate), df_periodo)
+
+    do_periodo = RecomendadorCrossSelling(df_periodo)
+    for codigo in df_periodo['Código produto'].value_counts().index[:20]:
+        pd.testing.assert_frame_equal(cross.gerar_regras(codigo, min_support=0.001, ultimos_meses=n, fim=ate),
+                                      do_periodo.gerar_regras(codigo, min_support=0.001))
+
+
+def test_janela_guardada_acompanha_notas_novas(historico):
+    # Metade das notas de dezembro chega depois que a janela já foi somada e guardada
+    numeros = historico['Numero nota fiscal']
+    depois = (historico['Data da venda'] >= '2024-12-01') & (numeros % 2 == 0)
+    cross = RecomendadorCrossSelling(historico[~depois])
+    antes = cross.indice_mensal.ultimos_meses(3, '2024-12')
+    assert cross.indice_mensal.ultimos_meses(3, '2024-12') is antes
+
+    assert cross.atualizar(historico[depois]) > 0
+    _conferir(cross.indice_mensal.ultimos_meses(3, '2024-12'), _do_periodo(historico, '2024-10', '2024-12'))
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from dados_sinteticos import gerar_bases
+from limpeza_notas import NotasCleaner
+
+
+def _lote(numeros, descricoes, codigos, inicio):
+    n = len(numeros)
+    return pd.DataFrame({
+        "Numero nota fiscal": numeros,
+        "Data da venda": ["02/01/2024"] * n,
+        "Código produto": codigos,
+        "Descrição do produto": descricoes,
+        "Quantidade do produto": [1] * n,
+        "Valor unitário": [10.0] * n,
+        "Preço de custo": [6.0] * n,
+        "Valor total produto": [10.0] * n,
+        "Valor da nota": [10.0] * n,
+    }, index=pd.RangeIndex(inicio, inicio + n))
+
+
+def test_lotes_com_tipos_misturados_entre_lotes():
+    # Descrição numérica no meio de textos, lote só com descrições numéricas e número de nota ora int, ora texto
+    lotes = [
+        _lote([1, 1, 2], ["COPO", 3, "PRATO"], [10, 11, 12], 0),
+        _lote(["NF-3", "NF-3"], [123, 456], [13, 14], 3),
+    ]
+    df = NotasCleaner().clean_em_lotes(iter(lotes))
+
+    assert len(df) == 5
+    assert df["Descrição do produto"].map(type).eq(str).all()
+    assert sorted(df["Descrição do produto"]) == ["123", "3", "456", "COPO", "PRATO"]
+    assert set(df["Numero nota fiscal"]) == {"1", "2", "NF-3"}
+
+
+def test_lotes_iguais_a_clean_com_tipos_uniformes():
+    _, df_notas = gerar_bases(5_000, semente=1)
+    lotes = (df_notas.iloc[i:i + 1_000] for i in range(0, len(df_notas), 1_000))
+
+    pd.testing.assert_frame_equal(NotasCleaner().clean_em_lotes(lotes), NotasCleaner().clean(df_notas))
@@ -0,0 +1,54 @@
+# Cleaners atuais x regras encadeadas de antes (bench_limpeza.py, uma cópia e um filtro por regra):
+# mesmas linhas, mesma ordem, mesmo índice e mesmos tipos.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench_limpeza import _base_encadeada, _estoque_encadeado, _notas_encadeado
+from dados_sinteticos import gerar_bases
+from limpeza_base_mesclada import BasePreparador
+from limpeza_estoque import EstoqueCleaner
+from limpeza_notas import NotasCleaner
+
+
+@pytest.fixture(scope="module", params=[0, 1])
+def bases(request):
+    df_estoque, df_notas = gerar_bases(20_000, semente=request.param)
+
+    # Sujeira que o gerador não produz, para cada regra do BasePreparador descartar alguma linha:
+    # valor unitário negativo (entra em 'Valor da nota') e custo acima do valor unitário
+    rng = np.random.default_rng(request.param)
+    df_notas = df_notas.copy()
+    negativo = rng.random(len(df_notas)) < 0.005
+    df_notas.loc[negativo, 'Valor unitário'] *= -1
+    acima = rng.random(len(df_notas)) < 0.01
+    df_notas.loc[acima, 'Preço de custo'] = df_notas.loc[acima, 'Valor unitário'].abs() * 1.1
+    return df_estoque, df_notas
+
+
+def test_estoque_igual_ao_encadeado(bases):
+    df_estoque, _ = bases
+    entrada = df_estoque.copy()
+
+    pd.testing.assert_frame_equal(EstoqueCleaner().clean(df_estoque), _estoque_encadeado(df_estoque))
+    pd.testing.assert_frame_equal(df_estoque, entrada)  # a entrada não é alterada
+
+
+def test_notas_iguais_ao_encadeado(bases):
+    _, df_notas = bases
+    esperado = _notas_encadeado(df_notas)
+    assert len(esperado) < len(df_notas)
+
+    pd.testing.assert_frame_equal(NotasCleaner().clean(df_notas), esperado)
+    # Em lotes, com o índice continuando de um lote para o outro, como em ler_excel_em_lotes
+    lotes = (df_notas.iloc[inicio:inicio + 7_000] for inicio in range(0, len(df_notas), 7_000))
+    pd.testing.assert_frame_equal(NotasCleaner().clean_em_lotes(lotes), esperado)
+
+
+def test_base_mesclada_igual_a_encadeada(bases):
+    df_estoque, df_notas = bases
+    estoque_limpo, notas_limpas = EstoqueCleaner().clean(df_estoque), NotasCleaner().clean(df_notas)
+    esperado = _base_encadeada(estoque_limpo, notas_limpas)
+
+    pd.testing.assert_frame_equal(BasePreparador().preparar_base(estoque_limpo, notas_limpas), esperado)
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from coocorrencia import IndiceCoocorrencia
+from dados_sinteticos import gerar_bases
+from leitura_notas import ler_excel_em_lotes
+from limpeza_base_mesclada import BasePreparador
+from limpeza_estoque import EstoqueCleaner
+from limpeza_notas import NotasCleaner
+from main import atualizar_notas
+from recomendador import RecomendadorCrossSelling
+
+
+@pytest.fixture(scope="module")
+def bases():
+    df_estoque, df_notas = gerar_bases(5_000, semente=3)
+    return EstoqueCleaner().clean(df_estoque), df_notas
+
+
+def _planilhas(tmp_path, df_notas, fracao=0.8):
+    """Grava o histórico (primeiras notas) e as notas novas em planilhas separadas."""
+    numeros = df_notas['Numero nota fiscal'].unique()
+    corte = numeros[int(len(numeros) * fracao)]
+    caminhos = tmp_path / "historico.xlsx", tmp_path / "novas.xlsx"
+    df_notas[df_notas['Numero nota fiscal'] < corte].to_excel(caminhos[0], index=False)
+    df_notas[df_notas['Numero nota fiscal'] >= corte].to_excel(caminhos[1], index=False)
+    return caminhos
+
+
+def _montar(df_estoque_limpo, *caminhos):
+    cleaner = NotasCleaner()
+    lotes = [lote for caminho in caminhos for lote in ler_excel_em_lotes(caminho, colunas=NotasCleaner.COLUNAS_FINAIS)]
+    df_modelo = BasePreparador().preparar_base(df_estoque_limpo, cleaner.clean_em_lotes(lotes))
+    return RecomendadorCrossSelling(df_modelo), df_modelo, cleaner.descricoes
+
+
+def _conferir_igual_do_zero(df_estoque_limpo, historico, novas):
+    cross, df_modelo, descricoes = _montar(df_estoque_limpo, historico)
+    atualizado, df_atualizado, _ = atualizar_notas(cross, df_estoque_limpo, df_modelo, novas, descricoes, historico)
+    do_zero, df_do_zero, _ = _montar(df_estoque_limpo, historico, novas)
+
+    pd.testing.assert_frame_equal(df_atualizado.reset_index(drop=True), df_do_zero.reset_index(drop=True))
+    # Vocabulário em ordem de código nos dois, para comparar contagens posição a posição
+    indice, esperado = IndiceCoocorrencia.somar([atualizado.indice]), IndiceCoocorrencia.somar([do_zero.indice])
+    np.testing.assert_array_equal(indice.codigos, esperado.codigos)
+    np.testing.assert_array_equal(indice.contagem_produto, esperado.contagem_produto)
+    assert (indice.blocos_pares[0] != esperado.blocos_pares[0]).nnz == 0
+    assert indice.n_notas == esperado.n_notas and indice.notas_vistas == esperado.notas_vistas
+
+    # Mesmo top-N e mesmas regras, inclusive nos empates: a ordem não depende da posição no vocabulário
+    for codigo in esperado.codigos:
+        pd.testing.assert_frame_equal(atualizado.indice.associados(codigo, n=6), do_zero.indice.associados(codigo, n=6))
+    for codigo in df_do_zero['Código produto'].value_counts().index[:50]:
+        pd.testing.assert_frame_equal(atualizado.gerar_regras(codigo, min_support=0.0),
+                                      do_zero.gerar_regras(codigo, min_support=0.0))
+    return cross, atualizado
+
+
+def test_atualizar_notas_igual_a_montar_do_zero(bases, tmp_path):
+    df_estoque_limpo, df_notas = bases
+    numeros = df_notas['Numero nota fiscal'].unique()
+    novas = df_notas['Numero nota fiscal'] >= numeros[int(len(numeros) * 0.8)]
+
+    # Descrição ambígua no histórico: uma nota válida traz a descrição de um produto que também sai nas notas novas
+    df_notas = df_notas.copy()
+    vendidos = set(df_notas.loc[~novas, 'Código produto']) & set(df_estoque_limpo['Código produto'])
+    codigo = df_notas.loc[novas & df_notas['Código produto'].isin(vendidos), 'Código produto'].mode()[0]
+    problema = (df_notas['Quantidade do produto'] <= 0) | (df_notas['Valor unitário'] == 0)
+    boas = ~df_notas['Numero nota fiscal'].isin(df_notas.loc[problema, 'Numero nota fiscal'])
+    linha = df_notas.index[~novas & boas & (df_notas['Código produto'] != codigo)][0]
+    descricao = df_notas.loc[df_notas['Código produto'] == codigo, 'Descrição do produto'].iloc[0]
+    df_notas.loc[linha, 'Descrição do produto'] = descricao
+
+    # Sem linhas novas que trazem uma descrição do histórico com outro código, só as contagens mudam.
+    # Descrições já ambíguas no histórico continuam nas notas novas e têm de sair delas também.
+    pares = set(zip(df_notas.loc[~novas, 'Descrição do produto'], df_notas.loc[~novas, 'Código produto']))
+    vistas = set(df_notas.loc[~novas, 'Descrição do produto'])
+    outro_codigo = [desc in vistas and (desc, cod) not in pares
+                    for desc, cod in zip(df_notas['Descrição do produto'], df_notas['Código produto'])]
+    df_notas = df_notas[~(novas & np.array(outro_codigo))]
+
+    cross, atualizado = _conferir_igual_do_zero(df_estoque_limpo, *_planilhas(tmp_path, df_notas))
+    assert atualizado is cross  # sem descrição nova ambígua no histórico, as contagens são só somadas
+
+
+def test_descricao_do_historico_ambigua_nas_notas_novas(bases, tmp_path):
+    df_estoque_limpo, df_notas = bases
+    numeros = df_notas['Numero nota fiscal'].unique()
+    corte = numeros[int(len(numeros) * 0.8)]
+    historico = df_notas[df_notas['Numero nota fiscal'] < corte]
+    codigo = historico['Código produto'].mode()[0]
+
+    # Uma linha nova traz a descrição do produto mais vendido do histórico com outro código
+    df_notas = df_notas.copy()
+    linha = df_notas.index[(df_notas['Numero nota fiscal'] >= corte) & (df_notas['Código produto'] != codigo)][0]
+    df_notas.loc[linha, 'Descrição do produto'] = historico.loc[historico['Código produto'] == codigo,
+                                                                'Descrição do produto'].iloc[0]
+
+    cross, atualizado = _conferir_igual_do_zero(df_estoque_limpo, *_planilhas(tmp_path, df_notas))
+    assert atualizado is not cross
+    assert cross.indice.contar([codigo]) > 0 and atualizado.indice.contar([codigo]) == 0
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from mineracao import itemsets_contagem, regras_de_itemsets
+from recomendador import RecomendadorCrossSelling
+
+
+def _produto_tipico(df_modelo):
+    # Produto de venda mediana: nem o mais vendido, nem um que saiu uma vez só
+    vendas = df_modelo.drop_duplicates(['Numero nota fiscal', 'Código produto'])['Código produto'].value_counts()
+    return int(vendas.index[len(vendas) // 2])
+
+
+def test_produto_tipico_tem_associados_com_parametros_padrao(df_modelo):
+    cross = RecomendadorCrossSelling(df_modelo)
+    codigo = _produto_tipico(df_modelo)
+
+    assert not cross.gerar_regras(codigo).empty
+    assert not cross.gerar_regras(codigo, max_len=3).empty
+
+
+def test_lote_com_parametros_padrao_cobre_a_maior_parte_do_catalogo(df_modelo, tmp_path):
+    cross = RecomendadorCrossSelling(df_modelo)
+    arquivos = cross.gerar_lote(saida=tmp_path, formato='parquet', processos=1)
+
+    resultado = pd.concat([pd.read_parquet(arquivo) for arquivo in arquivos])
+    assert resultado['Código pesquisado'].nunique() >= 0.8 * len(cross.indice.codigos)
+
+
+def test_partes_do_lote_tem_o_mesmo_esquema_com_lote_vazio(df_modelo, tmp_path):
+    cross = RecomendadorCrossSelling(df_modelo)
+    # O segundo lote só tem códigos que não existem: sai vazio
+    codigos = list(cross.indice.codigos[:3]) + [-1, -2, -3]
+    arquivos = cross.gerar_lote(codigos, saida=tmp_path, formato='parquet', tamanho_lote=3, processos=1)
+
+    partes = [pd.read_parquet(arquivo) for arquivo in arquivos]
+    assert len(partes[0]) > 0 and partes[1].empty
+    pd.testing.assert_series_equal(partes[0].dtypes, partes[1].dtypes)
+    assert partes[1]['Código pesquisado'].dtype == 'int64'
+    assert partes[1]['Posição'].dtype == 'int64'
+
+
+def test_empates_nas_regras_saem_na_ordem_dos_codigos(df_modelo):
+    cross = RecomendadorCrossSelling(df_modelo)
+    vendas = df_modelo['Código produto'].value_counts()
+    empates = 0
+    for codigo in vendas.index[:100]:
+        itemsets = itemsets_contagem(cross.indice, int(codigo), 1, 2)
+        regras = regras_de_itemsets(cross.indice, itemsets)
+        # Os mesmos itemsets em outra ordem (como num índice com outro vocabulário) dão as mesmas regras
+        invertidos = regras_de_itemsets(cross.indice, dict(reversed(list(itemsets.items()))))
+        pd.testing.assert_frame_equal(regras, invertidos)
+        empates += regras.duplicated(['lift', 'support']).sum()
+    assert empates > 0
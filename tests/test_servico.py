@@ -0,0 +1,85 @@
+import threading
+import warnings
+
+import numpy as np
+import pytest
+
+from servico import ServicoRecomendacao
+from tipos_compactos import compactar
+
+
+@pytest.fixture
+def servico_compacto(df_modelo):
+    return ServicoRecomendacao(compactar(df_modelo), capacidade_cache=16)
+
+
+def test_estoque_acima_do_tipo_compacto_nao_trunca(servico_compacto):
+    tipo = servico_compacto.df_modelo['Quantidade estoque'].dtype
+    assert tipo.itemsize < 8
+    codigo, outro = (int(cod) for cod in servico_compacto.df_modelo['Código produto'].unique()[:2])
+    acima = int(np.iinfo(tipo).max) + 173  # 300 numa base em int8
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        servico_compacto.atualizar_estoque({codigo: acima, outro: 300})
+
+    df = servico_compacto.df_modelo
+    assert (df.loc[df['Código produto'] == codigo, 'Quantidade estoque'] == acima).all()
+    assert (df.loc[df['Código produto'] == outro, 'Quantidade estoque'] == 300).all()
+    assert servico_compacto.cross.produtos.loc[codigo, 'Quantidade estoque'] == acima
+    assert servico_compacto.cross.produtos.loc[outro, 'Quantidade estoque'] == 300
+    assert servico_compacto.substitutos(codigo) is not None
+
+
+@pytest.fixture
+def servico(df_modelo):
+    return ServicoRecomendacao(df_modelo, capacidade_cache=16)
+
+
+def _consulta_com_substituto(servico):
+    """Código em estoque com substitutos da própria categoria e o primeiro substituto dele."""
+    df = servico.df_modelo.drop_duplicates('Código produto')
+    for codigo, categoria in df.loc[df['Quantidade estoque'] > 0, ['Código produto', 'Categoria']].itertuples(index=False):
+        resultado = servico.substituto.recomendar(int(codigo))
+        if len(resultado) and (resultado['Categoria'] == categoria).all():
+            return int(codigo), int(resultado['Código produto'].iloc[0])
+    raise AssertionError('nenhum produto com substitutos na base sintética')
+
+
+def test_troca_do_indice_antes_da_consulta_nao_guarda_resposta_antiga(servico):
+    codigo, removido = _consulta_com_substituto(servico)
+    obter = servico.cache.obter
+
+    def obter_depois_da_troca(*args, **kwargs):
+        # A troca cai entre o início da consulta e a geração marcada pelo cache
+        servico.cache.obter = obter
+        servico.atualizar_estoque({removido: 0})
+        return obter(*args, **kwargs)
+
+    servico.cache.obter = obter_depois_da_troca
+    servico.substitutos(codigo)
+    assert removido not in servico.substitutos(codigo)['Código produto'].tolist()
+
+
+def test_troca_do_indice_durante_gerar_nao_guarda_resposta_antiga(servico):
+    codigo, removido = _consulta_com_substituto(servico)
+    antigo = servico.substituto
+    recomendar = antigo.recomendar
+    gerando, trocado = threading.Event(), threading.Event()
+
+    def recomendar_lento(*args):
+        resultado = recomendar(*args)
+        gerando.set()
+        trocado.wait(5)
+        return resultado
+
+    antigo.recomendar = recomendar_lento
+    consulta = threading.Thread(target=servico.substitutos, args=(codigo,))
+    consulta.start()
+    assert gerando.wait(5)
+    servico.atualizar_estoque({removido: 0})
+    trocado.set()
+    consulta.join(5)
+
+    assert removido not in servico.substitutos(codigo)['Código produto'].tolist()
+    assert servico.cache.estatisticas()['descartadas'] == 1
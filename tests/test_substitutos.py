@@ -0,0 +1,79 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pytest
+
+from servico import ServicoRecomendacao, criar_servidor
+from substitutos import RecomendadorSubstituto
+
+
+@pytest.mark.parametrize('n', [0, -1])
+def test_n_menor_que_um_e_rejeitado(df_modelo, n):
+    recomendador = RecomendadorSubstituto(df_modelo, verboso=False)
+    codigo = int(df_modelo['Código produto'].iloc[0])
+
+    with pytest.raises(ValueError, match='n_recomendacoes'):
+        recomendador.recomendar(codigo, n)
+    with pytest.raises(ValueError, match='n_recomendacoes'):
+        recomendador.recomendar_todos(n)
+
+
+@pytest.mark.parametrize('rota', ['substitutos', 'cross-selling'])
+def test_rota_com_n_zero_responde_400(df_modelo, rota):
+    servidor = criar_servidor(ServicoRecomendacao(df_modelo, capacidade_cache=16), porta=0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        codigo = int(df_modelo['Código produto'].iloc[0])
+        url = f"http://127.0.0.1:{servidor.server_address[1]}/{rota}/{codigo}?n=0"
+        with pytest.raises(urllib.error.HTTPError) as erro:
+            urllib.request.urlopen(url, timeout=10)
+        assert erro.value.code == 400
+        assert 'n deve ser pelo menos 1' in json.loads(erro.value.read())['erro']
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+def _forca_bruta(df_modelo, codigo, n, max_distancia_preco=None):
+    """Os n substitutos de `codigo` comparando com todos os produtos: mesma categoria, em estoque, sem ele mesmo.
+
+    Distância = 0.7 * |Δpreço| / preço + 0.3 * |Δmargem|; empates pelo preço, pela margem e pela ordem na base.
+    """
+    df = df_modelo.drop_duplicates('Código produto').reset_index(drop=True)
+    preco, margem = df['Valor unitário'].astype(float), df['Margem %'].astype(float)
+    base = df.index[df['Código produto'] == codigo][0]
+    distancia_preco = (preco - preco[base]).abs() / preco[base]
+    candidatos = df.assign(distancia=0.7 * distancia_preco + 0.3 * (margem - margem[base]).abs(),
+                           preco=preco, margem=margem, ordem=np.arange(len(df)))
+    manter = ((df['Código da categoria'] == df.at[base, 'Código da categoria']) & (df['Quantidade estoque'] > 0)
+              & (df['Código produto'] != codigo) & candidatos['distancia'].notna())
+    if max_distancia_preco is not None:
+        manter &= distancia_preco <= max_distancia_preco
+    candidatos = candidatos[manter].sort_values(['distancia', 'preco', 'margem', 'ordem']).head(n)
+    return candidatos['Código produto'].tolist(), (1.0 - candidatos['distancia']).tolist()
+
+
+@pytest.mark.parametrize('max_distancia_preco', [None, 0.3])
+def test_substitutos_iguais_a_forca_bruta(df_modelo, max_distancia_preco):
+    recomendador = RecomendadorSubstituto(df_modelo, verboso=False, max_distancia_preco=max_distancia_preco)
+    todos = recomendador.recomendar_todos(6)
+    por_codigo = {codigo: grupo for codigo, grupo in todos.groupby('Código pesquisado')}
+
+    # Produtos em estoque e sem estoque, sorteados entre todos
+    codigos = np.random.default_rng(0).choice(df_modelo['Código produto'].unique(), 300, replace=False)
+    comparados = 0
+    for codigo in codigos:
+        esperado, similaridade = _forca_bruta(df_modelo, int(codigo), 6, max_distancia_preco)
+        tabela = por_codigo.get(int(codigo))
+        if not esperado:
+            # Sem substituto na categoria, recomendar sorteia alternativas e recomendar_todos não traz o produto
+            assert tabela is None
+            continue
+        assert recomendador.recomendar(int(codigo), 6)['Código produto'].tolist() == esperado
+        assert tabela['Código recomendado'].tolist() == esperado
+        np.testing.assert_allclose(tabela['Similaridade'], similaridade)
+        comparados += 1
+    assert comparados > 200
@@ -0,0 +1,76 @@
+# tipos_compactos.py
+# Tipos compactos para as bases (modo `compacto` dos cleaners e do BasePreparador) e relatório de memória.
+
+import numpy as np
+import pandas as pd
+
+# Textos que se repetem a cada linha de nota: viram categoria (códigos inteiros + um dicionário)
+COLUNAS_CATEGORIA = ['Descrição do produto', 'Produto', 'Categoria', 'Marca']
+
+# Valores em reais/percentuais arredondados a 2 casas: candidatos a float32
+COLUNAS_FLOAT32 = ['Valor unitário', 'Preço de custo', 'Margem bruta', 'Margem %', 'Markup']
+
+# Acima disso o float32 não distingue mais os centavos (24 bits de mantissa)
+_LIMITE_FLOAT32 = 2 ** 24 / 100
+
+
+def cabe_em_float32(serie: pd.Series, casas: int = 2) -> bool:
+    """True se a coluna já está em `casas` casas e volta idêntica de float32 ao arredondar."""
+    valores = serie.to_numpy(dtype=np.float64)
+    validos = valores[~np.isnan(valores)]
+    if len(validos) == 0:
+        return True
+    if np.abs(validos).max() >= _LIMITE_FLOAT32 or not np.array_equal(np.round(validos, casas), validos):
+        return False
+    return np.array_equal(np.round(validos.astype(np.float32).astype(np.float64), casas), validos)
+
+
+def compactar(df: pd.DataFrame, categorias=COLUNAS_CATEGORIA, float32=COLUNAS_FLOAT32) -> pd.DataFrame:
+    """Cópia de df com inteiros no menor tipo que comporta os valores, textos repetidos como
+    categoria e as colunas de `float32` que cabem sem perder os centavos em float32.
+
+    Colunas que não existem em df são ignoradas; as demais ficam como estão.
+    """
+    tipos = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        if pd.api.types.is_integer_dtype(serie.dtype) and not isinstance(serie.dtype, pd.CategoricalDtype):
+            tipos[coluna] = pd.to_numeric(serie, downcast='integer').dtype
+        elif coluna in categorias and serie.dtype == object:
+            tipos[coluna] = 'category'
+        elif coluna in float32 and serie.dtype == np.float64 and cabe_em_float32(serie):
+            tipos[coluna] = np.float32
+    return df.astype(tipos) if tipos else df
+
+
+def valores_float64(serie: pd.Series, casas: int = 2) -> np.ndarray:
+    """Array float64 de uma coluna de valores em `casas` casas, esteja ela em float32 ou float64.
+
+    float32 -> float64 traz o erro de representação (189.9 vira 189.8999938...); arredondar
+    devolve exatamente o mesmo float64 da base sem compactar.
+    """
+    valores = serie.to_numpy(dtype=np.float64)
+    return np.round(valores, casas) if serie.dtype == np.float32 else valores
+
+
+def expandir_float32(df: pd.DataFrame, casas: int = 2) -> pd.DataFrame:
+    """Volta as colunas float32 de df para float64 (ver valores_float64), para fazer contas."""
+    colunas = [coluna for coluna in df.columns if df[coluna].dtype == np.float32]
+    if not colunas:
+        return df
+    return df.assign(**{coluna: valores_float64(df[coluna], casas) for coluna in colunas})
+
+
+def relatorio_memoria(antes: pd.DataFrame, depois: pd.DataFrame) -> pd.DataFrame:
+    """Tipo e memória (MB, contando o conteúdo dos textos) de cada coluna antes e depois, com o total."""
+    memoria_antes = antes.memory_usage(index=False, deep=True) / 1e6
+    memoria_depois = depois.memory_usage(index=False, deep=True) / 1e6
+    relatorio = pd.DataFrame({
+        'Tipo antes': antes.dtypes.astype(str),
+        'Tipo depois': depois.dtypes.reindex(antes.columns).astype(str),
+        'MB antes': memoria_antes,
+        'MB depois': memoria_depois.reindex(antes.columns),
+    })
+    relatorio.loc['Total'] = ['', '', memoria_antes.sum(), memoria_depois.sum()]
+    relatorio['Redução %'] = (1 - relatorio['MB depois'] / relatorio['MB antes']) * 100
+    return relatorio.round({'MB antes': 2, 'MB depois': 2, 'Redução %': 1})